@@ -0,0 +1,92 @@
+import numpy as np
+from bitboard_grid import BitboardGrid
+
+class ArrayGrid(BitboardGrid):
+    """A bitboard grid whose block ids live in a NumPy array.
+
+    Collision checks use the row bitmasks of BitboardGrid. The block id side
+    array is a (rows, columns) uint8 array that is only ever updated in place,
+    so views of it (e.g. the observations of TetrisEnv) always show the
+    current board without copying.
+
+    Attributes:
+        grid (numpy.ndarray): The (rows, columns) uint8 block ids.
+        Inherits all other attributes from the BitboardGrid class.
+
+    Methods:
+        Overrides the methods of the BitboardGrid class that replace rows of
+        the side array or capture and restore it. Inherits all other methods
+        from the BitboardGrid class.
+    """
+
+    def __init__(self):
+        """Initialize an ArrayGrid object."""
+        super().__init__()
+        self.grid = np.zeros((self.num_rows, self.num_cols), dtype=np.uint8)
+
+    def clear_row(self, row):
+        """Clear all cells in a given row.
+
+        Args:
+            row (int): The row index.
+        """
+        mask = self.rows[row]
+        self.grid[row] = 0
+        self.rows[row] = 0
+        self._index_cleared_row(row, mask)
+
+    def move_row_down(self, row, num_rows):
+        """Move all cells in a row down by a given number of rows, replacing the cells there.
+
+        Args:
+            row (int): The row index.
+            num_rows (int): The number of rows to move down.
+        """
+        self.clear_row(row + num_rows)
+        mask = self.rows[row]
+        self.grid[row + num_rows] = self.grid[row]
+        self.rows[row + num_rows] = mask
+        self.grid[row] = 0
+        self.rows[row] = 0
+        self._index_moved_row(row, num_rows, mask)
+
+    def clear_full_rows(self):
+        """Clear all full rows in the grid and move cells above down.
+
+        Returns:
+            int: The number of rows cleared.
+        """
+        rows = self.rows
+        full_row = self.full_row
+        if full_row not in rows:
+            return 0
+        kept = [row for row in range(self.num_rows) if rows[row] != full_row]
+        full_rows = [row for row in range(self.num_rows) if rows[row] == full_row]
+        completed = len(full_rows)
+        self.grid[completed:] = self.grid[kept]
+        self.grid[:completed] = 0
+        self.rows[:] = [0] * completed + [rows[row] for row in kept]
+        self._index_cleared_rows(full_rows)
+        return completed
+
+    def _snapshot_cells(self):
+        """Capture the cell values as a copy of the array; it holds only a few hundred bytes.
+
+        Returns:
+            numpy.ndarray: The copied block ids.
+        """
+        return self.grid.copy()
+
+    def _restore_cells(self, cells):
+        """Return the cell values to captured ones, writing into the same array.
+
+        Args:
+            cells (numpy.ndarray): The block ids returned by _snapshot_cells.
+        """
+        self.grid[...] = cells
+
+    def reset(self):
+        """Reset the grid to its initial state with all cells empty, keeping the same array."""
+        self.grid[...] = 0
+        self.rows = [0] * self.num_rows
+        self._reset_indexes()
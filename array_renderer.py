@@ -0,0 +1,151 @@
+"""NumPy rendering path that draws whole boards without a Python loop over cells.
+
+A board is a (rows, columns) uint8 array of cell values. It is turned into
+pixels with a palette lookup and np.repeat upscaling and written straight into
+the screen through pygame.surfarray.pixels2d.
+"""
+import numpy as np
+import pygame
+from colors import Colors
+
+
+def board_array(grid, out=None):
+    """Get a grid's cell values as a uint8 NumPy array.
+
+    Args:
+        grid (Grid): The grid to mirror.
+        out (numpy.ndarray, optional): A (rows, columns) uint8 array to fill
+            instead of allocating a new one.
+
+    Returns:
+        numpy.ndarray: The (rows, columns) cell values.
+    """
+    if isinstance(grid.grid, np.ndarray):
+        return grid.grid
+    if out is None:
+        return np.array(grid.grid, dtype=np.uint8)
+    out[...] = grid.grid
+    return out
+
+
+class BoardArrayRenderer:
+    """A class that draws boards with a vectorised palette lookup.
+
+    Each board row is expanded to one line of mapped pixel values with a
+    palette lookup, the gap columns are masked in, and the lines are repeated
+    cell_size times with the gap rows masked in. The result is written into
+    the target surface's pixels in one assignment. Targets must be 32 bit
+    surfaces, such as the display surface.
+
+    Attributes:
+        num_rows (int): The number of rows of the boards drawn.
+        num_cols (int): The number of columns of the boards drawn.
+        cell_size (int): The size of each cell in pixels.
+        width (int): The width in pixels of a drawn board.
+        height (int): The height in pixels of a drawn board.
+        colors (list): The RGB color of every cell value, plus the gap color last.
+        gap_index (int): The palette index of the gap color.
+
+    Methods:
+        map_palette(screen): Map the palette to the pixel format of a surface.
+        board_pixels(board, palette): Get the (height, width) pixel values of a board.
+        draw(board, screen, offset_x, offset_y): Draw a board onto a surface.
+        draw_boards(boards, screen, offsets): Draw several boards with one pixel lock.
+        draw_game(game, screen): Draw a game's grid and current block onto a surface.
+    """
+
+    def __init__(self, num_rows=20, num_cols=10, cell_size=30, colors=None, gap_color=Colors.dark_blue):
+        """Initialize a BoardArrayRenderer object.
+
+        Args:
+            num_rows (int, optional): The number of rows of the boards drawn.
+            num_cols (int, optional): The number of columns of the boards drawn.
+            cell_size (int, optional): The size of each cell in pixels.
+            colors (list, optional): The RGB color of every cell value. Defaults
+                to Colors.get_cell_colors().
+            gap_color (tuple, optional): The RGB color drawn between cells.
+        """
+        if colors is None:
+            colors = Colors.get_cell_colors()
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.cell_size = cell_size
+        self.width = num_cols * cell_size - 1
+        self.height = num_rows * cell_size - 1
+        self.colors = list(colors) + [gap_color]
+        self.gap_index = len(colors)
+
+    def map_palette(self, screen):
+        """Map the palette to the pixel format of a surface.
+
+        Args:
+            screen (pygame.Surface): The 32 bit surface that will be drawn on.
+
+        Returns:
+            numpy.ndarray: The mapped uint32 pixel value of every palette index.
+        """
+        return np.array([screen.map_rgb(color) for color in self.colors], dtype=np.uint32)
+
+    def board_pixels(self, board, palette):
+        """Get the pixel values of a board.
+
+        Args:
+            board (numpy.ndarray): The (rows, columns) cell values.
+            palette (numpy.ndarray): The mapped pixel value of every palette index.
+
+        Returns:
+            numpy.ndarray: The (height, width) uint32 pixel values.
+        """
+        cell_size = self.cell_size
+        gap = palette[self.gap_index]
+        lines = palette[np.repeat(board, cell_size, axis=1)[:, :self.width]]
+        lines[:, cell_size - 1::cell_size] = gap
+        pixels = np.repeat(lines, cell_size, axis=0)[:self.height]
+        pixels[cell_size - 1::cell_size] = gap
+        return pixels
+
+    def draw(self, board, screen, offset_x, offset_y):
+        """Draw a board onto a surface.
+
+        Args:
+            board (numpy.ndarray): The (rows, columns) cell values.
+            screen (pygame.Surface): The 32 bit surface to draw on.
+            offset_x (int): The x-coordinate of the board's top left pixel.
+            offset_y (int): The y-coordinate of the board's top left pixel.
+        """
+        self.draw_boards((board,), screen, ((offset_x, offset_y),))
+
+    def draw_boards(self, boards, screen, offsets):
+        """Draw several boards while locking the surface pixels only once.
+
+        Args:
+            boards (iterable): The (rows, columns) cell values of every board.
+            screen (pygame.Surface): The 32 bit surface to draw on.
+            offsets (iterable): The (x, y) top left pixel of every board.
+        """
+        palette = self.map_palette(screen)
+        pixels = pygame.surfarray.pixels2d(screen).T
+        width = self.width
+        height = self.height
+        for board, (offset_x, offset_y) in zip(boards, offsets):
+            pixels[offset_y:offset_y + height, offset_x:offset_x + width] = self.board_pixels(board, palette)
+        del pixels
+
+    def draw_game(self, game, screen, board=None):
+        """Draw a game's grid and current block onto a surface.
+
+        Args:
+            game (Game): The game to draw.
+            screen (pygame.Surface): The 32 bit surface to draw on.
+            board (numpy.ndarray, optional): A (rows, columns) uint8 array to
+                mirror the grid into instead of allocating a new one.
+        """
+        board = board_array(game.grid, board)
+        if board is game.grid.grid:
+            board = board.copy()
+        block = game.current_block
+        for row, column in block.shape.cells:
+            row += block.row_offset
+            if 0 <= row < self.num_rows:
+                board[row, column + block.column_offset] = block.id
+        self.draw(board, screen, 11, 11)
@@ -0,0 +1,485 @@
+"""Heuristic autoplayer that places every block by itself.
+
+For each new block the player lists the block's reachable resting positions
+with placements.find_placements, scores the board each one leaves with a
+linear heuristic and then plays the Game actions reaching the best one. The
+board features come from the grid's column height, hole and row fill
+indexes, so most placements are scored without scanning the board.
+
+LookaheadPlayer also places the next block on every board the current block
+can leave, and keeps the best score of the next block on each of those boards
+in a transposition table, so searching again for the same block, as the live
+loop does whenever gravity moves it, scores no board twice.
+"""
+import time
+from array import array
+from collections import namedtuple
+from bitboard_grid import BitboardGrid
+from placements import find_placements, piece_placements
+from stats import percentile
+from transposition import TranspositionTable
+from zobrist import NEXT_KEYS, board_hash, cell_keys
+
+
+class Weights(namedtuple("Weights", ["aggregate_height", "holes", "bumpiness", "lines"])):
+    """The weights of the linear heuristic scoring a board.
+
+    Attributes:
+        aggregate_height (float): The weight of the sum of the column heights.
+        holes (float): The weight of the number of empty cells below a filled cell
+            in their column.
+        bumpiness (float): The weight of the sum of the height differences of
+            neighbouring columns.
+        lines (float): The weight of the number of rows the placement clears.
+    """
+
+    __slots__ = ()
+
+
+# Weights that keep the stack low and flat and rarely top out
+DEFAULT_WEIGHTS = Weights(aggregate_height=-0.510066, holes=-0.35663, bumpiness=-0.184483, lines=0.760666)
+
+# The default memory cap of a LookaheadPlayer table, about 4700 scores
+LOOKAHEAD_TABLE_BYTES = 1 << 20
+
+
+def row_masks(grid):
+    """Get the occupancy bitmask of every row of a grid.
+
+    Args:
+        grid (Grid): Any grid backend. Bitboard grids return their own list.
+
+    Returns:
+        list: One bitmask per row, bit c set when column c is occupied.
+    """
+    rows = getattr(grid, "rows", None)
+    if rows is not None:
+        return rows
+    return [sum(1 << column for column, value in enumerate(row) if value) for row in grid.grid]
+
+
+def board_features(rows, full_row, num_cols):
+    """Measure the features of a board after its full rows are cleared.
+
+    Args:
+        rows (list): The occupancy bitmask of every row, top row first.
+        full_row (int): The bitmask of a row with every column occupied.
+        num_cols (int): The number of columns.
+
+    Returns:
+        tuple: The aggregate height, holes, bumpiness and number of full rows.
+    """
+    kept = [mask for mask in rows if mask != full_row]
+    num_rows = len(kept)
+    heights = [0] * num_cols
+    aggregate_height = 0
+    holes = 0
+    seen = 0
+    for index, mask in enumerate(kept):
+        new = mask & ~seen
+        if new:
+            height = num_rows - index
+            seen |= new
+            while new:
+                lowest = new & -new
+                heights[lowest.bit_length() - 1] = height
+                aggregate_height += height
+                new ^= lowest
+        holes += (seen & ~mask).bit_count()
+    bumpiness = 0
+    for column in range(num_cols - 1):
+        bumpiness += abs(heights[column] - heights[column + 1])
+    return aggregate_height, holes, bumpiness, len(rows) - num_rows
+
+
+def place_on_rows(rows, shape, row_offset, column_offset, num_cols):
+    """Place a shape on a board of row bitmasks and clear the rows it completes.
+
+    Args:
+        rows (list): The occupancy bitmask of every row, top row first. It is not modified.
+        shape (Shape): The shape to place.
+        row_offset (int): The row the shape's origin rests at.
+        column_offset (int): The column the shape's origin rests at.
+        num_cols (int): The number of columns.
+
+    Returns:
+        tuple: The new row bitmasks and the number of rows cleared.
+    """
+    board = list(rows)
+    full_row = (1 << num_cols) - 1
+    lines = 0
+    for row, mask in shape.row_masks:
+        row += row_offset
+        board[row] |= mask << column_offset if column_offset >= 0 else mask >> -column_offset
+        if board[row] == full_row:
+            lines += 1
+    if lines:
+        board = [0] * lines + [mask for mask in board if mask != full_row]
+    return board, lines
+
+
+def board_score(rows, num_cols, weights):
+    """Get the heuristic score of a board whose full rows are already cleared.
+
+    Args:
+        rows (list): The occupancy bitmask of every row, top row first.
+        num_cols (int): The number of columns.
+        weights (Weights): The weights of the heuristic.
+
+    Returns:
+        float: The weighted aggregate height, holes and bumpiness.
+    """
+    aggregate_height, holes, bumpiness, _ = board_features(rows, (1 << num_cols) - 1, num_cols)
+    return weights.aggregate_height * aggregate_height + weights.holes * holes + weights.bumpiness * bumpiness
+
+
+class AutoPlayer:
+    """A class that plays a Game by placing each block where a heuristic scores best.
+
+    The player can place a whole block at once with place(), for headless
+    runs, or hand out one action at a time with next_action(), for the live
+    loop where gravity also moves the block. In the second mode the plan is
+    made again whenever the block is not where the plan expects it.
+
+    Attributes:
+        weights (Weights): The weights of the heuristic.
+        budget (float): The seconds a search may take; once they are used up
+            it returns the best placement scored so far. None for no limit.
+        plan (list): The names of the Game methods still to call for the current block.
+        expected (tuple): The block and its (rotation state, row, column) the plan expects next.
+        decisions (int): The number of blocks the player chose a placement for.
+        decision_time (float): The total seconds spent choosing placements.
+        max_decision_time (float): The longest seconds spent choosing one placement.
+        decision_times (array): The seconds spent choosing every placement.
+        max_decision_cpu_time (float): The most CPU seconds of this thread one
+            decision took; unlike the wall time, it leaves out the time the
+            process was not running.
+        cut_short (int): The number of searches stopped by the budget.
+
+    Methods:
+        choose(game): Find the best placement of the current block, timing the decision.
+        search(game): Score every placement of the current block and return the best one.
+        place(game): Move the current block to the best placement and lock it.
+        next_action(game): Get the name of the next Game method to call.
+        decision_percentile(fraction): Get a percentile of the decision times.
+        report(): Describe how long the player takes to choose placements.
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, budget=0.001):
+        """Initialize an AutoPlayer object.
+
+        Args:
+            weights (Weights, optional): The weights of the heuristic.
+            budget (float, optional): The seconds a search may take, or None for no limit.
+        """
+        self.weights = weights
+        self.budget = budget
+        self.plan = []
+        self.expected = None
+        self.decisions = 0
+        self.decision_time = 0.0
+        self.max_decision_time = 0.0
+        self.decision_times = array("d")
+        self.max_decision_cpu_time = 0.0
+        self.cut_short = 0
+
+    def choose(self, game):
+        """Find the best placement of the current block.
+
+        Args:
+            game (Game): The game to play. It is not modified.
+
+        Returns:
+            Placement: The placement scoring best, or None when there is none.
+        """
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        best = self.search(game)
+        elapsed = time.perf_counter() - start
+        self.max_decision_cpu_time = max(self.max_decision_cpu_time, time.thread_time() - cpu_start)
+        self.decisions += 1
+        self.decision_time += elapsed
+        self.max_decision_time = max(self.max_decision_time, elapsed)
+        self.decision_times.append(elapsed)
+        return best
+
+    def search(self, game):
+        """Score every placement of the current block and return the best one.
+
+        Args:
+            game (Game): The game to play. It is not modified.
+
+        Returns:
+            Placement: The placement scoring best, or None when there is none.
+        """
+        grid = game.grid
+        num_rows = grid.num_rows
+        num_cols = grid.num_cols
+        heights = grid.column_heights
+        row_counts = grid.row_fill_counts
+        holes_before = sum(grid.column_holes)
+        rows = None
+        shapes = game.current_block.piece_type.shapes
+        weights = self.weights
+        deadline = time.perf_counter() + self.budget if self.budget is not None else None
+        best = None
+        best_score = None
+        for placement in find_placements(game):
+            if deadline is not None and best is not None and time.perf_counter() > deadline:
+                self.cut_short += 1
+                break
+            shape = shapes[placement.rotation]
+            features = None
+            lines = 0
+            for row, mask in shape.row_masks:
+                if row_counts[row + placement.row] + mask.bit_count() == num_cols:
+                    lines += 1
+            if lines == 0:
+                # Without cleared rows the placement only raises the columns
+                # it lands on and leaves the gaps below it as holes
+                new_heights = list(heights)
+                holes = holes_before
+                for column, top_row, bottom_row, count in shape.column_spans:
+                    column += placement.column
+                    gap = num_rows - placement.row - bottom_row - 1 - heights[column]
+                    if gap < 0:
+                        break
+                    holes += gap + bottom_row - top_row + 1 - count
+                    new_heights[column] = num_rows - placement.row - top_row
+                else:
+                    bumpiness = 0
+                    for column in range(num_cols - 1):
+                        bumpiness += abs(new_heights[column] - new_heights[column + 1])
+                    features = (sum(new_heights), holes, bumpiness, 0)
+            if features is None:
+                if rows is None:
+                    rows = row_masks(grid)
+                board = list(rows)
+                for row, mask in shape.row_masks:
+                    if placement.column >= 0:
+                        board[row + placement.row] |= mask << placement.column
+                    else:
+                        board[row + placement.row] |= mask >> -placement.column
+                features = board_features(board, (1 << num_cols) - 1, num_cols)
+            score = (weights.aggregate_height * features[0] + weights.holes * features[1]
+                     + weights.bumpiness * features[2] + weights.lines * features[3])
+            if best_score is None or score > best_score:
+                best = placement
+                best_score = score
+        return best
+
+    def place(self, game):
+        """Move the current block to the best placement and lock it.
+
+        Args:
+            game (Game): The game to play.
+        """
+        placement = self.choose(game)
+        if placement is not None:
+            for name in placement.actions:
+                getattr(game, name)()
+
+    def next_action(self, game):
+        """Get the name of the next Game method to call.
+
+        Args:
+            game (Game): The game to play.
+
+        Returns:
+            str: One of "move_left", "move_right", "rotate" or "move_down".
+        """
+        block = game.current_block
+        if self.expected != (block, block.rotation_state, block.row_offset, block.column_offset) or not self.plan:
+            placement = self.choose(game)
+            self.plan = list(placement.actions) if placement is not None else ["move_down"]
+        name = self.plan.pop(0)
+        rotation = block.rotation_state
+        row = block.row_offset
+        column = block.column_offset
+        if name == "rotate":
+            rotation = (rotation + 1) % len(block.shapes)
+        elif name == "move_left":
+            column -= 1
+        elif name == "move_right":
+            column += 1
+        else:
+            row += 1
+        self.expected = (block, rotation, row, column)
+        return name
+
+    def decision_percentile(self, fraction):
+        """Get a percentile of the decision times by the nearest-rank method.
+
+        Args:
+            fraction (float): The percentile as a fraction, e.g. 0.99.
+
+        Returns:
+            float: The smallest decision time with at least that fraction of
+                the decisions at or below it, or 0.0 before any decision.
+        """
+        return percentile(sorted(self.decision_times), fraction)
+
+    def report(self):
+        """Describe how long the player takes to choose placements.
+
+        Returns:
+            str: The number of decisions, their mean, p99 and longest times,
+                the longest CPU time and the searches the budget cut short.
+        """
+        mean = self.decision_time / self.decisions if self.decisions else 0.0
+        return "autoplayer: {} decisions, mean {:.0f} us, p99 {:.0f} us, max {:.0f} us ({:.0f} us CPU), " \
+               "{} cut short".format(self.decisions, mean * 1e6, self.decision_percentile(0.99) * 1e6,
+                                     self.max_decision_time * 1e6, self.max_decision_cpu_time * 1e6,
+                                     self.cut_short)
+
+
+class MaskBoard:
+    """A board of row bitmasks only, for placing blocks on boards a search imagines.
+
+    Attributes:
+        rows (list): The occupancy bitmask of every row, top row first.
+        num_rows (int): The number of rows.
+        num_cols (int): The number of columns.
+
+    Methods:
+        shape_fits(shape, row_offset, column_offset): The collision check of BitboardGrid.
+    """
+
+    __slots__ = ("rows", "num_rows", "num_cols")
+
+    shape_fits = BitboardGrid.shape_fits
+
+    def __init__(self, rows, num_cols):
+        """Initialize a MaskBoard object.
+
+        Args:
+            rows (list): The occupancy bitmask of every row, top row first.
+            num_cols (int): The number of columns.
+        """
+        self.rows = rows
+        self.num_rows = len(rows)
+        self.num_cols = num_cols
+
+
+class LookaheadPlayer(AutoPlayer):
+    """A player that searches two blocks deep, the current block and the next one.
+
+    A placement of the current block is worth the lines it clears plus the
+    best placement of the next block on the board it leaves. That best score
+    is kept in a transposition table under the board hash XORed with the next
+    block's NEXT_KEYS key. When the block is searched for again from where
+    gravity has moved it, every board it can still reach is one it could
+    reach before, so the search finds all its scores in the table.
+
+    Attributes:
+        table (TranspositionTable): The table shared by all searches of the
+            player, or None to score every board each time.
+        Inherits all other attributes from the AutoPlayer class.
+
+    Methods:
+        search(game): Find the placement of the current block that scores best two blocks deep.
+        Inherits all other methods from the AutoPlayer class.
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, table=None, use_table=True):
+        """Initialize a LookaheadPlayer object.
+
+        Args:
+            weights (Weights, optional): The weights of the heuristic.
+            table (TranspositionTable, optional): The table to share between
+                searches. Defaults to a new table of at most LOOKAHEAD_TABLE_BYTES.
+            use_table (bool, optional): Whether to keep scores in a table at all.
+        """
+        super().__init__(weights, budget=None)
+        self.table = None
+        if use_table:
+            self.table = table if table is not None else TranspositionTable(max_bytes=LOOKAHEAD_TABLE_BYTES)
+
+    def _place(self, rows, zobrist_hash, shape, row_offset, column_offset, num_cols):
+        """Place a shape on a board and clear the rows it completes.
+
+        Args:
+            rows (tuple): The occupancy bitmask of every row.
+            zobrist_hash (int): The hash of the board.
+            shape (Shape): The shape to place.
+            row_offset (int): The row the shape's origin rests at.
+            column_offset (int): The column the shape's origin rests at.
+            num_cols (int): The number of columns.
+
+        Returns:
+            tuple: The new row bitmasks, their hash and the number of rows cleared.
+        """
+        board, lines = place_on_rows(rows, shape, row_offset, column_offset, num_cols)
+        if lines:
+            return tuple(board), board_hash(board), lines
+        keys = cell_keys(len(board), num_cols)
+        for row, column in shape.cells:
+            zobrist_hash ^= keys[row + row_offset][column + column_offset]
+        return tuple(board), zobrist_hash, 0
+
+    def _next_score(self, rows, zobrist_hash, piece_type, num_cols):
+        """Get the score of the best placement of a newly spawned block on a board.
+
+        Args:
+            rows (tuple): The occupancy bitmask of every row.
+            zobrist_hash (int): The hash of the board.
+            piece_type (PieceType): The kind of the block to place.
+            num_cols (int): The number of columns.
+
+        Returns:
+            float: The best score, or minus infinity if the block cannot spawn.
+        """
+        key = zobrist_hash ^ NEXT_KEYS[piece_type.id]
+        if self.table is not None:
+            score = self.table.get(key, 1)
+            if score is not None:
+                return score
+        weights = self.weights
+        board = MaskBoard(rows, num_cols)
+        shapes = piece_type.shapes
+        score = float("-inf")
+        if board.shape_fits(shapes[0], piece_type.spawn_row, piece_type.spawn_column):
+            for placement in piece_placements(board, shapes, 0, piece_type.spawn_row, piece_type.spawn_column):
+                after, lines = place_on_rows(rows, shapes[placement.rotation], placement.row, placement.column,
+                                             num_cols)
+                score = max(score, weights.lines * lines + board_score(after, num_cols, weights))
+        if self.table is not None:
+            self.table.put(key, 1, score)
+        return score
+
+    def search(self, game):
+        """Find the placement of the current block that scores best two blocks deep.
+
+        Args:
+            game (Game): The game to play. It is not modified.
+
+        Returns:
+            Placement: The placement scoring best, or None when there is none.
+        """
+        grid = game.grid
+        num_cols = grid.num_cols
+        rows = tuple(row_masks(grid))
+        zobrist_hash = grid.zobrist_hash
+        shapes = game.current_block.piece_type.shapes
+        next_type = game.next_block.piece_type
+        lines_weight = self.weights.lines
+        best = None
+        best_score = None
+        for placement in find_placements(game):
+            after, after_hash, lines = self._place(rows, zobrist_hash, shapes[placement.rotation],
+                                                   placement.row, placement.column, num_cols)
+            score = lines_weight * lines + self._next_score(after, after_hash, next_type, num_cols)
+            if best_score is None or score > best_score:
+                best = placement
+                best_score = score
+        return best
+
+    def report(self):
+        """Describe the decision times and the transposition table counters.
+
+        Returns:
+            str: The AutoPlayer report and, with a table, the table report, one per line.
+        """
+        if self.table is None:
+            return super().report()
+        return super().report() + "\n" + self.table.report()
@@ -0,0 +1,502 @@
+"""Vectorised engine that steps many independent games at once with NumPy.
+
+The boards of all games live in one (N, rows, columns) uint8 array and the
+active pieces in one array per field, so an action vector is applied to
+every game with whole-array operations. The rules are those of game.Game:
+for the same seeds and the same actions the boards, blocks, scores and game
+over flags match game by game, which benchmark.check_batch_game verifies.
+"""
+import numpy as np
+from blocks import PIECE_TYPES
+from game import NOOP, MOVE_LEFT, MOVE_RIGHT, MOVE_DOWN, ROTATE
+from randomizer import BAG_IDS, BAG_ORDERS, MASK_64
+
+# Points for clearing 0 to 4 rows at once, as in Game.update_score
+LINE_SCORES = np.array([0, 100, 300, 500, 0], dtype=np.int64)
+
+# The wall of cells around every board, in rows above and below and in bits
+# either side of a row bitmask; it is wide enough that no cell of a block one
+# move or rotation away from a valid position leaves it
+PADDING = 3
+
+# The bits of a row bitmask, and the most columns a board can have inside the wall
+ROW_BITS = 16
+ROW_MASK = (1 << ROW_BITS) - 1
+MAX_COLUMNS = ROW_BITS - 2 * PADDING
+
+# Column offsets are stored as column + COLUMN_BASE, from 0 to TABLE_COLUMNS - 1
+COLUMN_BASE = 4
+TABLE_COLUMNS = MAX_COLUMNS + 2 * COLUMN_BASE
+
+
+def _piece_tables():
+    """Build the per piece type lookup tables used by BatchGame.
+
+    Returns:
+        tuple: The cell row offsets and cell column offsets, both indexed by
+            [id, rotation state, cell], the number of rotation states, the
+            spawn rows and the spawn columns, all indexed by block id.
+    """
+    cell_rows = np.zeros((len(PIECE_TYPES), 4, 4), dtype=np.int64)
+    cell_columns = np.zeros((len(PIECE_TYPES), 4, 4), dtype=np.int64)
+    num_rotations = np.ones(len(PIECE_TYPES), dtype=np.int64)
+    spawn_rows = np.zeros(len(PIECE_TYPES), dtype=np.int64)
+    spawn_columns = np.zeros(len(PIECE_TYPES), dtype=np.int64)
+    for piece_type in PIECE_TYPES[1:]:
+        num_rotations[piece_type.id] = len(piece_type.shapes)
+        spawn_rows[piece_type.id] = piece_type.spawn_row
+        spawn_columns[piece_type.id] = piece_type.spawn_column
+        for state in range(4):
+            shape = piece_type.shapes[state % len(piece_type.shapes)]
+            for cell, (row, column) in enumerate(shape.cells):
+                cell_rows[piece_type.id, state, cell] = row
+                cell_columns[piece_type.id, state, cell] = column
+    return cell_rows, cell_columns, num_rotations, spawn_rows, spawn_columns
+
+
+CELL_ROWS, CELL_COLUMNS, NUM_ROTATIONS, SPAWN_ROWS, SPAWN_COLUMNS = _piece_tables()
+
+# NEXT_ROTATION[id * 4 + rotation] is the rotation state after Block.rotate
+NEXT_ROTATION = ((np.arange(4)[None, :] + 1) % NUM_ROTATIONS[:, None]).ravel()
+
+NUM_ACTIONS = 5
+NUM_SHAPES = len(PIECE_TYPES) * 4
+
+
+def _position_tables():
+    """Build the per (shape, column, action) tables that BatchGame.step looks actions up in.
+
+    A block's position key is ((id * 4 + rotation) * TABLE_COLUMNS + column
+    + COLUMN_BASE) * NUM_ACTIONS, so adding an action to it gives the entry
+    of that action in every table.
+
+    Returns:
+        tuple: The position key after every action, whether or not it fits,
+            the row change of every action, and the bitmask of the cells of
+            the position after every action over four rows of ROW_BITS bits,
+            starting at the block's row offset.
+    """
+    shape_masks = np.zeros((NUM_SHAPES, TABLE_COLUMNS), dtype=np.uint64)
+    for shape in range(NUM_SHAPES):
+        piece_id, rotation = divmod(shape, 4)
+        for column in range(TABLE_COLUMNS):
+            mask = 0
+            for row_offset, column_offset in zip(CELL_ROWS[piece_id, rotation], CELL_COLUMNS[piece_id, rotation]):
+                bit = column - COLUMN_BASE + int(column_offset) + PADDING
+                if not 0 <= bit < ROW_BITS:
+                    # Outside the wall: collide with everything
+                    mask = (1 << 4 * ROW_BITS) - 1
+                    break
+                mask |= 1 << int(row_offset) * ROW_BITS + bit
+            shape_masks[shape, column] = mask
+
+    size = NUM_SHAPES * TABLE_COLUMNS * NUM_ACTIONS
+    next_positions = np.zeros(size, dtype=np.intp)
+    row_deltas = np.zeros(size, dtype=np.intp)
+    masks = np.zeros(size, dtype=np.uint64)
+    for shape in range(NUM_SHAPES):
+        piece_id, rotation = divmod(shape, 4)
+        for column in range(TABLE_COLUMNS):
+            moves = {NOOP: (rotation, 0, 0), MOVE_LEFT: (rotation, -1, 0), MOVE_RIGHT: (rotation, 1, 0),
+                     MOVE_DOWN: (rotation, 0, 1), ROTATE: (NEXT_ROTATION[shape], 0, 0)}
+            for action, (new_rotation, column_delta, row_delta) in moves.items():
+                key = (shape * TABLE_COLUMNS + column) * NUM_ACTIONS + action
+                new_shape = piece_id * 4 + new_rotation
+                new_column = min(max(column + column_delta, 0), TABLE_COLUMNS - 1)
+                next_positions[key] = (new_shape * TABLE_COLUMNS + new_column) * NUM_ACTIONS
+                row_deltas[key] = row_delta
+                masks[key] = shape_masks[new_shape, new_column]
+    return next_positions, row_deltas, masks
+
+
+NEXT_POSITIONS, ROW_DELTAS, POSITION_MASKS = _position_tables()
+NUM_KEYS = len(POSITION_MASKS)
+
+# PIECE_ROWS[key] is the bitmask of each of the four rows of POSITION_MASKS[key]
+PIECE_ROWS = ((POSITION_MASKS[:, None] >> (np.arange(4, dtype=np.uint64) * np.uint64(ROW_BITS)))
+              & np.uint64(ROW_MASK))
+
+# A block's state is the flat index of its row's window shifted left by
+# KEY_BITS, plus its position key. The keys from NUM_KEYS on are those of
+# blocks frozen by a game over: they mirror the others, but no action moves
+# them and nothing collides with them
+KEY_BITS = 13
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def _state_tables():
+    """Build the tables BatchGame.step applies actions to block states with.
+
+    Returns:
+        tuple: The change of the state after every action if it fits, and the
+            bitmask of the cells it moves to, both indexed by key + action
+            and zero for frozen blocks; and the bitmask every locked block ORs
+            into each of the seven windows from three rows above its row to
+            three rows below, indexed by key.
+    """
+    keys = np.arange(NUM_KEYS)
+    deltas = np.zeros(2 * NUM_KEYS, dtype=np.int64)
+    deltas[:NUM_KEYS] = (ROW_DELTAS << KEY_BITS) + NEXT_POSITIONS - (keys - keys % NUM_ACTIONS)
+    masks = np.zeros(2 * NUM_KEYS, dtype=np.uint64)
+    masks[:NUM_KEYS] = POSITION_MASKS
+    window_masks = np.zeros((NUM_KEYS, 7), dtype=np.uint64)
+    for window in range(7):
+        for row in range(4):
+            # Row offset + row is the (row - window + 3)-th row of the window
+            slot = row - window + 3
+            if 0 <= slot < 4:
+                window_masks[:, window] |= PIECE_ROWS[:, row] << np.uint64(slot * ROW_BITS)
+    return deltas, masks, window_masks
+
+
+STATE_DELTAS, STATE_MASKS, WINDOW_MASKS = _state_tables()
+
+# The offsets of those seven windows from the block's window
+WINDOW_OFFSETS = np.arange(-3, 4)
+
+# ROW_LANES[key] has all ROW_BITS bits set in the lane of every row
+# POSITION_MASKS[key] has cells in; a row of the block is full when its lane
+# of the window is, and LOW_LANES and HIGH_LANES find such lanes
+ROW_LANES = np.zeros(NUM_KEYS, dtype=np.uint64)
+for _row in range(4):
+    ROW_LANES |= np.where(PIECE_ROWS[:, _row] != 0, np.uint64(ROW_MASK << _row * ROW_BITS), np.uint64(0))
+del _row
+LOW_LANES = np.uint64(sum(1 << lane * ROW_BITS for lane in range(4)))
+HIGH_LANES = LOW_LANES << np.uint64(ROW_BITS - 1)
+
+# Every bag order as a row of piece ids, and the number of bags drawn per refill
+BAG_TABLE = np.array(BAG_ORDERS, dtype=np.uint8)
+BAGS_PER_CHUNK = 16
+
+
+def bag_chunks(states, num_bags):
+    """Draw whole bags for many games at once, as BagRandomizer.next_id does bag by bag.
+
+    Args:
+        states (numpy.ndarray): The uint64 SplitMix64 state of every game; it is advanced in place.
+        num_bags (int): The number of bags to draw per game.
+
+    Returns:
+        numpy.ndarray: The (games, num_bags * 7) uint8 piece ids in draw order.
+    """
+    pieces = np.empty((len(states), num_bags * len(BAG_IDS)), dtype=np.uint8)
+    low_mask = np.uint64(0xFFFFFFFF)
+    shift = np.uint64(32)
+    for bag in range(num_bags):
+        states += np.uint64(0x9E3779B97F4A7C15)
+        value = states ^ (states >> np.uint64(30))
+        value *= np.uint64(0xBF58476D1CE4E5B9)
+        value ^= value >> np.uint64(27)
+        value *= np.uint64(0x94D049BB133111EB)
+        value ^= value >> np.uint64(31)
+        # The high 64 bits of value * len(BAG_ORDERS), from its two 32-bit halves
+        orders = ((value >> shift) * np.uint64(len(BAG_ORDERS))
+                  + (((value & low_mask) * np.uint64(len(BAG_ORDERS))) >> shift)) >> shift
+        pieces[:, bag * len(BAG_IDS):(bag + 1) * len(BAG_IDS)] = BAG_TABLE[orders.astype(np.intp)]
+    return pieces
+
+
+class BatchGame:
+    """A class stepping many independent games with whole-array operations.
+
+    Collisions are checked on row bitmasks, as in BitboardGrid: every game
+    keeps, for each row, one uint64 window of the bitmasks of that row and
+    the three below it, walls included. A block is kept as a single integer
+    state holding its position key and the index of its row's window, so an
+    action is one table lookup and an add, and the collision check one
+    gather and an AND, whatever its kind. Locking a block ORs its cells into
+    the seven windows that hold any of its rows, which also shows the rows it
+    filled; the windows are rebuilt from the board only when rows are
+    cleared. A block frozen by a game over moves to a copy of the tables in
+    which no action moves it, so over games need no masking. The piece
+    sequence of every game is drawn ahead from its seeded bags, a chunk of
+    bags at a time, so locking a block draws the next one for all games at
+    once without a Python loop.
+
+    Attributes:
+        num_games (int): The number of games N.
+        num_rows (int): The number of rows of every board.
+        num_cols (int): The number of columns of every board, at most MAX_COLUMNS.
+        boards (numpy.ndarray): The (N, rows, columns) uint8 cell values.
+        windows (numpy.ndarray): The (N, rows + WINDOW_TOP + 4) uint64
+            four-row bitmask windows, starting WINDOW_TOP rows above the board.
+        piece (numpy.ndarray): The block id of every game's current block.
+        rotation (numpy.ndarray): The rotation state of every current block.
+        row (numpy.ndarray): The row offset of every current block.
+        column (numpy.ndarray): The column offset of every current block.
+        score (numpy.ndarray): The score of every game.
+        game_over (numpy.ndarray): The game over flag of every game.
+        bag_states (numpy.ndarray): The uint64 SplitMix64 state of every game's bags.
+        pieces (numpy.ndarray): The (N, BAGS_PER_CHUNK * 7 + 1) upcoming piece
+            ids of every game, ending in a 0 that marks the end of the chunk.
+
+    Methods:
+        reset(indices): Reset some or all games to their initial state.
+        step(actions): Apply one action to every game.
+        fits(indices, shapes, row, column): Check where pieces fit.
+    """
+
+    # The windows start this many rows above the board: PADDING rows a block
+    # can reach, and three more for the top windows a locked block ORs into
+    WINDOW_TOP = PADDING + 3
+
+    def __init__(self, num_games, seeds=None, num_rows=20, num_cols=10):
+        """Initialize a BatchGame object.
+
+        Args:
+            num_games (int): The number of games N.
+            seeds (list, optional): One seed per game, used like Game(seed=...).
+                Defaults to seeds 0 to N - 1.
+            num_rows (int, optional): The number of rows of every board.
+            num_cols (int, optional): The number of columns of every board.
+
+        Raises:
+            ValueError: If the boards are wider than MAX_COLUMNS.
+        """
+        if num_cols > MAX_COLUMNS:
+            raise ValueError(f"boards of {num_cols} columns do not fit {ROW_BITS}-bit rows; "
+                             f"the most is {MAX_COLUMNS}")
+        if seeds is None:
+            seeds = range(num_games)
+        self.num_games = num_games
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.windows = np.zeros((num_games, num_rows + self.WINDOW_TOP + 4), dtype=np.uint64)
+        # The boards are a view of cells laid out with one row per window, so
+        # the cells of a block are found from its window index alone
+        self._cells = np.zeros((num_games, self.windows.shape[1], num_cols), dtype=np.uint8)
+        self.boards = self._cells[:, self.WINDOW_TOP:self.WINDOW_TOP + num_rows]
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        self.bag_states = np.array([seed & MASK_64 for seed in seeds], dtype=np.uint64)
+        self.pieces = np.zeros((num_games, BAGS_PER_CHUNK * len(BAG_IDS) + 1), dtype=np.uint8)
+
+        # The state of every current block, see KEY_BITS
+        self._states = np.zeros(num_games, dtype=np.int64)
+        self._flat_windows = self.windows.reshape(-1)
+        self._flat_cells = self._cells.reshape(-1)
+        self._flat_pieces = self.pieces.reshape(-1)
+        self._piece_bases = np.arange(num_games, dtype=np.intp) * self.pieces.shape[1]
+        # The flat index in pieces of every game's next block; every game
+        # starts at the end of an empty chunk, so the first draw fills it
+        self._next_indices = self._piece_bases + self.pieces.shape[1] - 2
+        self._state_bases = np.arange(num_games, dtype=np.int64) * self.windows.shape[1] << KEY_BITS
+        self._wall = np.uint64(ROW_MASK ^ ((1 << num_cols) - 1) << PADDING)
+        # The flat cell offset of every cell of every position key, from its window
+        shapes = np.arange(NUM_KEYS) // (NUM_ACTIONS * TABLE_COLUMNS)
+        columns = np.arange(NUM_KEYS) // NUM_ACTIONS % TABLE_COLUMNS - COLUMN_BASE
+        self._cell_offsets = (CELL_ROWS.reshape(NUM_SHAPES, 4)[shapes] * num_cols
+                              + CELL_COLUMNS.reshape(NUM_SHAPES, 4)[shapes] + columns[:, None])
+        # The state of every kind of block at its spawn position in the first game
+        self._spawn_states = (((SPAWN_ROWS + self.WINDOW_TOP) << KEY_BITS)
+                              + (np.arange(len(PIECE_TYPES)) * 4 * TABLE_COLUMNS + SPAWN_COLUMNS + COLUMN_BASE)
+                              * NUM_ACTIONS)
+        self.reset()
+
+    @property
+    def _keys(self):
+        """numpy.ndarray: The position key of every current block, frozen or not."""
+        return (self._states & KEY_MASK) % NUM_KEYS
+
+    @property
+    def piece(self):
+        """numpy.ndarray: The block id of every game's current block."""
+        return self._keys // (NUM_ACTIONS * TABLE_COLUMNS * 4)
+
+    @property
+    def rotation(self):
+        """numpy.ndarray: The rotation state of every current block."""
+        return self._keys // (NUM_ACTIONS * TABLE_COLUMNS) % 4
+
+    @property
+    def row(self):
+        """numpy.ndarray: The row offset of every current block."""
+        return (self._states >> KEY_BITS) % self.windows.shape[1] - self.WINDOW_TOP
+
+    @property
+    def column(self):
+        """numpy.ndarray: The column offset of every current block."""
+        return self._keys // NUM_ACTIONS % TABLE_COLUMNS - COLUMN_BASE
+
+    @property
+    def next_piece(self):
+        """numpy.ndarray: The block id of every game's next block."""
+        return self._flat_pieces.take(self._next_indices).astype(np.intp)
+
+    @property
+    def piece_position(self):
+        """numpy.ndarray: The index in pieces of every game's next block."""
+        return self._next_indices - self._piece_bases
+
+    def _refill(self, indices):
+        """Draw a new chunk of bags for some games.
+
+        Args:
+            indices (numpy.ndarray): The games whose chunk is used up.
+        """
+        states = self.bag_states[indices]
+        self.pieces[indices, :-1] = bag_chunks(states, BAGS_PER_CHUNK)
+        self.bag_states[indices] = states
+
+    def _update_windows(self, indices):
+        """Rebuild the windows of some games from their boards.
+
+        Args:
+            indices (numpy.ndarray): The games whose boards changed.
+        """
+        occupied = np.packbits(self.boards[indices] != 0, axis=2, bitorder="little")
+        if occupied.shape[2] == 1:
+            occupied = occupied[:, :, 0].astype(np.uint64)
+        else:
+            occupied = occupied.view("<u2")[:, :, 0].astype(np.uint64)
+        # The rows of every window, walls above and below the board included
+        masks = np.full((len(indices), self.windows.shape[1] + 3), ROW_MASK, dtype=np.uint64)
+        masks[:, self.WINDOW_TOP:self.WINDOW_TOP + self.num_rows] = occupied << np.uint64(PADDING) | self._wall
+        self.windows[indices] = (masks[:, :-3] | masks[:, 1:-2] << np.uint64(ROW_BITS)
+                                 | masks[:, 2:-1] << np.uint64(2 * ROW_BITS)
+                                 | masks[:, 3:] << np.uint64(3 * ROW_BITS))
+
+    def reset(self, indices=None):
+        """Reset some or all games to their initial state, as Game.reset does.
+
+        Args:
+            indices (array_like, optional): The games to reset. Defaults to all games.
+        """
+        if indices is None:
+            indices = np.arange(self.num_games)
+        indices = np.asarray(indices, dtype=np.intp)
+        self.boards[indices] = 0
+        self._update_windows(indices)
+        # Drop what is left of the current bags, as BagRandomizer.new_bag does;
+        # chunks hold whole bags, so bags start at multiples of 7
+        bag_size = len(BAG_IDS)
+        position = (self.piece_position[indices] + bag_size) // bag_size * bag_size
+        empty = position == self.pieces.shape[1] - 1
+        if empty.any():
+            self._refill(indices[empty])
+            position[empty] = 0
+        self._next_indices[indices] = self._piece_bases[indices] + position + 1
+        self._spawn(indices, self.pieces[indices, position])
+        self.score[indices] = 0
+        self.game_over[indices] = False
+
+    def _spawn(self, indices, piece):
+        """Make blocks the current blocks of some games, at their spawn position.
+
+        Args:
+            indices (numpy.ndarray): The games whose current block was just drawn.
+            piece (numpy.ndarray): The block id of each of those games' new current block.
+
+        Returns:
+            numpy.ndarray: The new states of the blocks.
+        """
+        states = self._state_bases[indices] + self._spawn_states[piece]
+        self._states[indices] = states
+        return states
+
+    def fits(self, indices, shapes, row, column):
+        """Check where pieces are inside their board and overlap no locked cells.
+
+        Args:
+            indices (numpy.ndarray): The games to check, or None for all games.
+            shapes (numpy.ndarray): The id * 4 + rotation state to check in each game.
+            row (numpy.ndarray): The row offset to check in each game.
+            column (numpy.ndarray): The column offset to check in each game.
+
+        Returns:
+            numpy.ndarray: True for every game where the piece fits.
+        """
+        if indices is None:
+            indices = np.arange(self.num_games)
+        masks = POSITION_MASKS.take((shapes * TABLE_COLUMNS + column + COLUMN_BASE) * NUM_ACTIONS)
+        return masks & self._flat_windows.take(indices * self.windows.shape[1] + self.WINDOW_TOP + row) == 0
+
+    def step(self, actions):
+        """Apply one action to every game.
+
+        Each action has the effect of the matching Game method: MOVE_LEFT,
+        MOVE_RIGHT and ROTATE are undone when the block would not fit, and
+        MOVE_DOWN locks the block when it cannot move further. Games that are
+        over ignore their action.
+
+        Args:
+            actions (array_like): One of NOOP, MOVE_LEFT, MOVE_RIGHT, MOVE_DOWN
+                or ROTATE for every game.
+
+        Returns:
+            numpy.ndarray: The number of rows every game cleared in this step.
+        """
+        actions = np.asarray(actions)
+        states = self._states
+        keys = states & KEY_MASK
+        keys += actions
+        deltas = STATE_DELTAS.take(keys)
+        fits = STATE_MASKS.take(keys) & self._flat_windows.take((states + deltas) >> KEY_BITS) == 0
+        locked = np.flatnonzero((actions == MOVE_DOWN) > fits)
+        deltas *= fits
+        states += deltas
+
+        cleared = np.zeros(self.num_games, dtype=np.int64)
+        if len(locked):
+            cleared[locked] = self._lock(locked)
+        return cleared
+
+    def _lock(self, indices):
+        """Lock the current blocks of some games, clear full rows and spawn new blocks.
+
+        Args:
+            indices (numpy.ndarray): The games whose current block is locked.
+
+        Returns:
+            numpy.ndarray: The number of rows each of those games cleared.
+        """
+        states = self._states[indices]
+        keys = states & KEY_MASK
+        windows = states >> KEY_BITS
+        self._flat_cells[(windows * self.num_cols)[:, None] + self._cell_offsets.take(keys, axis=0)] = \
+            (keys // (NUM_ACTIONS * TABLE_COLUMNS * 4))[:, None]
+
+        # OR the block into the windows holding its rows; a row it has cells
+        # in is full when its lane of the block's window is, as no row was
+        # full before
+        self._flat_windows[windows[:, None] + WINDOW_OFFSETS] |= WINDOW_MASKS.take(keys, axis=0)
+        empty = ~(self._flat_windows[windows] & ROW_LANES[keys])
+        cleared = np.zeros(len(indices), dtype=np.int64)
+        full = np.flatnonzero((empty - LOW_LANES) & ~empty & HIGH_LANES)
+        if len(full):
+            lanes = empty[full].view(np.uint16).reshape(-1, 4)
+            cleared[full] = (lanes == 0).sum(axis=1)
+
+        # The next block becomes the current one; the 0 at the end of a chunk
+        # shows when the block after it is in the next chunk
+        next_indices = self._next_indices[indices]
+        piece = self._flat_pieces.take(next_indices)
+        next_indices += 1
+        self._next_indices[indices] = next_indices
+        ends = self._flat_pieces.take(next_indices)
+        if not ends.all():
+            empty = indices[ends == 0]
+            self._refill(empty)
+            self._next_indices[empty] = self._piece_bases[empty]
+        states = self._spawn(indices, piece)
+
+        if len(full):
+            # Sort the full rows to the top, keeping the other rows in order,
+            # then empty them: the rows above each cleared row move down.
+            changed_indices = indices[full]
+            boards = self.boards[changed_indices]
+            rows_full = (boards != 0).all(axis=2)
+            order = np.argsort(~rows_full, axis=1, kind="stable")
+            boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+            boards[np.arange(self.num_rows) < cleared[full][:, None]] = 0
+            self.boards[changed_indices] = boards
+            self.score[changed_indices] += LINE_SCORES[cleared[full]]
+            self._update_windows(changed_indices)
+
+        fits = STATE_MASKS.take(states & KEY_MASK) & self._flat_windows.take(states >> KEY_BITS) == 0
+        if not fits.all():
+            over = indices[~fits]
+            self.game_over[over] = True
+            # Freeze the blocks of the games that ended
+            self._states[over] += NUM_KEYS
+        return cleared
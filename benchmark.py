@@ -0,0 +1,896 @@
+"""Benchmarks for the Tetris simulation core.
+
+Run ``python benchmark.py`` to time the grid backends against each other and
+check their incrementally updated indexes, to compare the allocations of the
+Position-based and shape-table-based collision checks, to check the batched
+engine against Game objects and compare their speed, to soak the autoplayer,
+the two-block lookahead and the parallel Monte Carlo search and to measure
+Zobrist hash collisions. Everything here is headless: the drawing benchmarks
+use SDL's dummy video and audio drivers.
+
+The hot-path suite (run_suite) times row clears on crafted boards, the
+collision checks, piece generation, whole games, drawing boards with the
+tile atlas and the NumPy array renderer, and the frames of local matches of
+2 to 8 players replaying recorded autoplayer moves, all with fixed seeds,
+taking the best of several rounds. ``python benchmark.py --suite``
+runs only the suite. Add ``--json FILE`` to save its results, and
+``--baseline FILE`` to compare them with saved ones: the run fails if any
+result is worse by more than ``--threshold`` (0.1 by default, i.e. 10%).
+"""
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+# Drawing runs without a window or a sound card; set before pygame is first imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from game import Game, ACTION_METHODS, NOOP
+from grid import Grid
+from bitboard_grid import BitboardGrid
+from array_grid import ArrayGrid
+from blocks import IBlock, OBlock, TBlock
+from batch_game import BatchGame
+from autoplayer import AutoPlayer, LookaheadPlayer, LOOKAHEAD_TABLE_BYTES, row_masks
+from transposition import TranspositionTable
+from parallel_search import ParallelSearchPlayer
+from randomizer import BagRandomizer
+from replay import apply_action
+from match import Match, MIN_PLAYERS, MAX_PLAYERS
+from renderer import MatchRenderer, get_tile_atlas
+from array_renderer import BoardArrayRenderer, board_array
+
+GRID_BACKENDS = {
+    "list": Grid,
+    "bitboard": BitboardGrid,
+    "array": ArrayGrid,
+}
+
+
+def play_random_pieces(game, num_pieces, rng):
+    """Drop pieces with random rotations and shifts, restarting on game over.
+
+    Args:
+        game (Game): The game to play.
+        num_pieces (int): The number of pieces to lock.
+        rng (random.Random): The random number generator choosing the moves.
+
+    Returns:
+        int: The number of games that ended while playing.
+    """
+    games_over = 0
+    for _ in range(num_pieces):
+        block = game.current_block
+        for _ in range(rng.randrange(4)):
+            game.rotate()
+        for _ in range(rng.randrange(6)):
+            if rng.random() < 0.5:
+                game.move_left()
+            else:
+                game.move_right()
+        while game.current_block is block:
+            game.move_down()
+        if game.game_over:
+            games_over += 1
+            game.reset()
+    return games_over
+
+
+def bench_grid_backends(num_pieces=20000, seed=0):
+    """Time the same random game on every grid backend.
+
+    Args:
+        num_pieces (int): The number of pieces to lock on each backend.
+        seed (int): The seed shared by the piece sequence and the moves.
+
+    Returns:
+        dict: Pieces per second for each backend name.
+    """
+    results = {}
+    final_grids = {}
+    for name, backend in GRID_BACKENDS.items():
+        game = Game(backend(), seed)
+        start = time.perf_counter()
+        play_random_pieces(game, num_pieces, random.Random(seed))
+        elapsed = time.perf_counter() - start
+        results[name] = num_pieces / elapsed
+        final_grids[name] = [list(row) for row in game.grid.grid]
+    grids = list(final_grids.values())
+    if any(grid != grids[0] for grid in grids):
+        raise AssertionError("grid backends disagree on the final board")
+    return results
+
+
+def check_grid_indexes(num_steps=20000, seed=0):
+    """Check the incrementally updated grid indexes against a grid rebuilt cell by cell.
+
+    Every backend gets the same random mix of cell writes, clear_row,
+    move_row_down and clear_full_rows calls and snapshot restores, and after
+    each one its indexes and hash must equal those of a fresh grid of the
+    same backend with the same cells set.
+
+    Returns:
+        dict: For each backend, the number of steps checked.
+    """
+    def indexes(grid):
+        return (grid.column_heights, grid.column_holes, grid.row_fill_counts,
+                grid.occupied_cells, grid.zobrist_hash)
+
+    results = {}
+    for name, backend in GRID_BACKENDS.items():
+        rng = random.Random(seed)
+        grid = backend()
+        for step in range(num_steps):
+            choice = rng.random()
+            if choice < 0.6:
+                grid.set_cell(rng.randrange(grid.num_rows), rng.randrange(grid.num_cols), rng.randrange(4))
+            elif choice < 0.7:
+                grid.clear_row(rng.randrange(grid.num_rows))
+            elif choice < 0.8:
+                row = rng.randrange(grid.num_rows - 1)
+                grid.move_row_down(row, rng.randrange(1, grid.num_rows - row))
+            elif choice < 0.95:
+                for row in rng.sample(range(grid.num_rows), rng.randrange(1, 5)):
+                    for column in range(grid.num_cols):
+                        grid.set_cell(row, column, 1)
+                grid.clear_full_rows()
+            else:
+                state = grid.snapshot()
+                grid.clear_row(rng.randrange(grid.num_rows))
+                grid.restore(state)
+            rebuilt = backend()
+            for row in range(grid.num_rows):
+                for column in range(grid.num_cols):
+                    if not grid.is_empty(row, column):
+                        rebuilt.set_cell(row, column, 1)
+            if indexes(grid) != indexes(rebuilt):
+                raise AssertionError(f"{name}: indexes differ from a rebuilt grid at step {step}")
+        results[name] = num_steps
+    return results
+
+
+def measure_call(func, repeat=100000):
+    """Measure the time and the transient memory of a function call.
+
+    Args:
+        func (callable): The function to call without arguments.
+        repeat (int): The number of calls to time.
+
+    Returns:
+        tuple: The time per call in nanoseconds and the peak number of bytes
+            allocated during a single call.
+    """
+    func()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1e9, peak
+
+
+def bench_allocations():
+    """Compare collision checks through Position lists with the shape tables.
+
+    Returns:
+        dict: For each case, the time per call in nanoseconds and the peak
+            bytes allocated per call.
+    """
+    results = {}
+    for name, backend in GRID_BACKENDS.items():
+        game = Game(backend())
+        game.move_down()
+        block = game.current_block
+        grid = game.grid
+        results[f"{name}: get_cell_positions + positions_fit (before)"] = measure_call(
+            lambda: grid.positions_fit(block.get_cell_positions()))
+        results[f"{name}: block_fits with shape tables (after)"] = measure_call(game.block_fits)
+        results[f"{name}: ghost_row from column heights"] = measure_call(game.ghost_row)
+    randomizer = BagRandomizer(0)
+    results["BagRandomizer.next_id"] = measure_call(randomizer.next_id)
+    results["BagRandomizer getstate + setstate"] = measure_call(
+        lambda: randomizer.setstate(randomizer.getstate()))
+    return results
+
+
+def bench_snapshot():
+    """Measure Game.snapshot and Game.restore on every grid backend.
+
+    Returns:
+        dict: For each case, the time per call in nanoseconds and the peak
+            bytes allocated per call.
+    """
+    results = {}
+    for name, backend in GRID_BACKENDS.items():
+        game = Game(backend(), 0)
+        play_random_pieces(game, 30, random.Random(0))
+        state = game.snapshot()
+        results[f"{name}: snapshot"] = measure_call(game.snapshot)
+        results[f"{name}: grid snapshot only"] = measure_call(game.grid.snapshot)
+        results[f"{name}: restore"] = measure_call(lambda: game.restore(state))
+    return results
+
+
+def bench_block_memory(num_blocks=100000):
+    """Measure the memory kept alive per Block instance.
+
+    Args:
+        num_blocks (int): The number of blocks to keep alive at once.
+
+    Returns:
+        float: The number of bytes allocated per live block.
+    """
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    blocks = [TBlock() for _ in range(num_blocks)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del blocks
+    return used / num_blocks
+
+
+def check_batch_game(num_games=32, min_rows=200, max_steps=20000, seed=0):
+    """Check that a BatchGame matches Game objects with the same seeds and actions.
+
+    Every game is played by an autoplayer, so rows are cleared, with a share
+    of its actions replaced by random ones to reach collisions the autoplayer
+    avoids; the share grows from none in the first game to almost all in the
+    last, so some games top out. Games that end are reset in both. After
+    every step the boards, blocks, next blocks, scores and game over flags
+    must be equal.
+
+    Args:
+        num_games (int): The number of games compared.
+        min_rows (int): The number of rows to clear over all games before stopping.
+        max_steps (int): The most steps to play.
+        seed (int): The seed of the games and of the random actions.
+
+    Returns:
+        dict: The number of steps played, rows cleared and games that ended.
+
+    Raises:
+        AssertionError: If a game differs, or too few rows were cleared.
+    """
+    seeds = [seed + index for index in range(num_games)]
+    games = [Game(seed=game_seed) for game_seed in seeds]
+    players = [AutoPlayer() for _ in range(num_games)]
+    batch = BatchGame(num_games, seeds)
+    rng = random.Random(seed)
+    rows = 0
+    steps = 0
+    resets = 0
+    while rows < min_rows and steps < max_steps:
+        over = [index for index, game in enumerate(games) if game.game_over]
+        for index in over:
+            games[index].reset()
+        if over:
+            batch.reset(over)
+            resets += len(over)
+        actions = []
+        for index, (game, player) in enumerate(zip(games, players)):
+            action = ACTION_METHODS.index(player.next_action(game))
+            if rng.random() < index / num_games:
+                action = rng.randrange(len(ACTION_METHODS))
+            actions.append(action)
+            if action:
+                getattr(game, ACTION_METHODS[action])()
+        cleared = batch.step(actions)
+        steps += 1
+        rows += int(cleared.sum())
+        pieces = (batch.piece.tolist(), batch.rotation.tolist(), batch.row.tolist(), batch.column.tolist(),
+                  batch.next_piece.tolist(), batch.score.tolist(), batch.game_over.tolist())
+        for index, game in enumerate(games):
+            block = game.current_block
+            expected = (block.id, block.rotation_state, block.row_offset, block.column_offset,
+                        game.next_block.id, game.score, game.game_over)
+            if tuple(values[index] for values in pieces) != expected or \
+                    batch.boards[index].tolist() != [list(row) for row in game.grid.grid]:
+                raise AssertionError(f"BatchGame game {index} differs from Game after {steps} steps")
+    if rows < min_rows:
+        raise AssertionError(f"only {rows} rows cleared in {steps} steps")
+    return {"steps": steps, "rows cleared": rows, "games ended": resets}
+
+
+def bench_batch_game(num_games=16384, num_steps=200, seed=0):
+    """Compare stepping Game objects one by one with stepping a BatchGame.
+
+    Both play the same random actions, for long enough that blocks lock and
+    games end. Games that end are reset.
+
+    Args:
+        num_games (int): The number of games stepped at once by the BatchGame.
+        num_steps (int): The number of actions applied to every game.
+        seed (int): The seed of the actions.
+
+    Returns:
+        dict: Game steps per second for the Game loop and for the BatchGame.
+    """
+    actions = np.random.default_rng(seed).choice(5, size=(num_steps, num_games), p=[0.1, 0.2, 0.2, 0.3, 0.2])
+    loop_games = min(num_games, 1000)
+    games = [Game(seed=index) for index in range(loop_games)]
+    start = time.perf_counter()
+    for step_actions in actions:
+        for game, action in zip(games, step_actions.tolist()):
+            if game.game_over:
+                game.reset()
+            elif action:
+                getattr(game, ACTION_METHODS[action])()
+    loop_rate = num_steps * loop_games / (time.perf_counter() - start)
+
+    batch = BatchGame(num_games)
+    start = time.perf_counter()
+    for step_actions in actions:
+        batch.step(step_actions)
+        if batch.game_over.any():
+            batch.reset(np.flatnonzero(batch.game_over))
+    batch_rate = num_steps * num_games / (time.perf_counter() - start)
+    return {"Game loop": loop_rate, "BatchGame": batch_rate}
+
+
+def bench_autoplayer(num_games=4, max_pieces=2500, budget=0.001):
+    """Soak the autoplayer on every grid backend and check its decision budget.
+
+    Args:
+        num_games (int): The number of seeded games played on each backend.
+        max_pieces (int): The number of pieces after which a game is stopped.
+        budget (float): The seconds one decision may take.
+
+    Returns:
+        dict: For each backend name, the pieces placed per second, the mean,
+            p99 and longest decision times and the longest decision CPU time
+            in microseconds, the searches cut short and the mean score.
+
+    Raises:
+        AssertionError: If the p99 decision time or the longest decision CPU
+            time is over the budget. The longest wall time is reported but not
+            checked, as it also counts the time the process was preempted.
+    """
+    results = {}
+    for name, backend in GRID_BACKENDS.items():
+        player = AutoPlayer(budget=budget)
+        pieces = 0
+        score = 0
+        start = time.perf_counter()
+        for seed in range(num_games):
+            game = Game(backend(), seed)
+            for _ in range(max_pieces):
+                if game.game_over:
+                    break
+                player.place(game)
+                pieces += 1
+            score += game.score
+        elapsed = time.perf_counter() - start
+        mean = player.decision_time / player.decisions
+        p99 = player.decision_percentile(0.99)
+        if p99 > budget:
+            raise AssertionError(f"{name}: 1% of autoplayer decisions take over {p99 * 1e6:.0f} us")
+        if player.max_decision_cpu_time > budget:
+            raise AssertionError(f"{name}: an autoplayer decision took "
+                                 f"{player.max_decision_cpu_time * 1e6:.0f} us of CPU time")
+        results[name] = (pieces / elapsed, mean * 1e6, p99 * 1e6, player.max_decision_time * 1e6,
+                         player.max_decision_cpu_time * 1e6, player.cut_short, score / num_games)
+    return results
+
+
+def bench_lookahead(num_frames=3000, gravity_frames=12, seed=0, max_bytes=LOOKAHEAD_TABLE_BYTES):
+    """Play one game with the two-block lookahead as the live loop does, with and without a table.
+
+    The player makes one move per frame and gravity moves the block down
+    every gravity_frames frames, so the player searches again for a block
+    every time gravity moves it, as it does in main.py and match.py.
+
+    Args:
+        num_frames (int): The number of frames played.
+        gravity_frames (int): The frames between two gravity steps.
+        seed (int): The seed of the game.
+        max_bytes (int): The approximate memory cap of each table.
+
+    Returns:
+        dict: For no table and for each policy, the mean decision time in
+            microseconds, the number of decisions, the score and the table report.
+
+    Raises:
+        AssertionError: If a table changes the moves, or if the mean decision
+            time with a table is over 70% of the time without one.
+    """
+    players = {"no table": LookaheadPlayer(use_table=False)}
+    for policy in ("lru", "depth"):
+        players[policy] = LookaheadPlayer(table=TranspositionTable(max_entries=1 << 20, max_bytes=max_bytes,
+                                                                   policy=policy))
+    results = {}
+    for name, player in players.items():
+        game = Game(BitboardGrid(), seed)
+        for frame in range(1, num_frames + 1):
+            if game.game_over:
+                break
+            if frame % gravity_frames == 0:
+                game.move_down()
+            getattr(game, player.next_action(game))()
+        mean = player.decision_time / player.decisions
+        report = player.table.report() if player.table is not None else ""
+        results[name] = (mean * 1e6, player.decisions, game.score, report)
+    baseline_mean, _, baseline_score, _ = results["no table"]
+    for name in ("lru", "depth"):
+        mean, _, score, _ = results[name]
+        if score != baseline_score:
+            raise AssertionError(f"{name}: the lookahead scored {score} with a table and {baseline_score} without")
+        if mean > 0.7 * baseline_mean:
+            raise AssertionError(f"{name}: lookahead decisions took {mean:.0f} us with a table and "
+                                 f"{baseline_mean:.0f} us without")
+    return results
+
+
+def bench_parallel_search(worker_counts=None, num_pieces=5, seed=0):
+    """Measure how the Monte Carlo search scales with the number of worker processes.
+
+    Every run plays the same pieces with a deadline long enough that no
+    rollout is cut, so the rate only depends on the workers.
+
+    Args:
+        worker_counts (list, optional): The pool sizes to try; 0 runs in this
+            process. Defaults to 0 and powers of two up to the number of cores.
+        num_pieces (int): The number of pieces placed per run.
+        seed (int): The seed of the game and of the rollouts.
+
+    Returns:
+        dict: Rollouts per second for each worker count.
+    """
+    if worker_counts is None:
+        cores = os.cpu_count() or 1
+        worker_counts = [0] + [2 ** power for power in range(cores.bit_length()) if 2 ** power <= cores]
+    results = {}
+    for workers in worker_counts:
+        with ParallelSearchPlayer(workers=workers, rollouts=32, deadline=60.0, seed=seed) as player:
+            game = Game(BitboardGrid(), seed)
+            # The first piece starts the worker processes and is not timed
+            player.place(game)
+            player.rollouts_done = 0
+            start = time.perf_counter()
+            for _ in range(num_pieces):
+                player.place(game)
+            results[workers] = player.rollouts_done / (time.perf_counter() - start)
+    return results
+
+
+def bench_zobrist(num_pieces=200000, seed=0, low_bits=32):
+    """Count Zobrist hash collisions between the distinct boards of a long headless run.
+
+    Half of the pieces are placed by the autoplayer and half at random, so
+    both tidy and ragged boards are seen. Every board after a lock is
+    recorded with its hash.
+
+    Args:
+        num_pieces (int): The number of pieces to lock.
+        seed (int): The seed of the games and of the random moves.
+        low_bits (int): The width of the truncated hash also checked, where
+            collisions are frequent enough to compare with the ideal rate.
+
+    Returns:
+        dict: The number of distinct boards, the number of those sharing a
+            full 64-bit hash with another board, and the collisions seen and
+            expected for an ideal hash of low_bits bits.
+    """
+    game = Game(BitboardGrid(), seed)
+    player = AutoPlayer()
+    rng = random.Random(seed)
+    boards = {}
+    for piece in range(num_pieces):
+        if piece % 2:
+            play_random_pieces(game, 1, rng)
+        else:
+            if game.game_over:
+                game.reset()
+            player.place(game)
+        boards[tuple(row_masks(game.grid))] = game.grid.zobrist_hash
+    hashes = {}
+    truncated = {}
+    mask = (1 << low_bits) - 1
+    for zobrist_hash in boards.values():
+        hashes[zobrist_hash] = hashes.get(zobrist_hash, 0) + 1
+        truncated[zobrist_hash & mask] = truncated.get(zobrist_hash & mask, 0) + 1
+    num_boards = len(boards)
+    return {
+        "distinct boards": num_boards,
+        "64-bit collisions": num_boards - len(hashes),
+        f"{low_bits}-bit collisions": num_boards - len(truncated),
+        f"{low_bits}-bit collisions expected": num_boards * (num_boards - 1) / 2 ** (low_bits + 1),
+    }
+
+
+def best_of(func, repeat, rounds=5):
+    """Time a function call, keeping the fastest of several rounds to cut noise.
+
+    Args:
+        func (callable): The function to call without arguments.
+        repeat (int): The number of calls per round.
+        rounds (int): The number of rounds.
+
+    Returns:
+        float: The time per call in nanoseconds in the fastest round.
+    """
+    func()
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / repeat * 1e9
+
+
+def crafted_board(grid, full_rows, scattered=False, depth=8):
+    """Fill the bottom of a grid with full rows and rows with one hole each.
+
+    Args:
+        grid (Grid): The grid to fill, of any backend; it is reset first.
+        full_rows (int): The number of full rows.
+        scattered (bool): Whether the full rows alternate with partial rows
+            instead of being stacked at the bottom.
+        depth (int): The number of rows filled at the bottom.
+    """
+    grid.reset()
+    bottom = grid.num_rows - 1
+    step = 2 if scattered else 1
+    full = set(range(bottom, bottom - step * full_rows, -step))
+    for row in range(bottom, bottom - depth, -1):
+        hole = None if row in full else row * 3 % grid.num_cols
+        for column in range(grid.num_cols):
+            if column != hole:
+                grid.set_cell(row, column, (row + column) % 7 + 1)
+
+
+def bench_clear_full_rows(repeat=2000):
+    """Time Grid.clear_full_rows on crafted boards on every grid backend.
+
+    Every call starts from the same board, restored from a snapshot, so the
+    times include a restore; the restore alone is timed too for reference.
+    It is not subtracted, since the difference is too noisy to compare
+    between runs when few rows are cleared.
+
+    Returns:
+        dict: For each backend and board, the nanoseconds per restore and clear.
+    """
+    results = {}
+    boards = [(f"{count} full", count, False) for count in range(5)] + [("4 scattered", 4, True)]
+    for name, backend in GRID_BACKENDS.items():
+        grid = backend()
+        for board, full_rows, scattered in boards:
+            crafted_board(grid, full_rows, scattered)
+            state = grid.snapshot()
+
+            def restore_and_clear():
+                grid.restore(state)
+                grid.clear_full_rows()
+
+            results[f"restore + clear_full_rows {name} {board}"] = best_of(restore_and_clear, repeat)
+        results[f"restore only {name}"] = best_of(lambda: grid.restore(state), repeat)
+    return results
+
+
+def bench_hot_paths(repeat=20000):
+    """Time the collision checks, cell positions and piece generation on every grid backend.
+
+    Returns:
+        dict: For each call and backend, the nanoseconds per call.
+    """
+    results = {}
+    for name, backend in GRID_BACKENDS.items():
+        game = Game(backend(), 0)
+        crafted_board(game.grid, 0)
+        game.move_down()
+        results[f"block_fits {name}"] = best_of(game.block_fits, repeat)
+        results[f"block_inside {name}"] = best_of(game.block_inside, repeat)
+    block = Game(seed=0).current_block
+    results["get_cell_positions"] = best_of(block.get_cell_positions, repeat)
+    results["get_random_block"] = best_of(Game(seed=0).get_random_block, repeat)
+    return results
+
+
+def bench_headless_games(num_games=300, seed=0):
+    """Play whole games of random drops on every grid backend until they end.
+
+    Returns:
+        dict: For each backend, the games finished per second.
+    """
+    results = {}
+    for name, backend in GRID_BACKENDS.items():
+        start = time.perf_counter()
+        for index in range(num_games):
+            game = Game(backend(), seed + index)
+            rng = random.Random(seed + index)
+            while play_random_pieces(game, 1, rng) == 0:
+                pass
+        results[f"headless games {name}"] = num_games / (time.perf_counter() - start)
+    return results
+
+
+def bench_draw(num_frames=300):
+    """Measure how many frames per second Grid.draw and Game.draw can produce.
+
+    Returns:
+        dict: The frames per second of each draw call on a crafted board.
+    """
+    pygame.display.init()
+    screen = pygame.display.set_mode((500, 620))
+    game = Game(seed=0)
+    crafted_board(game.grid, 0)
+    results = {}
+    for name, draw in (("Grid.draw", game.grid.draw), ("Game.draw", game.draw)):
+        results[f"{name} fps"] = 1e9 / best_of(lambda: draw(screen), num_frames)
+    pygame.display.quit()
+    return results
+
+
+def bench_array_renderer(num_boards=8, cell_size=16, num_frames=300):
+    """Compare drawing a wall of boards with the NumPy array renderer and with the tile atlas.
+
+    Args:
+        num_boards (int, optional): The number of boards drawn per frame.
+        cell_size (int, optional): The size of each cell in pixels.
+        num_frames (int, optional): The number of frames per round.
+
+    Returns:
+        dict: The nanoseconds per frame of each rendering path.
+    """
+    pygame.display.init()
+    game = Game(seed=0)
+    grid = game.grid
+    crafted_board(grid, 0)
+    renderer = BoardArrayRenderer(grid.num_rows, grid.num_cols, cell_size, grid.colors)
+    atlas = get_tile_atlas(cell_size, grid.colors)
+    width = grid.num_cols * cell_size + 10
+    screen = pygame.Surface((num_boards * width, grid.num_rows * cell_size), 0, 32)
+    offsets = [(index * width, 0) for index in range(num_boards)]
+    board = board_array(grid)
+    boards = [board] * num_boards
+
+    def draw_tiles():
+        for offset_x, offset_y in offsets:
+            screen.blits(atlas.grid_blits(grid, offset_x, offset_y), doreturn=False)
+
+    results = {
+        f"BoardArrayRenderer {num_boards} boards": best_of(
+            lambda: renderer.draw_boards(boards, screen, offsets), num_frames),
+        f"TileAtlas {num_boards} boards": best_of(draw_tiles, num_frames),
+    }
+    pygame.display.quit()
+    return results
+
+
+def play_match_frame(match, frame, gravity_frames, actions=None):
+    """Run the simulation of one match frame as the match loop does.
+
+    Args:
+        match (Match): The match to advance; every player is a computer player.
+        frame (int): The number of the frame, from 1.
+        gravity_frames (int): The frames between two gravity steps.
+        actions (list, optional): The replay action of every player, NOOP for
+            none. Defaults to letting the autoplayers choose.
+
+    Returns:
+        list: The replay action every player made.
+    """
+    if frame % gravity_frames == 0:
+        match.tick()
+    if actions is None:
+        actions = [NOOP] * len(match.games)
+        if not match.over:
+            for player, autoplayer in match.autoplayers:
+                game = match.games[player]
+                if not game.game_over:
+                    actions[player] = ACTION_METHODS.index(autoplayer.next_action(game))
+                    apply_action(game, actions[player])
+    else:
+        for game, action in zip(match.games, actions):
+            if action != NOOP:
+                apply_action(game, action)
+    if match.over:
+        match.restart()
+    return actions
+
+
+def bench_match(num_frames=300, gravity_frames=12, max_ratio=2.0):
+    """Measure the time of one frame of a local match for every number of players.
+
+    The moves of autoplayers are recorded first and replayed in the timed
+    frames, so the times cover dispatching the moves, gravity and drawing
+    the whole match in one pass, but not the autoplayer search.
+
+    Args:
+        num_frames (int): The number of frames per round.
+        gravity_frames (int): The frames between two gravity steps.
+        max_ratio (float): The most an 8 player frame may cost, as a multiple
+            of a 2 player frame.
+
+    Returns:
+        dict: The nanoseconds per frame for each number of players.
+
+    Raises:
+        AssertionError: If the frames of the most players cost more than
+            max_ratio times the frames of the fewest.
+    """
+    pygame.display.init()
+    pygame.font.init()
+    results = {}
+    total_frames = 1 + 5 * num_frames
+    for num_players in range(MIN_PLAYERS, MAX_PLAYERS + 1, 2):
+        match = Match(num_players, humans=0, seed=0)
+        moves = [play_match_frame(match, frame, gravity_frames) for frame in range(1, total_frames + 1)]
+        match = Match(num_players, humans=0, seed=0)
+        renderer = MatchRenderer(match.games, match.labels)
+        screen = pygame.Surface(renderer.size)
+        frames = [0]
+
+        def frame():
+            frames[0] += 1
+            play_match_frame(match, frames[0], gravity_frames, moves[frames[0] - 1])
+            renderer.draw(screen, match.winner)
+
+        results[f"match frame {num_players} players"] = best_of(frame, num_frames)
+    pygame.display.quit()
+    ratio = results[f"match frame {MAX_PLAYERS} players"] / results[f"match frame {MIN_PLAYERS} players"]
+    if ratio > max_ratio:
+        raise AssertionError(f"a {MAX_PLAYERS} player match frame costs {ratio:.2f} times "
+                             f"a {MIN_PLAYERS} player one")
+    return results
+
+
+def check_match_renderer(seed=0):
+    """Check that MatchRenderer redraws a board whose cells change color but not place.
+
+    Two I blocks dropped one on the other and two O blocks side by side fill
+    the same eight cells, so both boards have the same grid hash, which
+    leaves colors out.
+
+    Raises:
+        AssertionError: If the cached board surface differs from one drawn
+            afresh for the same board.
+    """
+    pygame.font.init()
+    game = Game(BitboardGrid(), seed)
+    renderer = MatchRenderer([game], ["check"])
+    screen = pygame.Surface(renderer.size)
+    start = game.snapshot()
+    for blocks in (((IBlock(), 0), (IBlock(), 0)), ((OBlock(), -1), (OBlock(), 1))):
+        game.restore(start)
+        for block, column_shift in blocks:
+            block.move(0, column_shift)
+            game.current_block = block
+            game.hard_drop()
+        renderer.draw(screen)
+    fresh = MatchRenderer([game], ["check"])
+    fresh.draw(screen)
+    if pygame.image.tobytes(renderer.boards[0], "RGB") != pygame.image.tobytes(fresh.boards[0], "RGB"):
+        raise AssertionError("MatchRenderer kept drawing a board after its cells changed color")
+
+
+def run_suite():
+    """Run the hot-path suite.
+
+    Returns:
+        dict: For each benchmark name, a dict with its "value", its "unit"
+            and whether "higher" or "lower" values are "better".
+    """
+    results = {}
+    for timings in (bench_clear_full_rows(), bench_hot_paths(), bench_array_renderer(), bench_match()):
+        for name, nanoseconds in timings.items():
+            results[name] = {"value": nanoseconds, "unit": "ns", "better": "lower"}
+    for name, games_per_second in bench_headless_games().items():
+        results[name] = {"value": games_per_second, "unit": "games/s", "better": "higher"}
+    for name, frames_per_second in bench_draw().items():
+        results[name] = {"value": frames_per_second, "unit": "fps", "better": "higher"}
+    return results
+
+
+def find_regressions(results, baseline, threshold=0.1):
+    """Compare suite results with a baseline run.
+
+    Args:
+        results (dict): The results returned by run_suite.
+        baseline (dict): Results of an earlier run, as saved in its JSON file.
+        threshold (float): The relative slowdown tolerated, e.g. 0.1 for 10%.
+
+    Returns:
+        list: (name, baseline value, new value, relative change) of every
+            result worse than the baseline by more than the threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["value"]
+        new = result["value"]
+        if old <= 0:
+            continue
+        change = (new - old) / old
+        worse = change > threshold if result["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def argument(flag, default=None):
+    """Get the value following a command line flag.
+
+    Args:
+        flag (str): The flag, e.g. "--json".
+        default (optional): The value when the flag is absent.
+
+    Returns:
+        str: The value given after the flag, or the default.
+    """
+    return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+
+if __name__ == "__main__":
+    suite = run_suite()
+    for name, result in suite.items():
+        print(f"{name:50s} {result['value']:12.1f} {result['unit']}")
+    json_path = argument("--json")
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump({"python": platform.python_version(), "pygame": pygame.version.ver,
+                       "machine": platform.machine(), "results": suite}, file, indent=2)
+    baseline_path = argument("--baseline")
+    if baseline_path:
+        with open(baseline_path) as file:
+            baseline = json.load(file)["results"]
+        regressions = find_regressions(suite, baseline, float(argument("--threshold", 0.1)))
+        for name, old, new, change in regressions:
+            print(f"regression: {name} {old:.1f} -> {new:.1f} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {baseline_path}")
+    if "--suite" in sys.argv:
+        sys.exit(0)
+    print()
+    for name, pieces_per_second in bench_grid_backends().items():
+        print(f"{name:10s} {pieces_per_second:10.0f} pieces/s")
+    for name, steps in check_grid_indexes().items():
+        print(f"{name:10s} indexes match a rebuilt grid after {steps} steps")
+    check_match_renderer()
+    print("MatchRenderer redraws boards whose cells change color")
+    print()
+    for name, (nanoseconds, peak) in bench_allocations().items():
+        print(f"{name:55s} {nanoseconds:8.0f} ns {peak:6d} bytes")
+    print()
+    for name, (nanoseconds, peak) in bench_snapshot().items():
+        print(f"{name:55s} {nanoseconds:8.0f} ns {peak:6d} bytes")
+    print()
+    print(f"{'memory per live block':55s} {bench_block_memory():8.0f} bytes")
+    print()
+    for name, count in check_batch_game().items():
+        print(f"BatchGame matches Game: {count:6d} {name}")
+    batch_rates = bench_batch_game()
+    for name, steps_per_second in batch_rates.items():
+        print(f"{name:10s} {steps_per_second:12.0f} game steps/s")
+    print(f"BatchGame speedup over the Game loop: {batch_rates['BatchGame'] / batch_rates['Game loop']:.0f}x")
+    print()
+    for name, (pieces_per_second, mean, p99, longest, cpu, cut_short, score) in bench_autoplayer().items():
+        print(f"autoplayer {name:10s} {pieces_per_second:8.0f} pieces/s, decisions mean {mean:4.0f} us "
+              f"p99 {p99:4.0f} us max {longest:5.0f} us ({cpu:4.0f} us CPU), {cut_short} cut short, "
+              f"mean score {score:.0f}")
+    print()
+    for name, (mean, decisions, score, report) in bench_lookahead().items():
+        print(f"lookahead {name:8s} {decisions:4d} decisions, mean {mean:6.0f} us, score {score}")
+        if report:
+            print(f"    {report}")
+    print()
+    for workers, rate in bench_parallel_search().items():
+        print(f"parallel search {workers:3d} workers {rate:10.0f} rollouts/s")
+    print()
+    for name, value in bench_zobrist().items():
+        print(f"zobrist {name:30s} {value:10.1f}")
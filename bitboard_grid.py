@@ -0,0 +1,226 @@
+from grid import Grid
+
+class BitboardGrid(Grid):
+    """A game grid that keeps cell occupancy as one integer bitmask per row.
+
+    Bit ``c`` of ``rows[r]`` is set when the cell at row ``r``, column ``c`` is
+    occupied. The block ids are still kept in the ``grid`` side array so that
+    drawing and the rest of the Grid API behave exactly like Grid.
+
+    Attributes:
+        rows (list): One occupancy bitmask per grid row.
+        full_row (int): The bitmask of a row with every column occupied.
+        Inherits all other attributes from the Grid class.
+
+    Methods:
+        Overrides the occupancy queries and updates of the Grid class so they
+        work on the row bitmasks. Inherits all other methods from the Grid class.
+    """
+
+    def __init__(self):
+        """Initialize a BitboardGrid object."""
+        super().__init__()
+        self.full_row = (1 << self.num_cols) - 1
+        self.rows = [0] * self.num_rows
+
+    def is_empty(self, row, column):
+        """Check if a cell at a given row and column index is empty.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+
+        Returns:
+            bool: True if the cell is empty, False otherwise.
+        """
+        return not self.rows[row] >> column & 1
+
+    def positions_fit(self, positions):
+        """Check if all positions are inside the grid and empty.
+
+        Args:
+            positions (list): The Position objects to test.
+
+        Returns:
+            bool: True if every position is inside the grid and empty, False otherwise.
+        """
+        rows = self.rows
+        num_rows = self.num_rows
+        num_cols = self.num_cols
+        for position in positions:
+            row = position.row
+            column = position.column
+            if row < 0 or row >= num_rows or column < 0 or column >= num_cols:
+                return False
+            if rows[row] >> column & 1:
+                return False
+        return True
+
+    def set_cell(self, row, column, value):
+        """Set the value of a single cell.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+            value (int): The block id to store, or 0 to empty the cell.
+        """
+        was_filled = self.rows[row] >> column & 1
+        values = self.grid[row]
+        if self._shared_rows and id(values) in self._shared_rows:
+            values = self._unshare_row(row)
+        values[column] = value
+        if value:
+            self.rows[row] |= 1 << column
+        else:
+            self.rows[row] &= ~(1 << column)
+        if was_filled != (value != 0):
+            self._index_cell(row, column, not was_filled)
+
+    def shape_fits(self, shape, row_offset, column_offset):
+        """Check if a shape placed at an offset is inside the grid and empty.
+
+        Each occupied row of the shape is tested with a single AND against
+        the matching row bitmask.
+
+        Args:
+            shape (Shape): The precomputed shape to test.
+            row_offset (int): The row the shape's origin is placed at.
+            column_offset (int): The column the shape's origin is placed at.
+
+        Returns:
+            bool: True if every cell of the shape is inside the grid and empty, False otherwise.
+        """
+        if (row_offset + shape.min_row < 0 or row_offset + shape.max_row >= self.num_rows
+                or column_offset + shape.min_column < 0 or column_offset + shape.max_column >= self.num_cols):
+            return False
+        rows = self.rows
+        if column_offset >= 0:
+            for row, mask in shape.row_masks:
+                if rows[row + row_offset] & mask << column_offset:
+                    return False
+        else:
+            for row, mask in shape.row_masks:
+                if rows[row + row_offset] & mask >> -column_offset:
+                    return False
+        return True
+
+    def place_shape(self, shape, row_offset, column_offset, value):
+        """Write a shape placed at an offset into the grid.
+
+        Args:
+            shape (Shape): The precomputed shape to write.
+            row_offset (int): The row the shape's origin is placed at.
+            column_offset (int): The column the shape's origin is placed at.
+            value (int): The block id to store in the shape's cells.
+        """
+        grid = self.grid
+        rows = self.rows
+        shared_rows = self._shared_rows
+        for row, column in shape.cells:
+            row += row_offset
+            column += column_offset
+            if shared_rows and id(grid[row]) in shared_rows:
+                self._unshare_row(row)
+            grid[row][column] = value
+            if not rows[row] >> column & 1:
+                self._index_cell(row, column, True)
+        for row, mask in shape.row_masks:
+            if column_offset >= 0:
+                rows[row + row_offset] |= mask << column_offset
+            else:
+                rows[row + row_offset] |= mask >> -column_offset
+
+    def _row_mask(self, row):
+        """Get the occupancy bitmask of a row, which the grid already keeps.
+
+        Args:
+            row (int): The row index.
+
+        Returns:
+            int: The bitmask of the occupied cells of the row.
+        """
+        return self.rows[row]
+
+    def is_row_full(self, row):
+        """Check if a given row is full (contains no empty cells).
+
+        Args:
+            row (int): The row index.
+
+        Returns:
+            bool: True if the row is full, False otherwise.
+        """
+        return self.rows[row] == self.full_row
+
+    def clear_row(self, row):
+        """Clear all cells in a given row.
+
+        Args:
+            row (int): The row index.
+        """
+        mask = self.rows[row]
+        self.grid[row] = [0] * self.num_cols
+        self.rows[row] = 0
+        self._index_cleared_row(row, mask)
+
+    def move_row_down(self, row, num_rows):
+        """Move all cells in a row down by a given number of rows, replacing the cells there.
+
+        Args:
+            row (int): The row index.
+            num_rows (int): The number of rows to move down.
+        """
+        self.clear_row(row + num_rows)
+        mask = self.rows[row]
+        self.grid[row + num_rows] = self.grid[row]
+        self.rows[row + num_rows] = mask
+        self.grid[row] = [0] * self.num_cols
+        self.rows[row] = 0
+        self._index_moved_row(row, num_rows, mask)
+
+    def clear_full_rows(self):
+        """Clear all full rows in the grid and move cells above down.
+
+        The full rows are spliced out of both lists and the same number of
+        empty rows is inserted at the top, so no cell is copied one by one.
+
+        Returns:
+            int: The number of rows cleared.
+        """
+        rows = self.rows
+        full_row = self.full_row
+        if full_row not in rows:
+            return 0
+        full_rows = []
+        for row in range(self.num_rows - 1, -1, -1):
+            if rows[row] == full_row:
+                del rows[row]
+                del self.grid[row]
+                full_rows.append(row)
+        completed = len(full_rows)
+        rows[0:0] = [0] * completed
+        self.grid[0:0] = [[0] * self.num_cols for _ in range(completed)]
+        self._index_cleared_rows(full_rows)
+        return completed
+
+    def reset(self):
+        """Reset the grid to its initial state with all cells empty."""
+        super().reset()
+        self.rows = [0] * self.num_rows
+
+    def snapshot(self):
+        """Capture the cells, row bitmasks and indexes of the grid for restore.
+
+        Returns:
+            tuple: The state to pass to restore.
+        """
+        return super().snapshot(), tuple(self.rows)
+
+    def restore(self, state):
+        """Return the grid to a captured state; the state can be restored again later.
+
+        Args:
+            state (tuple): A state returned by snapshot.
+        """
+        super().restore(state[0])
+        self.rows = list(state[1])
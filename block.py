@@ -1,18 +1,26 @@
 from colors import Colors
-import pygame
 from position import Position
+from zobrist import BLOCK_KEYS, BLOCK_ROW_KEYS, BLOCK_COLUMN_KEYS, BLOCK_OFFSET
 
 class Block:
     """A class representing a block in a grid-based game.
 
+    A block is a small record of its piece type, rotation and offsets. All
+    shape data lives in the shared, immutable PieceType, so keeping many
+    blocks alive (e.g. in search trees or replay buffers) is cheap.
+
     Attributes:
+        piece_type (PieceType): The shared description of this kind of block.
         id (int): The identifier of the block.
+        shapes (tuple): The precomputed Shape of every rotation state, shared by all blocks of a kind.
+        shape (Shape): The Shape of the current rotation state.
         cells (dict): A dictionary containing the positions of cells in different rotation states.
         cell_size (int): The size of each cell in pixels.
         row_offset (int): The offset in rows from the original position.
         column_offset (int): The offset in columns from the original position.
         rotation_state (int): The current rotation state of the block.
-        colors (list): A list of colors for the cells in the block.
+        colors (list): A list of colors for the cells in the block, shared by all blocks.
+        zobrist_hash (int): The 64-bit Zobrist hash of the block's kind, rotation and offsets.
 
     Methods:
         move(rows, columns): Move the block by the specified number of rows and columns.
@@ -22,19 +30,52 @@ class Block:
         draw(screen, offset_x, offset_y): Draw the block on the screen with the specified offset.
     """
 
-    def __init__(self, id):
-        """Initialize a Block object.
+    __slots__ = ("piece_type", "row_offset", "column_offset", "rotation_state")
+
+    cell_size = 30
+    colors = Colors.get_cell_colors()
+
+    def __init__(self, piece_type):
+        """Initialize a Block object at the spawn position of its piece type.
 
         Args:
-            id (int): The identifier of the block.
+            piece_type (PieceType): The shared description of this kind of block.
         """
-        self.id = id
-        self.cells = {}
-        self.cell_size = 30
-        self.row_offset = 0
-        self.column_offset = 0
+        self.piece_type = piece_type
+        self.row_offset = piece_type.spawn_row
+        self.column_offset = piece_type.spawn_column
         self.rotation_state = 0
-        self.colors = Colors.get_cell_colors()
+
+    @property
+    def id(self):
+        """int: The identifier of the block."""
+        return self.piece_type.id
+
+    @property
+    def shapes(self):
+        """tuple: The precomputed Shape of every rotation state."""
+        return self.piece_type.shapes
+
+    @property
+    def cells(self):
+        """dict: The cell positions of every rotation state, without offsets."""
+        return {state: [Position(row, column) for row, column in shape.cells]
+                for state, shape in enumerate(self.piece_type.shapes)}
+
+    @property
+    def shape(self):
+        """Shape: The precomputed Shape of the current rotation state."""
+        return self.piece_type.shapes[self.rotation_state]
+
+    @property
+    def zobrist_hash(self):
+        """int: The 64-bit Zobrist hash of the block's kind, rotation state and offsets.
+
+        It is three table lookups, so it is as cheap as keeping it updated on every move.
+        """
+        return (BLOCK_KEYS[self.piece_type.id][self.rotation_state]
+                ^ BLOCK_ROW_KEYS[self.row_offset + BLOCK_OFFSET]
+                ^ BLOCK_COLUMN_KEYS[self.column_offset + BLOCK_OFFSET])
 
     def move(self, rows, columns):
         """Move the block by the specified number of rows and columns.
@@ -52,24 +93,22 @@ class Block:
         Returns:
             list: A list of Position objects representing the cell positions.
         """
-        tiles = self.cells[self.rotation_state]
         moved_tiles = []
-        for position in tiles:
-            position = Position(position.row + self.row_offset, position.column + self.column_offset)
-            moved_tiles.append(position)
+        for row, column in self.piece_type.shapes[self.rotation_state].cells:
+            moved_tiles.append(Position(row + self.row_offset, column + self.column_offset))
         return moved_tiles
 
     def rotate(self):
         """Rotate the block clockwise by 90 degrees."""
         self.rotation_state += 1
-        if self.rotation_state == len(self.cells):
+        if self.rotation_state == len(self.piece_type.shapes):
             self.rotation_state = 0
 
     def undo_rotation(self):
         """Undo the last rotation of the block."""
         self.rotation_state -= 1
         if self.rotation_state == -1:
-            self.rotation_state = len(self.cells) - 1
+            self.rotation_state = len(self.piece_type.shapes) - 1
 
     def draw(self, screen, offset_x, offset_y):
         """Draw the block on the screen with the specified offset.
@@ -79,8 +118,5 @@ class Block:
             offset_x (int): The x-coordinate offset.
             offset_y (int): The y-coordinate offset.
         """
-        tiles = self.get_cell_positions()
-        for tile in tiles:
-            tile_rect = pygame.Rect(offset_x + tile.column * self.cell_size, 
-                offset_y + tile.row * self.cell_size, self.cell_size -1, self.cell_size -1)
-            pygame.draw.rect(screen, self.colors[self.id], tile_rect)
\ No newline at end of file
+        from renderer import draw_block
+        draw_block(self, screen, offset_x, offset_y)
\ No newline at end of file
@@ -1,10 +1,57 @@
 from block import Block
-from position import Position
+from shapes import PieceType, build_shapes
+
+# The shared, immutable description of every kind of block: id, name, one
+# shape per rotation state and the spawn offset
+L_PIECE = PieceType(1, "L", build_shapes((
+    ((0, 2), (1, 0), (1, 1), (1, 2)),
+    ((0, 1), (1, 1), (2, 1), (2, 2)),
+    ((1, 0), (1, 1), (1, 2), (2, 0)),
+    ((0, 0), (0, 1), (1, 1), (2, 1)),
+)), 0, 3)
+J_PIECE = PieceType(2, "J", build_shapes((
+    ((0, 0), (1, 0), (1, 1), (1, 2)),
+    ((0, 1), (0, 2), (1, 1), (2, 1)),
+    ((1, 0), (1, 1), (1, 2), (2, 2)),
+    ((0, 1), (1, 1), (2, 0), (2, 1)),
+)), 0, 3)
+I_PIECE = PieceType(3, "I", build_shapes((
+    ((1, 0), (1, 1), (1, 2), (1, 3)),
+    ((0, 2), (1, 2), (2, 2), (3, 2)),
+    ((2, 0), (2, 1), (2, 2), (2, 3)),
+    ((0, 1), (1, 1), (2, 1), (3, 1)),
+)), -1, 3)
+O_PIECE = PieceType(4, "O", build_shapes((
+    ((0, 0), (0, 1), (1, 0), (1, 1)),
+)), 0, 4)
+S_PIECE = PieceType(5, "S", build_shapes((
+    ((0, 1), (0, 2), (1, 0), (1, 1)),
+    ((0, 1), (1, 1), (1, 2), (2, 2)),
+    ((1, 1), (1, 2), (2, 0), (2, 1)),
+    ((0, 0), (1, 0), (1, 1), (2, 1)),
+)), 0, 3)
+T_PIECE = PieceType(6, "T", build_shapes((
+    ((0, 1), (1, 0), (1, 1), (1, 2)),
+    ((0, 1), (1, 1), (1, 2), (2, 1)),
+    ((1, 0), (1, 1), (1, 2), (2, 1)),
+    ((0, 1), (1, 0), (1, 1), (2, 1)),
+)), 0, 3)
+Z_PIECE = PieceType(7, "Z", build_shapes((
+    ((0, 0), (0, 1), (1, 1), (1, 2)),
+    ((0, 2), (1, 1), (1, 2), (2, 1)),
+    ((1, 0), (1, 1), (2, 1), (2, 2)),
+    ((0, 1), (1, 0), (1, 1), (2, 0)),
+)), 0, 3)
+
+# PIECE_TYPES[id] is the PieceType with that block id; id 0 is the empty cell
+PIECE_TYPES = (None, L_PIECE, J_PIECE, I_PIECE, O_PIECE, S_PIECE, T_PIECE, Z_PIECE)
+
 
 class LBlock(Block):
     """A class representing an L-shaped block in a grid-based game.
 
-    Inherits from Block class.
+    Inherits from Block class. Instances only hold the position and rotation;
+    the shapes are shared through L_PIECE.
 
     Attributes:
         Inherits all attributes from the Block class.
@@ -13,21 +60,17 @@ class LBlock(Block):
         Inherits all methods from the Block class.
     """
 
+    __slots__ = ()
+
     def __init__(self):
         """Initialize an LBlock object."""
-        super().__init__(id=1)
-        self.cells = {
-            0: [Position(0, 2), Position(1, 0), Position(1, 1), Position(1, 2)],
-            1: [Position(0, 1), Position(1, 1), Position(2, 1), Position(2, 2)],
-            2: [Position(1, 0), Position(1, 1), Position(1, 2), Position(2, 0)],
-            3: [Position(0, 0), Position(0, 1), Position(1, 1), Position(2, 1)]
-        }
-        self.move(0, 3)
+        super().__init__(L_PIECE)
 
 class JBlock(Block):
-    """A class representing an J-shaped block in a grid-based game.
+    """A class representing a J-shaped block in a grid-based game.
 
-    Inherits from Block class.
+    Inherits from Block class. Instances only hold the position and rotation;
+    the shapes are shared through J_PIECE.
 
     Attributes:
         Inherits all attributes from the Block class.
@@ -36,20 +79,17 @@ class JBlock(Block):
         Inherits all methods from the Block class.
     """
 
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__(id = 2)
-        self.cells = {
-            0: [Position(0, 0), Position(1, 0), Position(1, 1), Position(1, 2)],
-            1: [Position(0, 1), Position(0, 2), Position(1, 1), Position(2, 1)],
-            2: [Position(1, 0), Position(1, 1), Position(1, 2), Position(2, 2)],
-            3: [Position(0, 1), Position(1, 1), Position(2, 0), Position(2, 1)]
-        }
-        self.move(0, 3)
+        """Initialize a JBlock object."""
+        super().__init__(J_PIECE)
 
 class IBlock(Block):
     """A class representing an I-shaped block in a grid-based game.
 
-    Inherits from Block class.
+    Inherits from Block class. Instances only hold the position and rotation;
+    the shapes are shared through I_PIECE.
 
     Attributes:
         Inherits all attributes from the Block class.
@@ -58,20 +98,17 @@ class IBlock(Block):
         Inherits all methods from the Block class.
     """
 
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__(id = 3)
-        self.cells = {
-            0: [Position(1, 0), Position(1, 1), Position(1, 2), Position(1, 3)],
-            1: [Position(0, 2), Position(1, 2), Position(2, 2), Position(3, 2)],
-            2: [Position(2, 0), Position(2, 1), Position(2, 2), Position(2, 3)],
-            3: [Position(0, 1), Position(1, 1), Position(2, 1), Position(3, 1)]
-        }
-        self.move(-1, 3)
+        """Initialize an IBlock object."""
+        super().__init__(I_PIECE)
 
 class OBlock(Block):
     """A class representing an O-shaped block in a grid-based game.
 
-    Inherits from Block class.
+    Inherits from Block class. Instances only hold the position and rotation;
+    the shapes are shared through O_PIECE.
 
     Attributes:
         Inherits all attributes from the Block class.
@@ -80,17 +117,17 @@ class OBlock(Block):
         Inherits all methods from the Block class.
     """
 
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__(id = 4)
-        self.cells = {
-            0: [Position(0, 0), Position(0, 1), Position(1, 0), Position(1, 1)]
-        }
-        self.move(0, 4)
+        """Initialize an OBlock object."""
+        super().__init__(O_PIECE)
 
 class SBlock(Block):
     """A class representing an S-shaped block in a grid-based game.
 
-    Inherits from Block class.
+    Inherits from Block class. Instances only hold the position and rotation;
+    the shapes are shared through S_PIECE.
 
     Attributes:
         Inherits all attributes from the Block class.
@@ -99,20 +136,17 @@ class SBlock(Block):
         Inherits all methods from the Block class.
     """
 
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__(id = 5)
-        self.cells = {
-            0: [Position(0, 1), Position(0, 2), Position(1, 0), Position(1, 1)],
-            1: [Position(0, 1), Position(1, 1), Position(1, 2), Position(2, 2)],
-            2: [Position(1, 1), Position(1, 2), Position(2, 0), Position(2, 1)],
-            3: [Position(0, 0), Position(1, 0), Position(1, 1), Position(2, 1)]
-        }
-        self.move(0, 3)
+        """Initialize an SBlock object."""
+        super().__init__(S_PIECE)
 
 class TBlock(Block):
-    """A class representing an T-shaped block in a grid-based game.
+    """A class representing a T-shaped block in a grid-based game.
 
-    Inherits from Block class.
+    Inherits from Block class. Instances only hold the position and rotation;
+    the shapes are shared through T_PIECE.
 
     Attributes:
         Inherits all attributes from the Block class.
@@ -121,20 +155,17 @@ class TBlock(Block):
         Inherits all methods from the Block class.
     """
 
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__(id = 6)
-        self.cells = {
-            0: [Position(0, 1), Position(1, 0), Position(1, 1), Position(1, 2)],
-            1: [Position(0, 1), Position(1, 1), Position(1, 2), Position(2, 1)],
-            2: [Position(1, 0), Position(1, 1), Position(1, 2), Position(2, 1)],
-            3: [Position(0, 1), Position(1, 0), Position(1, 1), Position(2, 1)]
-        }
-        self.move(0, 3)
+        """Initialize a TBlock object."""
+        super().__init__(T_PIECE)
 
 class ZBlock(Block):
-    """A class representing an Z-shaped block in a grid-based game.
+    """A class representing a Z-shaped block in a grid-based game.
 
-    Inherits from Block class.
+    Inherits from Block class. Instances only hold the position and rotation;
+    the shapes are shared through Z_PIECE.
 
     Attributes:
         Inherits all attributes from the Block class.
@@ -143,12 +174,8 @@ class ZBlock(Block):
         Inherits all methods from the Block class.
     """
 
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__(id = 7)
-        self.cells = {
-            0: [Position(0, 0), Position(0, 1), Position(1, 1), Position(1, 2)],
-            1: [Position(0, 2), Position(1, 1), Position(1, 2), Position(2, 1)],
-            2: [Position(1, 0), Position(1, 1), Position(2, 1), Position(2, 2)],
-            3: [Position(0, 1), Position(1, 0), Position(1, 1), Position(2, 0)]
-        }
-        self.move(0, 3)
\ No newline at end of file
+        """Initialize a ZBlock object."""
+        super().__init__(Z_PIECE)
\ No newline at end of file
@@ -1,51 +1,158 @@
+from collections import namedtuple
 from grid import Grid
 from blocks import *
-import random
-import pygame
+from randomizer import BagRandomizer
+from zobrist import NEXT_KEYS
+
+# Names of the events a Game emits to its listeners
+ROTATED = "rotated"
+LOCKED = "locked"
+LINES_CLEARED = "lines_cleared"
+GAME_OVER = "game_over"
+
+# Player actions, used by the batched engine and the environment API
+NOOP = 0
+MOVE_LEFT = 1
+MOVE_RIGHT = 2
+MOVE_DOWN = 3
+ROTATE = 4
+
+# ACTION_METHODS[action] is the name of the Game method performing that action
+ACTION_METHODS = (None, "move_left", "move_right", "move_down", "rotate")
+
+class GameState(namedtuple("GameState", ["board", "current", "next", "randomizer", "score", "game_over"])):
+    """A flat capture of everything a Game needs to continue, made by Game.snapshot.
+
+    Attributes:
+        board (tuple): The grid state returned by its snapshot method.
+        current (tuple): The (id, rotation state, row offset, column offset) of the current block.
+        next (tuple): The (id, rotation state, row offset, column offset) of the next block.
+        randomizer (tuple): The state of the game's BagRandomizer, with the bag.
+        score (int): The score.
+        game_over (bool): The game over flag.
+    """
+
+    __slots__ = ()
+
+
+def block_state(block):
+    """Get the flat (id, rotation state, row offset, column offset) tuple of a block.
+
+    Args:
+        block (Block): The block to capture.
+
+    Returns:
+        tuple: The block's state.
+    """
+    return block.piece_type.id, block.rotation_state, block.row_offset, block.column_offset
+
+
+def block_from_state(state):
+    """Build a block from a tuple returned by block_state.
+
+    Args:
+        state (tuple): The (id, rotation state, row offset, column offset) of the block.
+
+    Returns:
+        Block: A new block in that state.
+    """
+    block = Block(PIECE_TYPES[state[0]])
+    block.rotation_state = state[1]
+    block.row_offset = state[2]
+    block.column_offset = state[3]
+    return block
+
 
 class Game:
     """A class representing the main game logic and state.
 
     This class manages the game grid, blocks, player's score, and game state.
+    It is a pure-Python simulation: sound and drawing are left to listeners
+    and to the renderer module, so a Game can run without pygame.
 
     Attributes:
         grid (Grid): The game grid where blocks are placed.
-        blocks (list): A list of available blocks for the game.
         current_block (Block): The currently active block in the game.
         next_block (Block): The next block to appear in the game.
         game_over (bool): A flag indicating whether the game is over.
         score (int): The player's current score in the game.
-        rotate_sound (pygame.mixer.Sound): The sound effect for block rotation.
-        clear_sound (pygame.mixer.Sound): The sound effect for clearing lines.
+        randomizer (BagRandomizer): The seeded randomizer drawing piece ids from the bag.
+        listeners (list): Callables notified as listener(event, *args) on game events.
+        board_version (int): The number of times the locked cells changed, by
+            locks, resets and restores; drawing code compares it to redraw
+            only boards that changed.
+        zobrist_hash (int): The 64-bit Zobrist hash of the board, the current block and the next block's kind.
 
     Methods:
+        add_listener(listener): Register a callable to be notified of game events.
+        remove_listener(listener): Stop notifying a previously registered listener.
+        notify(event, *args): Notify all listeners of a game event.
         update_score(lines_cleared, move_down_points): Update the player's score based on cleared lines and move points.
         get_random_block(): Get a random block from the available blocks.
         move_left(): Move the current block to the left if possible.
         move_right(): Move the current block to the right if possible.
         move_down(): Move the current block down if possible.
+        hard_drop(): Drop the current block straight to its landing row and lock it.
+        ghost_row(): Get the row offset the current block would land at.
         lock_block(): Lock the current block in place on the grid.
         reset(): Reset the game to its initial state.
-        block_fits(): Check if the current block fits within the grid boundaries.
+        block_fits(): Check if the current block is inside the grid and overlaps no locked cells.
         rotate(): Rotate the current block if possible.
         block_inside(): Check if the current block is inside the grid boundaries.
+        snapshot(): Capture the game state for restore.
+        restore(state): Return the game to a captured state.
         draw(screen): Draw the game elements on the provided Pygame screen.
 
     """
 
-    def __init__(self):
-        """Initialize a Game object."""
-        self.grid = Grid()
-        self.blocks = [IBlock(), JBlock(), LBlock(), OBlock(), SBlock(), TBlock(), ZBlock()]
+    def __init__(self, grid=None, seed=None):
+        """Initialize a Game object.
+
+        Args:
+            grid (Grid, optional): The grid backend to play on. Defaults to a new Grid;
+                any object with the Grid API, such as a BitboardGrid, can be used.
+            seed (int, optional): The seed of the block sequence. Games with the same
+                seed draw the same blocks; None seeds from the system.
+        """
+        self.grid = grid if grid is not None else Grid()
+        self.randomizer = BagRandomizer(seed)
         self.current_block = self.get_random_block()
         self.next_block = self.get_random_block()
         self.game_over = False
         self.score = 0
-        self.rotate_sound = pygame.mixer.Sound("Sounds/rotate.ogg")
-        self.clear_sound = pygame.mixer.Sound("Sounds/clear.ogg")
+        self.listeners = []
+        self.board_version = 0
+
+    @property
+    def zobrist_hash(self):
+        """int: The 64-bit Zobrist hash of the board, the current block and the next block's kind."""
+        return self.grid.zobrist_hash ^ self.current_block.zobrist_hash ^ NEXT_KEYS[self.next_block.id]
+
+    def add_listener(self, listener):
+        """Register a callable to be notified of game events.
+
+        Args:
+            listener (callable): Called as listener(event, *args) for every event.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop notifying a previously registered listener.
+
+        Args:
+            listener (callable): The listener to remove.
+        """
+        self.listeners.remove(listener)
+
+    def notify(self, event, *args):
+        """Notify all listeners of a game event.
 
-        pygame.mixer.music.load("Sounds/music.ogg")
-        pygame.mixer.music.play(-1)
+        Args:
+            event (str): The name of the event, e.g. ROTATED or LINES_CLEARED.
+            *args: Extra data passed along with the event.
+        """
+        for listener in self.listeners:
+            listener(event, *args)
 
     def update_score(self, lines_cleared, move_down_points):
         """Update the player's score based on cleared lines and move points.
@@ -63,91 +170,132 @@ class Game:
         self.score += move_down_points
 
     def get_random_block(self):
-        """Get a random block from the available blocks.
+        """Get a new block of a random piece type drawn from the bag.
 
         Returns:
-            Block: A randomly selected block object.
+            Block: A new block at the spawn position of the drawn piece type.
         """
-        if len(self.blocks) == 0:
-            self.blocks = [IBlock(), JBlock(), LBlock(), OBlock(), SBlock(), TBlock(), ZBlock()]
-        block = random.choice(self.blocks)
-        self.blocks.remove(block)
-        return block
+        return Block(PIECE_TYPES[self.randomizer.next_id()])
 
     def move_left(self):
         """Move the current block to the left if possible."""
         self.current_block.move(0, -1)
-        if not self.block_inside() or not self.block_fits():
+        if not self.block_fits():
             self.current_block.move(0, 1)
 
     def move_right(self):
         """Move the current block to the right if possible."""
         self.current_block.move(0, 1)
-        if not self.block_inside() or not self.block_fits():
+        if not self.block_fits():
             self.current_block.move(0, -1)
 
     def move_down(self):
         """Move the current block down if possible."""
         self.current_block.move(1, 0)
-        if not self.block_inside() or not self.block_fits():
+        if not self.block_fits():
             self.current_block.move(-1, 0)
             self.lock_block()
 
+    def hard_drop(self):
+        """Drop the current block straight to its landing row and lock it.
+
+        Returns:
+            int: The number of rows the block fell.
+        """
+        block = self.current_block
+        rows = self.ghost_row() - block.row_offset
+        block.move(rows, 0)
+        self.lock_block()
+        return rows
+
+    def ghost_row(self):
+        """Get the row offset the current block would land at if dropped.
+
+        Returns:
+            int: The landing row offset, for hard drops and the ghost piece.
+        """
+        block = self.current_block
+        return self.grid.drop_row(block.shape, block.row_offset, block.column_offset)
+
     def lock_block(self):
         """Lock the current block in place on the grid."""
-        tiles = self.current_block.get_cell_positions()
-        for position in tiles:
-            self.grid.grid[position.row][position.column] = self.current_block.id
+        block = self.current_block
+        self.grid.place_shape(block.shape, block.row_offset, block.column_offset, block.id)
+        self.board_version += 1
         self.current_block = self.next_block
         self.next_block = self.get_random_block()
+        self.notify(LOCKED)
         rows_cleared = self.grid.clear_full_rows()
         if rows_cleared > 0:
-            self.clear_sound.play()
             self.update_score(rows_cleared, 0)
+            self.notify(LINES_CLEARED, rows_cleared)
         if not self.block_fits():
             self.game_over = True
+            self.notify(GAME_OVER)
 
     def reset(self):
         """Reset the game to its initial state."""
         self.grid.reset()
-        self.blocks = [IBlock(), JBlock(), LBlock(), OBlock(), SBlock(), TBlock(), ZBlock()]
+        self.board_version += 1
+        self.randomizer.new_bag()
         self.current_block = self.get_random_block()
         self.next_block = self.get_random_block()
         self.score = 0
         self.game_over = False
 
+    def snapshot(self):
+        """Capture the game state for restore.
+
+        The grid shares its rows with the snapshot until they are written, so
+        a snapshot copies no cells. Listeners are not part of the state.
+
+        Returns:
+            GameState: The captured state.
+        """
+        return GameState(self.grid.snapshot(), block_state(self.current_block), block_state(self.next_block),
+                         self.randomizer.getstate(), self.score, self.game_over)
+
+    def restore(self, state):
+        """Return the game to a captured state; the state can be restored again later.
+
+        Args:
+            state (GameState): A state returned by snapshot on a game with the same grid backend.
+        """
+        self.grid.restore(state.board)
+        self.board_version += 1
+        self.current_block = block_from_state(state.current)
+        self.next_block = block_from_state(state.next)
+        self.randomizer.setstate(state.randomizer)
+        self.score = state.score
+        self.game_over = state.game_over
+
     def block_fits(self):
-        """Check if the current block fits within the grid boundaries."""
-        tiles = self.current_block.get_cell_positions()
-        for tile in tiles:
-            if not self.grid.is_empty(tile.row, tile.column):
-                return False
-        return True
+        """Check if the current block is inside the grid and overlaps no locked cells."""
+        block = self.current_block
+        return self.grid.shape_fits(block.shape, block.row_offset, block.column_offset)
 
     def rotate(self):
         """Rotate the current block if possible."""
         self.current_block.rotate()
-        if not self.block_inside() or not self.block_fits():
+        if not self.block_fits():
             self.current_block.undo_rotation()
         else:
-            self.rotate_sound.play()
+            self.notify(ROTATED)
 
     def block_inside(self):
         """Check if the current block is inside the grid boundaries."""
-        tiles = self.current_block.get_cell_positions()
-        for tile in tiles:
-            if not self.grid.is_inside(tile.row, tile.column):
-                return False
-        return True
-
-    def draw(self, screen):
-        """Draw the game elements on the provided Pygame screen."""
-        self.grid.draw(screen)
-        self.current_block.draw(screen, 11, 11)
-
-        if self.next_block.id == 3:
-            self.next_block.draw(screen, 255, 290)
-        elif self.next_block.id == 4:
-            self.next_block.draw(screen, 255, 280)
-        else:
-            self.next_block.draw(screen, 270, 270)
\ No newline at end of file
+        block = self.current_block
+        shape = block.shape
+        return (self.grid.is_inside(block.row_offset + shape.min_row, block.column_offset + shape.min_column)
+                and self.grid.is_inside(block.row_offset + shape.max_row, block.column_offset + shape.max_column))
+
+    def draw(self, screen, alpha=0.0):
+        """Draw the game elements on the provided Pygame screen.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+            alpha (float, optional): The fraction of a cell the current block
+                has fallen towards its next row, for render interpolation.
+        """
+        from renderer import draw_game
+        draw_game(self, screen, alpha)
\ No newline at end of file
@@ -1,10 +1,16 @@
-import pygame
 from colors import Colors
+from zobrist import COLUMN_KEYS, MASK_64, cell_keys, rotate_left
 
 class Grid:
     """A class representing the game grid.
 
-    This class manages the grid where blocks are placed during the game.
+    This class manages the grid where blocks are placed during the game. It
+    also keeps indexes derived from the cells up to date as cells are set and
+    rows cleared, so that they never need a scan of the whole grid.
+
+    Snapshots share the row lists with the grid. A row that is shared with a
+    snapshot is copied before its first write (copy on write), so taking a
+    snapshot copies no cells and later moves only copy the rows they touch.
 
     Attributes:
         num_rows (int): The number of rows in the grid.
@@ -12,16 +18,28 @@ class Grid:
         cell_size (int): The size of each cell in pixels.
         grid (list): A 2D list representing the grid cells.
         colors (list): A list of colors for different cell values.
+        column_heights (tuple): The height of every column, read-only.
+        row_fill_counts (tuple): The number of occupied cells of every row, read-only.
+        column_holes (tuple): The number of holes of every column, read-only.
+        occupied_cells (int): The total number of occupied cells, read-only.
+        zobrist_hash (int): The 64-bit Zobrist hash of the occupied cells, read-only.
 
     Methods:
         print_grid(): Print the current state of the grid to the console.
         is_inside(row, column): Check if a given row and column index is inside the grid boundaries.
         is_empty(row, column): Check if a cell at a given row and column index is empty.
+        positions_fit(positions): Check if all positions are inside the grid and empty.
+        set_cell(row, column, value): Set the value of a single cell.
+        shape_fits(shape, row_offset, column_offset): Check if a shape placed at an offset is inside the grid and empty.
+        place_shape(shape, row_offset, column_offset, value): Write a shape placed at an offset into the grid.
+        drop_row(shape, row_offset, column_offset): Get the row offset a shape lands at when dropped.
         is_row_full(row): Check if a given row is full (contains no empty cells).
         clear_row(row): Clear all cells in a given row.
         move_row_down(row, num_rows): Move all cells in a row down by a given number of rows.
         clear_full_rows(): Clear all full rows in the grid and move cells above down.
         reset(): Reset the grid to its initial state with all cells empty.
+        snapshot(): Capture the cells and indexes of the grid for restore.
+        restore(state): Return the grid to a captured state.
         draw(screen): Draw the grid on the provided Pygame screen.
 
     """
@@ -33,6 +51,207 @@ class Grid:
         self.cell_size = 30
         self.grid = [[0 for j in range(self.num_cols)] for i in range(self.num_rows)]
         self.colors = Colors.get_cell_colors()
+        self._shared_rows = set()
+        self._reset_indexes()
+
+    @property
+    def column_heights(self):
+        """tuple: The height of every column, from the bottom row to its top occupied cell, or 0 if empty."""
+        return tuple(self._heights)
+
+    @property
+    def row_fill_counts(self):
+        """tuple: The number of occupied cells of every row."""
+        return tuple(self._row_counts)
+
+    @property
+    def column_holes(self):
+        """tuple: The number of empty cells below the top occupied cell of every column."""
+        return tuple(self._holes)
+
+    @property
+    def occupied_cells(self):
+        """int: The total number of occupied cells."""
+        return self._occupied
+
+    @property
+    def zobrist_hash(self):
+        """int: The 64-bit Zobrist hash of the occupied cells, see the zobrist module."""
+        return self._hash
+
+    def _reset_indexes(self):
+        """Reset the derived indexes to those of an empty grid."""
+        self._heights = [0] * self.num_cols
+        self._row_counts = [0] * self.num_rows
+        self._holes = [0] * self.num_cols
+        self._occupied = 0
+        self._cell_keys = cell_keys(self.num_rows, self.num_cols)
+        self._row_keys = [0] * self.num_rows
+        self._hash = 0
+
+    def _row_mask(self, row):
+        """Get the occupancy bitmask of a row, with bit c set for an occupied cell in column c.
+
+        Args:
+            row (int): The row index.
+
+        Returns:
+            int: The bitmask of the occupied cells of the row.
+        """
+        mask = 0
+        for column, value in enumerate(self.grid[row]):
+            if value != 0:
+                mask |= 1 << column
+        return mask
+
+    def _index_column_tops(self, columns, removed):
+        """Update the height and holes of columns whose top cell was removed or moved down.
+
+        The new tops are found from the row bitmasks, stopping at the first
+        occupied cell of every column, and the holes follow from the height
+        and the number of occupied cells, which only drops by the removed ones.
+
+        Args:
+            columns (int): The bitmask of the columns; their indexes still hold
+                the height and holes from before the change.
+            removed (int): The number of occupied cells each column lost.
+        """
+        if not columns:
+            return
+        heights = self._heights
+        holes = self._holes
+        filled = {}
+        start_row = self.num_rows
+        mask = columns
+        while mask:
+            lowest = mask & -mask
+            column = lowest.bit_length() - 1
+            filled[column] = heights[column] - holes[column] - removed
+            start_row = min(start_row, self.num_rows - heights[column])
+            heights[column] = 0
+            mask ^= lowest
+        pending = columns
+        for row in range(start_row, self.num_rows):
+            found = self._row_mask(row) & pending
+            pending ^= found
+            while found:
+                lowest = found & -found
+                heights[lowest.bit_length() - 1] = self.num_rows - row
+                found ^= lowest
+            if not pending:
+                break
+        for column, count in filled.items():
+            holes[column] = heights[column] - count
+
+    def _index_cell(self, row, column, filled):
+        """Update the derived indexes for a cell that was just filled or emptied.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+            filled (bool): True if the cell became occupied, False if it became empty.
+        """
+        self._hash ^= self._cell_keys[row][column]
+        self._row_keys[row] ^= COLUMN_KEYS[column]
+        height = self.num_rows - row
+        if filled:
+            self._row_counts[row] += 1
+            self._occupied += 1
+            top = self._heights[column]
+            if height > top:
+                self._holes[column] += height - top - 1
+                self._heights[column] = height
+            else:
+                self._holes[column] -= 1
+        else:
+            self._row_counts[row] -= 1
+            self._occupied -= 1
+            if height == self._heights[column]:
+                self._index_column_tops(1 << column, 1)
+            else:
+                self._holes[column] += 1
+
+    def _index_cleared_rows(self, full_rows):
+        """Update the derived indexes after full rows were removed and the rows above moved down.
+
+        A full row holds no holes, so only a column whose top cell was in a
+        removed row needs its new top looked up; every other column just gets
+        lower. The hash is rebuilt from the combined key of every occupied
+        row, rotated once by its new index, instead of visiting its cells.
+
+        Args:
+            full_rows (list): The indexes the removed rows had, in any order.
+        """
+        completed = len(full_rows)
+        full = set(full_rows)
+        counts = self._row_counts
+        row_keys = self._row_keys
+        for row in sorted(full_rows, reverse=True):
+            del counts[row]
+            del row_keys[row]
+        counts[0:0] = [0] * completed
+        row_keys[0:0] = [0] * completed
+        zobrist_hash = 0
+        for row in range(self.num_rows - max(self._heights) + completed, self.num_rows):
+            key = row_keys[row]
+            if key:
+                zobrist_hash ^= (key << row | key >> 64 - row) & MASK_64
+        self._hash = zobrist_hash
+        self._occupied -= completed * self.num_cols
+        tops = 0
+        for column in range(self.num_cols):
+            if self.num_rows - self._heights[column] in full:
+                tops |= 1 << column
+            else:
+                self._heights[column] -= completed
+        self._index_column_tops(tops, completed)
+
+    def _index_cleared_row(self, row, mask):
+        """Update the derived indexes after the cells of one row were emptied.
+
+        Args:
+            row (int): The row index.
+            mask (int): The bitmask of the cells the row held.
+        """
+        self._hash ^= rotate_left(self._row_keys[row], row)
+        self._row_keys[row] = 0
+        self._occupied -= self._row_counts[row]
+        self._row_counts[row] = 0
+        height = self.num_rows - row
+        tops = 0
+        while mask:
+            lowest = mask & -mask
+            column = lowest.bit_length() - 1
+            if self._heights[column] == height:
+                tops |= lowest
+            else:
+                self._holes[column] += 1
+            mask ^= lowest
+        self._index_column_tops(tops, 1)
+
+    def _index_moved_row(self, row, num_rows, mask):
+        """Update the derived indexes after the cells of a row moved down into an empty row.
+
+        A moved cell stays below the top of its column unless it was the
+        top, so only those columns need their new top looked up.
+
+        Args:
+            row (int): The index the row had.
+            num_rows (int): The number of rows it moved down.
+            mask (int): The bitmask of the cells the row holds.
+        """
+        row_keys = self._row_keys[row]
+        self._hash ^= rotate_left(row_keys, row) ^ rotate_left(row_keys, row + num_rows)
+        self._row_keys[row + num_rows] = row_keys
+        self._row_keys[row] = 0
+        self._row_counts[row + num_rows] = self._row_counts[row]
+        self._row_counts[row] = 0
+        height = self.num_rows - row
+        tops = 0
+        for column in range(self.num_cols):
+            if mask >> column & 1 and self._heights[column] == height:
+                tops |= 1 << column
+        self._index_column_tops(tops, 0)
 
     def print_grid(self):
         """Print the current state of the grid to the console."""
@@ -67,6 +286,99 @@ class Grid:
         """
         return self.grid[row][column] == 0
 
+    def positions_fit(self, positions):
+        """Check if all positions are inside the grid and empty.
+
+        Args:
+            positions (list): The Position objects to test.
+
+        Returns:
+            bool: True if every position is inside the grid and empty, False otherwise.
+        """
+        for position in positions:
+            if not self.is_inside(position.row, position.column):
+                return False
+            if not self.is_empty(position.row, position.column):
+                return False
+        return True
+
+    def set_cell(self, row, column, value):
+        """Set the value of a single cell.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+            value (int): The block id to store, or 0 to empty the cell.
+        """
+        values = self.grid[row]
+        if self._shared_rows and id(values) in self._shared_rows:
+            values = self._unshare_row(row)
+        was_filled = values[column] != 0
+        values[column] = value
+        if was_filled != (value != 0):
+            self._index_cell(row, column, not was_filled)
+
+    def shape_fits(self, shape, row_offset, column_offset):
+        """Check if a shape placed at an offset is inside the grid and empty.
+
+        Args:
+            shape (Shape): The precomputed shape to test.
+            row_offset (int): The row the shape's origin is placed at.
+            column_offset (int): The column the shape's origin is placed at.
+
+        Returns:
+            bool: True if every cell of the shape is inside the grid and empty, False otherwise.
+        """
+        if (row_offset + shape.min_row < 0 or row_offset + shape.max_row >= self.num_rows
+                or column_offset + shape.min_column < 0 or column_offset + shape.max_column >= self.num_cols):
+            return False
+        grid = self.grid
+        for row, column in shape.cells:
+            if grid[row + row_offset][column + column_offset] != 0:
+                return False
+        return True
+
+    def place_shape(self, shape, row_offset, column_offset, value):
+        """Write a shape placed at an offset into the grid.
+
+        Args:
+            shape (Shape): The precomputed shape to write.
+            row_offset (int): The row the shape's origin is placed at.
+            column_offset (int): The column the shape's origin is placed at.
+            value (int): The block id to store in the shape's cells.
+        """
+        for row, column in shape.cells:
+            self.set_cell(row + row_offset, column + column_offset, value)
+
+    def drop_row(self, shape, row_offset, column_offset):
+        """Get the row offset a shape lands at when dropped straight down.
+
+        When the shape is above the top cell of every column it covers, the
+        landing row follows from the column heights alone. Only a shape already
+        below the top of a column, e.g. tucked under an overhang, is moved down
+        one row at a time.
+
+        Args:
+            shape (Shape): The precomputed shape to drop.
+            row_offset (int): The row the shape's origin starts at.
+            column_offset (int): The column the shape's origin is placed at.
+
+        Returns:
+            int: The largest row offset the shape can fall to.
+        """
+        heights = self._heights
+        landing_row = self.num_rows
+        for column, _, bottom_row, _ in shape.column_spans:
+            row = self.num_rows - heights[column + column_offset] - 1 - bottom_row
+            if row < landing_row:
+                landing_row = row
+        if landing_row >= row_offset:
+            return landing_row
+        row = row_offset
+        while self.shape_fits(shape, row + 1, column_offset):
+            row += 1
+        return row
+
     def is_row_full(self, row):
         """Check if a given row is full (contains no empty cells).
 
@@ -76,7 +388,7 @@ class Grid:
         Returns:
             bool: True if the row is full, False otherwise.
         """
-        return all(cell != 0 for cell in self.grid[row])
+        return self._row_counts[row] == self.num_cols
 
     def clear_row(self, row):
         """Clear all cells in a given row.
@@ -84,18 +396,22 @@ class Grid:
         Args:
             row (int): The row index.
         """
+        mask = self._row_mask(row)
         self.grid[row] = [0] * self.num_cols
+        self._index_cleared_row(row, mask)
 
     def move_row_down(self, row, num_rows):
-        """Move all cells in a row down by a given number of rows.
+        """Move all cells in a row down by a given number of rows, replacing the cells there.
 
         Args:
             row (int): The row index.
             num_rows (int): The number of rows to move down.
         """
-        for col in range(self.num_cols):
-            self.grid[row + num_rows][col] = self.grid[row][col]
-            self.grid[row][col] = 0
+        self.clear_row(row + num_rows)
+        mask = self._row_mask(row)
+        self.grid[row + num_rows] = self.grid[row]
+        self.grid[row] = [0] * self.num_cols
+        self._index_moved_row(row, num_rows, mask)
 
     def clear_full_rows(self):
         """Clear all full rows in the grid and move cells above down.
@@ -103,18 +419,84 @@ class Grid:
         Returns:
             int: The number of rows cleared.
         """
-        completed = 0
-        for row in range(self.num_rows - 1, 0, -1):
-            if self.is_row_full(row):
-                self.clear_row(row)
-                completed += 1
-            elif completed > 0:
-                self.move_row_down(row, completed)
-        return completed
+        if self.num_cols not in self._row_counts:
+            return 0
+        grid = self.grid
+        full_rows = []
+        for row in range(self.num_rows - 1, -1, -1):
+            if self._row_counts[row] == self.num_cols:
+                full_rows.append(row)
+            elif full_rows:
+                grid[row + len(full_rows)] = grid[row]
+        for row in range(len(full_rows)):
+            grid[row] = [0] * self.num_cols
+        self._index_cleared_rows(full_rows)
+        return len(full_rows)
 
     def reset(self):
         """Reset the grid to its initial state with all cells empty."""
         self.grid = [[0 for j in range(self.num_cols)] for i in range(self.num_rows)]
+        self._shared_rows = set()
+        self._reset_indexes()
+
+    def _unshare_row(self, row):
+        """Give a row shared with a snapshot its own copy before it is written.
+
+        Args:
+            row (int): The row index.
+
+        Returns:
+            list: The row's new, unshared cell values.
+        """
+        values = self.grid[row]
+        self._shared_rows.discard(id(values))
+        values = list(values)
+        self.grid[row] = values
+        return values
+
+    def _snapshot_cells(self):
+        """Capture the cell values, sharing the row lists until they are written.
+
+        Returns:
+            tuple: The row lists of the grid.
+        """
+        self._shared_rows = set(map(id, self.grid))
+        return tuple(self.grid)
+
+    def _restore_cells(self, cells):
+        """Return the cell values to captured ones, sharing the captured row lists.
+
+        Args:
+            cells (tuple): The row lists returned by _snapshot_cells.
+        """
+        self.grid = list(cells)
+        self._shared_rows = set(map(id, cells))
+
+    def snapshot(self):
+        """Capture the cells and indexes of the grid for restore.
+
+        No cell is copied: the rows are shared with the grid until it writes them.
+
+        Returns:
+            tuple: The state to pass to restore.
+        """
+        return (self._snapshot_cells(), tuple(self._heights), tuple(self._row_counts), tuple(self._holes),
+                self._occupied, tuple(self._row_keys), self._hash)
+
+    def restore(self, state):
+        """Return the grid to a captured state; the state can be restored again later.
+
+        Args:
+            state (tuple): A state returned by snapshot.
+        """
+        cells, heights, row_counts, holes, occupied, row_keys, zobrist_hash = state
+        self._restore_cells(cells)
+        self._heights = list(heights)
+        self._row_counts = list(row_counts)
+        self._holes = list(holes)
+        self._occupied = occupied
+        self._row_keys = list(row_keys)
+        self._hash = zobrist_hash
 
     def draw(self, screen):
         """Draw the grid on the provided Pygame screen.
@@ -122,9 +504,5 @@ class Grid:
         Args:
             screen (pygame.Surface): The Pygame surface to draw on.
         """
-        for row in range(self.num_rows):
-            for col in range(self.num_cols):
-                cell_value = self.grid[row][col]
-                cell_rect = pygame.Rect(col * self.cell_size + 11, row * self.cell_size + 11,
-                                         self.cell_size - 1, self.cell_size - 1)
-                pygame.draw.rect(screen, self.colors[cell_value], cell_rect)
\ No newline at end of file
+        from renderer import draw_grid
+        draw_grid(self, screen)
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""Input-to-display latency measurement for the game loops.
+
+Each KEYDOWN is stamped when the loop takes it from the event queue, again
+when the Game method it triggers returns, and again when the frame showing
+its result has been passed to pygame.display.update. pygame events carry no
+timestamp of their own, so the time an event waits in the queue before it
+is polled is not included: that wait is what the low-latency mode of
+wait_for_input removes.
+"""
+import time
+import pygame
+from stats import percentile
+
+
+def wait_for_input(deadline, pending):
+    """Sleep until the next frame is due, waking early when a key is pressed.
+
+    This replaces clock.tick in the low-latency mode: a key pressed while the
+    loop would otherwise sleep starts the next frame at once, so its result
+    is drawn without waiting out the rest of the frame.
+
+    Args:
+        deadline (float): The time.perf_counter() time the next frame is due.
+        pending (list): The events taken from the queue while waiting; the
+            loop handles them ahead of the ones it polls next.
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        event = pygame.event.wait(max(1, int(remaining * 1000)))
+        if event.type == pygame.NOEVENT:
+            continue
+        pending.append(event)
+        if event.type in (pygame.KEYDOWN, pygame.QUIT):
+            break
+
+
+class LatencyTracker:
+    """Collects the input-to-display latency of key presses over a session.
+
+    Attributes:
+        handled (list): The poll times of keys handled but not yet displayed.
+        handle_times (list): The seconds from poll to the Game method returning, per key.
+        display_times (list): The seconds from poll to display update, per key.
+
+    Methods:
+        key_polled(): Stamp a key press taken from the event queue.
+        key_handled(polled): Stamp the return of the Game method a key triggered.
+        displayed(): Stamp the display update showing the keys handled so far.
+        report(): Get a one-line summary of the latency percentiles.
+    """
+
+    def __init__(self):
+        """Initialize a LatencyTracker object."""
+        self.handled = []
+        self.handle_times = []
+        self.display_times = []
+
+    def key_polled(self):
+        """Stamp a key press taken from the event queue.
+
+        Returns:
+            float: The time stamp, to pass to key_handled.
+        """
+        return time.perf_counter()
+
+    def key_handled(self, polled):
+        """Stamp the return of the Game method a key press triggered.
+
+        Args:
+            polled (float): The time stamp returned by key_polled.
+        """
+        now = time.perf_counter()
+        self.handle_times.append(now - polled)
+        self.handled.append(polled)
+
+    def displayed(self):
+        """Stamp the display update showing every key press handled since the last one."""
+        if self.handled:
+            now = time.perf_counter()
+            self.display_times.extend(now - polled for polled in self.handled)
+            self.handled.clear()
+
+    def report(self):
+        """Get a one-line summary of the latency percentiles.
+
+        Returns:
+            str: The number of key presses and the p50, p95, p99 and maximum
+                milliseconds to handling and to display.
+        """
+        handle_times = sorted(self.handle_times)
+        display_times = sorted(self.display_times)
+        parts = []
+        for name, values in (("handled", handle_times), ("displayed", display_times)):
+            parts.append(f"{name} p50 {percentile(values, 0.5) * 1000:.2f} "
+                         f"p95 {percentile(values, 0.95) * 1000:.2f} "
+                         f"p99 {percentile(values, 0.99) * 1000:.2f} "
+                         f"max {(values[-1] if values else 0.0) * 1000:.2f} ms")
+        return f"input latency: {len(display_times)} keys, " + ", ".join(parts)
@@ -1,76 +1,204 @@
-import pygame, sys
-from game import Game
+import pygame, sys, time
+from game import Game, ACTION_METHODS, MOVE_LEFT, MOVE_RIGHT, MOVE_DOWN, ROTATE
 from colors import Colors
+from sounds import GameSounds
+from renderer import Hud, DirtyRectRenderer
+from text_cache import text_cache
+from autoplayer import AutoPlayer
+from replay import ReplayWriter, SOFT_DROP, HARD_DROP, RESET, apply_action
+from timestep import FixedTimestep
+from latency import LatencyTracker, wait_for_input
+from profiler import FrameProfiler
 
-pygame.init()
+# Run with --dirty-rects to only redraw and update the parts of the window that changed
+DIRTY_RECTS = "--dirty-rects" in sys.argv
+
+# Run with --auto to let the heuristic autoplayer play, one move per frame
+AUTOPLAY = "--auto" in sys.argv
+
+# Run with --interpolate to draw the falling block between rows, at the
+# fraction of the gravity step elapsed (full redraws only)
+INTERPOLATE = "--interpolate" in sys.argv
+
+# Run with --latency to time key presses to the display update showing them,
+# printing the percentiles on exit
+LATENCY = "--latency" in sys.argv
+
+# Run with --low-latency to wake up for a key press instead of sleeping out the
+# frame, so the next frame polls and handles it before drawing
+LOW_LATENCY = "--low-latency" in sys.argv
+
+# Run with --profile FILE to time the phases of every frame, show a frame-time
+# overlay and write the per-frame breakdown to FILE as CSV on exit
+PROFILE_PATH = sys.argv[sys.argv.index("--profile") + 1] if "--profile" in sys.argv else None
 
-# Set up fonts and surfaces for text display
-title_font = pygame.font.Font(None, 40)
-score_surface = title_font.render("Score", True, Colors.white)
-next_surface = title_font.render("Next", True, Colors.white)
-game_over_surface = title_font.render("GAME OVER", True, Colors.white)
+# Run with --text-stats to print the text cache counters on exit
+TEXT_STATS = "--text-stats" in sys.argv
 
-# Set up rectangles for positioning text elements
-score_rect = pygame.Rect(320, 55, 170, 60)
-next_rect = pygame.Rect(320, 215, 170, 180)
+# Run with --record FILE to save a replay of the session, checked with python replay.py FILE
+RECORD_PATH = sys.argv[sys.argv.index("--record") + 1] if "--record" in sys.argv else None
+
+# The replay action each key performs
+KEY_ACTIONS = {
+    pygame.K_LEFT: MOVE_LEFT,
+    pygame.K_RIGHT: MOVE_RIGHT,
+    pygame.K_DOWN: SOFT_DROP,
+    pygame.K_UP: ROTATE,
+    pygame.K_SPACE: HARD_DROP,
+}
+
+pygame.init()
+
+# Set up the fonts, text surfaces and panels of the HUD
+hud = Hud()
 
 # Set up the Pygame display window
 screen = pygame.display.set_mode((500, 620))
 pygame.display.set_caption("Python Tetris")
 
-# Set up the Pygame clock
+# Set up the Pygame clock and the frame rate cap
 clock = pygame.time.Clock()
+FRAME_TIME = 1 / 60
+
+# Set up the latency tracker and the events taken from the queue while waiting for input
+latency = LatencyTracker() if LATENCY else None
+pending_events = []
 
-# Create a Game instance
-game = Game()
+# Set up the renderer that tracks changed regions between frames
+dirty_renderer = DirtyRectRenderer(hud)
 
-# Set up a custom Pygame event for game updates
-GAME_UPDATE = pygame.USEREVENT
-pygame.time.set_timer(GAME_UPDATE, 200)
+# Set up the replay recorder, which picks the seed of the game
+recorder = ReplayWriter(RECORD_PATH) if RECORD_PATH else None
+
+# Create a Game instance and hook up its sound effects
+game = Game(seed=recorder.seed if recorder else None)
+if recorder:
+    recorder.watch(game)
+sounds = GameSounds()
+game.add_listener(sounds)
+sounds.play_music()
+autoplayer = AutoPlayer()
+
+# Set up the frame profiler; row clears happen inside moves, so the grid's method is timed in place
+profiler = FrameProfiler(PROFILE_PATH) if PROFILE_PATH else None
+if profiler:
+    profiler.instrument(game.grid, "clear_full_rows", "clear rows")
+
+# Gravity runs at a fixed step of simulated time, however fast frames are drawn;
+# after a stall at most MAX_CATCH_UP_STEPS missed steps are run in one frame
+GRAVITY_STEP = 0.2
+MAX_CATCH_UP_STEPS = 5
+timestep = FixedTimestep(GRAVITY_STEP, MAX_CATCH_UP_STEPS)
+
+def play(action):
+    """Apply a replay action to the game, recording it if a replay is being saved."""
+    if profiler:
+        profiler.enter("simulation")
+    apply_action(game, action)
+    if profiler:
+        profiler.exit()
+    if recorder:
+        recorder.record(action)
 
 # Main game loop
 while True:
-    # Event handling loop
-    for event in pygame.event.get():
+    frame_start = time.perf_counter()
+    if profiler:
+        profiler.begin_frame()
+        profiler.enter("events")
+
+    # Event handling loop, starting with the events that woke a low-latency wait
+    events = pending_events + pygame.event.get()
+    pending_events.clear()
+    for event in events:
         if event.type == pygame.QUIT:
+            if TEXT_STATS:
+                print(text_cache.report())
+            if latency:
+                print(latency.report())
+            if AUTOPLAY:
+                print(autoplayer.report())
+            if profiler:
+                print(profiler.report())
+                profiler.close()
+            if recorder:
+                recorder.close(game)
             pygame.quit()
             sys.exit()
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            dirty_renderer.invalidate()
         if event.type == pygame.KEYDOWN:
             if game.game_over == True:
-                game.game_over = False
-                game.reset()
-            if event.key == pygame.K_LEFT and game.game_over == False:
-                game.move_left()
-            if event.key == pygame.K_RIGHT and game.game_over == False:
-                game.move_right()
-            if event.key == pygame.K_DOWN and game.game_over == False:
-                game.move_down()
-                game.update_score(0, 1)
-            if event.key == pygame.K_UP and game.game_over == False:
-                game.rotate()
-        if event.type == GAME_UPDATE and game.game_over == False:
-            game.move_down()
+                play(RESET)
+            # Soft drops score one point per row, hard drops one per row fallen
+            if event.key in KEY_ACTIONS and game.game_over == False:
+                polled = latency.key_polled() if latency else 0.0
+                play(KEY_ACTIONS[event.key])
+                if latency:
+                    latency.key_handled(polled)
+    if profiler:
+        profiler.exit()
+
+    # Run the gravity ticks due since the last frame
+    for _ in range(timestep.advance()):
+        if game.game_over == False:
+            play(MOVE_DOWN)
+
+    # Let the autoplayer make one move, starting a new game when it tops out
+    if AUTOPLAY:
+        if game.game_over == True:
+            play(RESET)
+        if profiler:
+            profiler.enter("autoplayer")
+        action = ACTION_METHODS.index(autoplayer.next_action(game))
+        if profiler:
+            profiler.exit()
+        play(action)
+
+    if recorder:
+        recorder.next_frame()
 
     # Drawing loop
-    # Render and display the score
-    score_value_surface = title_font.render(str(game.score), True, Colors.white)
-    screen.fill(Colors.dark_blue)
-    screen.blit(score_surface, (365, 20, 50, 50))
-    screen.blit(next_surface, (375, 180, 50, 50))
-
-    # If the game is over, display the "GAME OVER" message
-    if game.game_over == True:
-        screen.blit(game_over_surface, (320, 450, 50, 50))
-
-    # Draw the score rectangle and the score value
-    pygame.draw.rect(screen, Colors.light_blue, score_rect, 0, 10)
-    screen.blit(score_value_surface, score_value_surface.get_rect(centerx=score_rect.centerx,
-                                                                   centery=score_rect.centery))
-
-    # Draw the next block rectangle and the next block preview
-    pygame.draw.rect(screen, Colors.light_blue, next_rect, 0, 10)
-    game.draw(screen)
-
-    # Update the display
-    pygame.display.update()
-    clock.tick(60)
\ No newline at end of file
+    if DIRTY_RECTS:
+        # Redraw only the cells and panels that changed and update just those rectangles
+        if profiler:
+            profiler.enter("dirty draw")
+        rects = dirty_renderer.draw(screen, game)
+        if profiler:
+            profiler.exit()
+            rects.append(profiler.draw(screen))
+            profiler.enter("display update")
+        pygame.display.update(rects)
+    else:
+        # Draw the HUD: titles, "GAME OVER" message, score and next block panels
+        if profiler:
+            profiler.enter("hud")
+        screen.fill(Colors.dark_blue)
+        hud.draw(screen, game)
+
+        # Draw the grid, the current block and the next block preview
+        if profiler:
+            profiler.exit()
+            profiler.enter("board draw")
+        game.draw(screen, timestep.alpha if INTERPOLATE and game.game_over == False else 0.0)
+        if profiler:
+            profiler.exit()
+            profiler.draw(screen)
+            profiler.enter("display update")
+
+        # Update the display
+        pygame.display.update()
+    if profiler:
+        profiler.exit()
+    if latency:
+        latency.displayed()
+
+    # Wait for the next frame, or in low-latency mode until a key is pressed
+    if profiler:
+        profiler.enter("wait")
+    if LOW_LATENCY:
+        wait_for_input(frame_start + FRAME_TIME, pending_events)
+    else:
+        clock.tick(60)
+    if profiler:
+        profiler.exit()
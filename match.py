@@ -0,0 +1,236 @@
+"""Local multiplayer matches of 2 to 8 players in one window.
+
+Every player has a Game of their own, so the rules are those of the single
+player game and nothing of it is copied. Players past the number of human
+key bindings are played by the heuristic autoplayer. A frame polls the
+event queue once and sends every key to the player it belongs to through a
+single dictionary lookup, runs the gravity ticks due for all games at once,
+and draws every board in one batched pass of a MatchRenderer, so the cost of
+a frame grows only by the few blits and moves of each added player.
+
+The last player standing wins. All games draw their blocks from the same
+seed, so every player gets the same sequence of blocks.
+"""
+import random
+import sys
+import time
+import pygame
+from game import Game, ACTION_METHODS, MOVE_LEFT, MOVE_RIGHT, ROTATE
+from autoplayer import AutoPlayer
+from latency import LatencyTracker, wait_for_input
+from renderer import MatchRenderer
+from replay import SOFT_DROP, HARD_DROP, apply_action
+from sounds import GameSounds
+from text_cache import text_cache
+from timestep import FixedTimestep
+
+MIN_PLAYERS = 2
+MAX_PLAYERS = 8
+
+# The replay action each key performs, per human player
+KEY_BINDINGS = (
+    {pygame.K_LEFT: MOVE_LEFT, pygame.K_RIGHT: MOVE_RIGHT, pygame.K_DOWN: SOFT_DROP,
+     pygame.K_UP: ROTATE, pygame.K_RETURN: HARD_DROP},
+    {pygame.K_a: MOVE_LEFT, pygame.K_d: MOVE_RIGHT, pygame.K_s: SOFT_DROP,
+     pygame.K_w: ROTATE, pygame.K_SPACE: HARD_DROP},
+    {pygame.K_j: MOVE_LEFT, pygame.K_l: MOVE_RIGHT, pygame.K_k: SOFT_DROP,
+     pygame.K_i: ROTATE, pygame.K_u: HARD_DROP},
+    {pygame.K_KP4: MOVE_LEFT, pygame.K_KP6: MOVE_RIGHT, pygame.K_KP5: SOFT_DROP,
+     pygame.K_KP8: ROTATE, pygame.K_KP0: HARD_DROP},
+)
+
+# Gravity runs at a fixed step of simulated time for every game at once;
+# after a stall at most MAX_CATCH_UP_STEPS missed steps are run in one frame
+GRAVITY_STEP = 0.2
+MAX_CATCH_UP_STEPS = 5
+FRAME_TIME = 1 / 60
+
+
+class Match:
+    """A class that runs the games of a local match side by side.
+
+    Attributes:
+        games (list): The Game of every player.
+        humans (int): The number of players controlled by keys; the others
+            are played by autoplayers.
+        autoplayers (list): The (player, AutoPlayer) of every computer player.
+        key_map (dict): The (player, action) every bound key performs.
+        labels (list): The name of every player.
+        random (random.Random): The generator of the shared seed of each round.
+        rounds (int): The number of rounds started.
+
+    Methods:
+        handle_key(key): Apply a key press to the player it belongs to.
+        tick(): Run one gravity step for every player still playing.
+        step_autoplayers(): Let every computer player make one move.
+        restart(): Start a new round with a fresh shared seed.
+    """
+
+    def __init__(self, num_players=2, humans=None, seed=None):
+        """Initialize a Match object.
+
+        Args:
+            num_players (int, optional): The number of players, from MIN_PLAYERS to MAX_PLAYERS.
+            humans (int, optional): The number of players controlled by keys.
+                Defaults to as many as there are key bindings for.
+            seed (int, optional): The seed of the rounds; None seeds from the system.
+
+        Raises:
+            ValueError: If the number of players or human players is out of range.
+        """
+        if not MIN_PLAYERS <= num_players <= MAX_PLAYERS:
+            raise ValueError(f"a match has {MIN_PLAYERS} to {MAX_PLAYERS} players, not {num_players}")
+        if humans is None:
+            humans = min(num_players, len(KEY_BINDINGS))
+        if not 0 <= humans <= min(num_players, len(KEY_BINDINGS)):
+            raise ValueError(f"{humans} human players do not fit {num_players} players "
+                             f"and {len(KEY_BINDINGS)} key bindings")
+        self.random = random.Random(seed)
+        round_seed = self.random.getrandbits(64)
+        self.games = [Game(seed=round_seed) for _ in range(num_players)]
+        self.humans = humans
+        self.autoplayers = [(player, AutoPlayer()) for player in range(humans, num_players)]
+        self.key_map = {key: (player, action)
+                        for player in range(humans) for key, action in KEY_BINDINGS[player].items()}
+        self.labels = [f"P{player + 1}" if player < humans else f"P{player + 1} (CPU)"
+                       for player in range(num_players)]
+        self.rounds = 1
+
+    @property
+    def alive(self):
+        """int: The number of players still playing."""
+        return sum(1 for game in self.games if not game.game_over)
+
+    @property
+    def over(self):
+        """bool: Whether at most one player is left, which ends the round."""
+        return self.alive <= 1
+
+    @property
+    def winner(self):
+        """int: The index of the last player standing once the round is over, or None."""
+        if not self.over:
+            return None
+        for player, game in enumerate(self.games):
+            if not game.game_over:
+                return player
+        return None
+
+    def handle_key(self, key):
+        """Apply a key press to the player it belongs to; any key starts a new round once one is over.
+
+        Args:
+            key (int): The Pygame key code.
+
+        Returns:
+            bool: Whether the key moved a player's block or started a round.
+        """
+        if self.over:
+            self.restart()
+            return True
+        binding = self.key_map.get(key)
+        if binding is None:
+            return False
+        player, action = binding
+        game = self.games[player]
+        if game.game_over:
+            return False
+        apply_action(game, action)
+        return True
+
+    def tick(self):
+        """Run one gravity step for every player still playing."""
+        if self.over:
+            return
+        for game in self.games:
+            if not game.game_over:
+                game.move_down()
+
+    def step_autoplayers(self):
+        """Let every computer player still playing make one move."""
+        if self.over:
+            return
+        for player, autoplayer in self.autoplayers:
+            game = self.games[player]
+            if not game.game_over:
+                apply_action(game, ACTION_METHODS.index(autoplayer.next_action(game)))
+
+    def restart(self):
+        """Start a new round, with all players drawing blocks from a fresh shared seed."""
+        round_seed = self.random.getrandbits(64)
+        for game in self.games:
+            game.randomizer.seed(round_seed)
+            game.reset()
+        self.rounds += 1
+
+
+def main(num_players=2):
+    """Run a local match in a window until it is closed.
+
+    Args:
+        num_players (int, optional): The number of players, unless given with --players N.
+    """
+    # --players N sets the number of players, --humans N how many of them use keys,
+    # --array-render draws the boards with the NumPy renderer instead of tiles,
+    # --text-stats prints the text cache counters on exit,
+    # --latency prints key press to display update percentiles on exit, and
+    # --low-latency wakes up for a key press instead of sleeping out the frame
+    if "--players" in sys.argv:
+        num_players = int(sys.argv[sys.argv.index("--players") + 1])
+    humans = int(sys.argv[sys.argv.index("--humans") + 1]) if "--humans" in sys.argv else None
+    text_stats = "--text-stats" in sys.argv
+    latency = LatencyTracker() if "--latency" in sys.argv else None
+    low_latency = "--low-latency" in sys.argv
+    pending_events = []
+
+    match = Match(num_players, humans)
+    pygame.init()
+    renderer = MatchRenderer(match.games, match.labels, array_render="--array-render" in sys.argv)
+    screen = pygame.display.set_mode(renderer.size)
+    pygame.display.set_caption(f"Tetris Match: {num_players} players")
+    clock = pygame.time.Clock()
+    timestep = FixedTimestep(GRAVITY_STEP, MAX_CATCH_UP_STEPS)
+
+    # One set of sounds serves every player
+    sounds = GameSounds()
+    for game in match.games:
+        game.add_listener(sounds)
+    sounds.play_music()
+
+    while True:
+        frame_start = time.perf_counter()
+        events = pending_events + pygame.event.get()
+        pending_events.clear()
+        for event in events:
+            if event.type == pygame.QUIT:
+                if text_stats:
+                    print(text_cache.report())
+                if latency:
+                    print(latency.report())
+                for player, autoplayer in match.autoplayers:
+                    print(f"{match.labels[player]} {autoplayer.report()}")
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN:
+                polled = latency.key_polled() if latency else 0.0
+                if match.handle_key(event.key) and latency:
+                    latency.key_handled(polled)
+
+        # Run the gravity ticks due since the last frame, then the computer players' moves
+        for _ in range(timestep.advance()):
+            match.tick()
+        match.step_autoplayers()
+
+        renderer.draw(screen, match.winner)
+        pygame.display.update()
+        if latency:
+            latency.displayed()
+
+        if low_latency:
+            wait_for_input(frame_start + FRAME_TIME, pending_events)
+        else:
+            clock.tick(60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Monte Carlo search over a process pool.
+
+Every placement of the current block is scored by random continuations: the
+next block and then blocks drawn from the game's 7-bag, each placed by the
+one-block heuristic, for a few blocks. The rollouts of all candidates are
+cut into tasks and spread across a concurrent.futures process pool. A task
+carries a compact snapshot of the board (a tuple of row bitmasks and piece
+ids), never a Game, and returns a sum and a count, so workers scale with the
+number of cores. The search stops at a deadline on the time.perf_counter()
+clock and uses the rollouts finished by then. That clock is monotonic and,
+unlike time.time(), does not jump when the system clock is set; it is the
+same system-wide clock in the workers as in the parent.
+"""
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from autoplayer import AutoPlayer, DEFAULT_WEIGHTS, MaskBoard, board_score, place_on_rows, row_masks
+from blocks import PIECE_TYPES
+from placements import find_placements, piece_placements
+from randomizer import BAG_IDS
+
+
+def greedy_placement(rows, piece_type, num_cols, weights):
+    """Place a newly spawned block where the one-block heuristic scores best.
+
+    Args:
+        rows (list): The occupancy bitmask of every row.
+        piece_type (PieceType): The kind of the block to place.
+        num_cols (int): The number of columns.
+        weights (Weights): The weights of the heuristic.
+
+    Returns:
+        tuple: The new row bitmasks and the number of rows cleared, or None
+            if the block cannot spawn.
+    """
+    board = MaskBoard(rows, num_cols)
+    shapes = piece_type.shapes
+    if not board.shape_fits(shapes[0], piece_type.spawn_row, piece_type.spawn_column):
+        return None
+    best = None
+    best_score = None
+    for placement in piece_placements(board, shapes, 0, piece_type.spawn_row, piece_type.spawn_column):
+        after, lines = place_on_rows(rows, shapes[placement.rotation], placement.row, placement.column, num_cols)
+        score = weights.lines * lines + board_score(after, num_cols, weights)
+        if best_score is None or score > best_score:
+            best = (after, lines)
+            best_score = score
+    return best
+
+
+def run_rollouts(task):
+    """Play random continuations from one candidate board; runs in a worker process.
+
+    Args:
+        task (tuple): The candidate index, the row bitmasks after the
+            candidate placement, the number of columns, the rows it cleared,
+            the next block's id, the ids left in the bag, the weights, the
+            number of rollouts, the number of blocks per rollout, the seed
+            and the time.perf_counter() deadline.
+
+    Returns:
+        tuple: The candidate index, the sum of the rollout scores and the
+            number of rollouts finished before the deadline.
+    """
+    (candidate, rows, num_cols, lines, next_id, bag_ids, weights,
+     num_rollouts, depth, seed, deadline) = task
+    rng = random.Random(seed)
+    total = 0.0
+    count = 0
+    for _ in range(num_rollouts):
+        if time.perf_counter() >= deadline:
+            break
+        board = list(rows)
+        bag = list(bag_ids)
+        score = weights.lines * lines
+        piece_id = next_id
+        for _ in range(depth):
+            placed = greedy_placement(board, PIECE_TYPES[piece_id], num_cols, weights)
+            if placed is None:
+                score = float("-inf")
+                break
+            board, cleared = placed
+            score += weights.lines * cleared
+            if len(bag) == 0:
+                bag = list(BAG_IDS)
+            piece_id = bag.pop(rng.randrange(len(bag)))
+        else:
+            score += board_score(board, num_cols, weights)
+        total += score
+        count += 1
+    return candidate, total, count
+
+
+class ParallelSearchPlayer(AutoPlayer):
+    """A player choosing placements by Monte Carlo rollouts spread across processes.
+
+    Attributes:
+        workers (int): The number of worker processes; 0 runs the rollouts in
+            this process, e.g. on a single core.
+        rollouts (int): The number of rollouts per candidate placement.
+        depth (int): The number of blocks placed in each rollout.
+        deadline (float): The seconds a decision may take.
+        chunk_size (int): The number of rollouts per task sent to a worker.
+        random (random.Random): The generator seeding the rollouts.
+        executor (ProcessPoolExecutor): The pool, created on first use.
+        rollouts_done (int): The number of rollouts finished over all searches.
+        Inherits all other attributes from the AutoPlayer class.
+
+    Methods:
+        search(game): Find the placement with the best mean rollout score.
+        close(): Shut the process pool down.
+        Inherits all other methods from the AutoPlayer class.
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, workers=None, rollouts=32, depth=3, deadline=0.1,
+                 chunk_size=8, seed=None):
+        """Initialize a ParallelSearchPlayer object.
+
+        Args:
+            weights (Weights, optional): The weights of the heuristic.
+            workers (int, optional): The number of worker processes. Defaults
+                to one per core; 0 runs the rollouts in this process.
+            rollouts (int, optional): The number of rollouts per candidate.
+            depth (int, optional): The number of blocks placed in each rollout.
+            deadline (float, optional): The seconds a decision may take.
+            chunk_size (int, optional): The number of rollouts per task.
+            seed (int, optional): The seed of the rollouts.
+        """
+        super().__init__(weights)
+        self.workers = workers
+        self.rollouts = rollouts
+        self.depth = depth
+        self.deadline = deadline
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.executor = None
+        self.rollouts_done = 0
+
+    def __enter__(self):
+        """Use the player as a context manager that shuts its pool down on exit."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Shut the process pool down."""
+        self.close()
+
+    def close(self):
+        """Shut the process pool down, cancelling the tasks not yet started."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def search(self, game):
+        """Find the placement with the best mean rollout score.
+
+        Args:
+            game (Game): The game to play. It is not modified.
+
+        Returns:
+            Placement: The placement scoring best, or None when there is none.
+        """
+        deadline = time.perf_counter() + self.deadline
+        grid = game.grid
+        num_cols = grid.num_cols
+        rows = tuple(row_masks(grid))
+        shapes = game.current_block.piece_type.shapes
+        next_id = game.next_block.id
+        bag_ids = game.randomizer.remaining()
+        placements = find_placements(game)
+        totals = [0.0] * len(placements)
+        counts = [0] * len(placements)
+
+        boards = []
+        for candidate, placement in enumerate(placements):
+            after, lines = place_on_rows(rows, shapes[placement.rotation], placement.row, placement.column, num_cols)
+            boards.append((tuple(after), lines))
+            # Until rollouts come back a candidate is worth its own one-block score
+            totals[candidate] = self.weights.lines * lines + board_score(after, num_cols, self.weights)
+
+        # Tasks go round the candidates so that all of them get rollouts
+        # before any gets its second chunk, in case the deadline cuts the search short
+        tasks = []
+        for start in range(0, self.rollouts, self.chunk_size):
+            for candidate, (after, lines) in enumerate(boards):
+                tasks.append((candidate, after, num_cols, lines, next_id, bag_ids, self.weights,
+                              min(self.chunk_size, self.rollouts - start), self.depth,
+                              self.random.getrandbits(32), deadline))
+
+        if self.workers == 0:
+            results = map(run_rollouts, tasks)
+        else:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [self.executor.submit(run_rollouts, task) for task in tasks]
+            done, not_done = wait(futures, timeout=max(0.0, deadline - time.perf_counter()))
+            for future in not_done:
+                future.cancel()
+            results = (future.result() for future in done)
+
+        for candidate, total, count in results:
+            if count:
+                if counts[candidate] == 0:
+                    totals[candidate] = 0.0
+                totals[candidate] += total
+                counts[candidate] += count
+                self.rollouts_done += count
+
+        # Rollout means and one-block scores are not comparable, so once any
+        # candidate has rollouts only those candidates compete
+        sampled = any(counts)
+        best = None
+        best_score = None
+        for candidate, placement in enumerate(placements):
+            if sampled and counts[candidate] == 0:
+                continue
+            score = totals[candidate] / counts[candidate] if counts[candidate] else totals[candidate]
+            if best_score is None or score > best_score:
+                best = placement
+                best_score = score
+        return best
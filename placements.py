@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+class Placement(namedtuple("Placement", ["rotation", "row", "column", "actions"])):
+    """A final resting position of the current block and the moves reaching it.
+
+    Attributes:
+        rotation (int): The rotation state the block rests in.
+        row (int): The row offset the block rests at.
+        column (int): The column offset the block rests at.
+        actions (tuple): The names of the Game methods to call, in order, to
+            move the block there and lock it: "rotate", "move_left",
+            "move_right" and finally "move_down" until it locks.
+    """
+
+    __slots__ = ()
+
+
+def find_placements(game):
+    """Find every final resting position the current block can reach.
+
+    Args:
+        game (Game): The game whose current block is placed. It is not modified.
+
+    Returns:
+        list: The reachable Placement objects, by rotation and then column.
+    """
+    block = game.current_block
+    return piece_placements(game.grid, block.piece_type.shapes, block.rotation_state,
+                            block.row_offset, block.column_offset)
+
+
+def piece_placements(grid, shapes, rotation, start_row, start_column):
+    """Find every final resting position a block can reach from a position.
+
+    The block is rotated where it is (moving down first when a rotation does
+    not fit yet), then shifted sideways, then dropped straight down, exactly
+    as the returned actions would do through the Game methods. Placements
+    that fill the same cells are only listed once.
+
+    Args:
+        grid (Grid): The grid to place on; only its shape_fits method is used.
+        shapes (tuple): The Shape of every rotation state of the block.
+        rotation (int): The block's rotation state.
+        start_row (int): The block's row offset.
+        start_column (int): The block's column offset.
+
+    Returns:
+        list: The reachable Placement objects, by rotation and then column.
+    """
+    placements = []
+    seen = set()
+
+    turn_row = start_row
+    turn_actions = ()
+    for turns in range(len(shapes)):
+        if turns > 0:
+            # Move down until the next rotation fits, e.g. an I block spawned
+            # partly above the grid that cannot stand up where it spawned
+            shape = shapes[rotation]
+            rotation = (rotation + 1) % len(shapes)
+            while (not grid.shape_fits(shapes[rotation], turn_row, start_column)
+                   and grid.shape_fits(shape, turn_row + 1, start_column)):
+                turn_row += 1
+                turn_actions += ("move_down",)
+            if not grid.shape_fits(shapes[rotation], turn_row, start_column):
+                break
+            turn_actions += ("rotate",)
+        shape = shapes[rotation]
+        columns = [(start_column, ())]
+        for step, name in ((-1, "move_left"), (1, "move_right")):
+            column = start_column
+            shifts = ()
+            while grid.shape_fits(shape, turn_row, column + step):
+                column += step
+                shifts += (name,)
+                columns.append((column, shifts))
+        for column, shifts in columns:
+            row = turn_row
+            while grid.shape_fits(shape, row + 1, column):
+                row += 1
+            cells = frozenset((row + cell_row, column + cell_column) for cell_row, cell_column in shape.cells)
+            if cells in seen:
+                continue
+            seen.add(cells)
+            actions = turn_actions + shifts + ("move_down",) * (row - turn_row + 1)
+            placements.append(Placement(rotation, row, column, actions))
+    placements.sort(key=lambda placement: (placement.rotation, placement.column))
+    return placements
@@ -0,0 +1,212 @@
+"""Opt-in per-frame profiler for the game loop.
+
+The loop marks where each phase of a frame starts and ends, and the time
+between two marks is charged to the innermost phase running, so nested
+phases (clearing rows inside a move) are not counted twice. Methods called
+from deep inside the game are timed by wrapping them on their instance with
+instrument, which leaves the classes, and runs without the profiler,
+untouched.
+
+Each finished frame becomes one CSV row of milliseconds per phase. The
+overlay shows a scrolling graph of the work time of recent frames, the time
+spent outside "wait", against the frame budget, and its p50/p95/p99.
+"""
+import time
+from array import array
+from collections import deque
+import pygame
+from colors import Colors
+from stats import percentile
+from text_cache import text_cache
+
+# The phases a frame is split into; time outside any marked phase is "other",
+# and "wait" is the sleep until the next frame, which is not work
+PHASES = ("events", "simulation", "clear rows", "autoplayer", "board draw", "hud", "dirty draw",
+          "display update", "profiler", "other", "wait")
+PHASE_INDEX = {name: index for index, name in enumerate(PHASES)}
+PROFILER = PHASE_INDEX["profiler"]
+OTHER = PHASE_INDEX["other"]
+WAIT = PHASE_INDEX["wait"]
+
+
+class FrameProfiler:
+    """Times the phases of every frame, draws an overlay and exports the breakdown.
+
+    Attributes:
+        file (file): The CSV file frames are written to, or None.
+        budget (float): The seconds of work a frame may take at the target frame rate.
+        rect (pygame.Rect): The area of the window the overlay is drawn in.
+        totals (list): The seconds charged to every phase in the current frame.
+        stack (list): The indexes of the phases running, innermost last.
+        mark (float): The time of the last phase change.
+        frame_start (float): The time the current frame began.
+        frame_times (array): The seconds from the start of every frame to the next.
+        work_times (array): The seconds of every frame not spent waiting.
+        phase_sums (list): The seconds charged to every phase over the session.
+        recent (deque): The work times of the frames shown in the graph.
+        graph (pygame.Surface): The scrolling frame-time graph.
+        labels (pygame.Surface): The rendered percentiles of the recent frames.
+
+    Methods:
+        instrument(obj, name, phase): Charge the calls to a method of an object to a phase.
+        enter(phase): Start a phase, nested in the one running.
+        exit(): End the innermost phase.
+        begin_frame(): Finish the previous frame and start a new one.
+        draw(screen): Draw the overlay and return its rectangle.
+        report(): Get a one-line summary of the session.
+        close(): Close the CSV file.
+    """
+
+    def __init__(self, path=None, history=170, budget=1 / 60, rect=pygame.Rect(320, 500, 170, 110)):
+        """Initialize a FrameProfiler object.
+
+        Args:
+            path (str, optional): The CSV file to write every frame to.
+            history (int, optional): The number of frames the graph and the
+                overlay percentiles cover.
+            budget (float, optional): The seconds of work a frame may take.
+            rect (pygame.Rect, optional): The area of the window the overlay is drawn in.
+        """
+        self.file = None
+        if path is not None:
+            self.file = open(path, "w")
+            self.file.write("frame,frame_ms,work_ms," + ",".join(name.replace(" ", "_") + "_ms"
+                                                                 for name in PHASES) + "\n")
+        self.budget = budget
+        self.rect = rect
+        self.totals = [0.0] * len(PHASES)
+        self.stack = [OTHER]
+        self.mark = None
+        self.frame_start = None
+        self.frame_times = array("d")
+        self.work_times = array("d")
+        self.phase_sums = [0.0] * len(PHASES)
+        self.recent = deque(maxlen=history)
+        self.graph = pygame.Surface((rect.width, rect.height - 20))
+        self.graph.fill(Colors.dark_grey)
+        self.labels = None
+
+    def instrument(self, obj, name, phase):
+        """Charge the calls to a method of an object to a phase.
+
+        Only this object's method is wrapped, so other instances and the
+        class itself are not slowed down.
+
+        Args:
+            obj: The object whose method is timed.
+            name (str): The name of the method.
+            phase (str): The phase to charge, one of PHASES.
+        """
+        method = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            self.enter(phase)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.exit()
+
+        setattr(obj, name, timed)
+
+    def enter(self, phase):
+        """Start a phase, nested in the one running.
+
+        Args:
+            phase (str): The phase, one of PHASES.
+        """
+        now = time.perf_counter()
+        self.totals[self.stack[-1]] += now - self.mark
+        self.mark = now
+        self.stack.append(PHASE_INDEX[phase])
+
+    def exit(self):
+        """End the innermost phase."""
+        now = time.perf_counter()
+        self.totals[self.stack.pop()] += now - self.mark
+        self.mark = now
+
+    def begin_frame(self):
+        """Finish the previous frame and start a new one; call it first thing every frame."""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.totals[self.stack[-1]] += now - self.mark
+            self._finish_frame(now - self.frame_start)
+        # Recording the previous frame is the new frame's profiler time
+        self.totals = [0.0] * len(PHASES)
+        self.frame_start = now
+        self.mark = time.perf_counter()
+        self.totals[PROFILER] = self.mark - now
+
+    def _finish_frame(self, frame_time):
+        """Record a finished frame and write its CSV row.
+
+        Args:
+            frame_time (float): The seconds from the start of the frame to the next.
+        """
+        work_time = frame_time - self.totals[WAIT]
+        self.frame_times.append(frame_time)
+        self.work_times.append(work_time)
+        self.recent.append(work_time)
+        for index, total in enumerate(self.totals):
+            self.phase_sums[index] += total
+        if self.file is not None:
+            self.file.write(f"{len(self.frame_times)},{frame_time * 1000:.3f},{work_time * 1000:.3f},"
+                            + ",".join(f"{total * 1000:.3f}" for total in self.totals) + "\n")
+        # Scroll the graph one pixel and draw the new frame's work as a bar,
+        # in red when it went over the budget; the line marks the budget
+        graph = self.graph
+        width, height = graph.get_size()
+        graph.scroll(-1, 0)
+        bar = min(height, int(work_time / (2 * self.budget) * height))
+        pygame.draw.line(graph, Colors.dark_grey, (width - 1, 0), (width - 1, height))
+        if bar:
+            color = Colors.red if work_time > self.budget else Colors.green
+            pygame.draw.line(graph, color, (width - 1, height - bar), (width - 1, height - 1))
+        graph.set_at((width - 1, height // 2), Colors.white)
+        if len(self.frame_times) % 30 == 0 or self.labels is None:
+            values = sorted(self.recent)
+            # Rendered straight from the font: the numbers change too often for the text cache
+            self.labels = text_cache.get_font(None, 20).render(
+                f"p50 {percentile(values, 0.5) * 1000:.1f} p95 {percentile(values, 0.95) * 1000:.1f} "
+                f"p99 {percentile(values, 0.99) * 1000:.1f} ms", True, Colors.white)
+
+    def draw(self, screen):
+        """Draw the overlay: the recent work percentiles above the frame-time graph.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+
+        Returns:
+            pygame.Rect: The area drawn, for partial display updates.
+        """
+        self.enter("profiler")
+        rect = self.rect
+        screen.fill(Colors.dark_blue, (rect.x, rect.y, rect.width, 20))
+        if self.labels is not None:
+            screen.blit(self.labels, (rect.x, rect.y + 2))
+        screen.blit(self.graph, (rect.x, rect.y + 20))
+        self.exit()
+        return rect
+
+    def report(self):
+        """Get a one-line summary of the session.
+
+        Returns:
+            str: The number of frames, the work percentiles, the frames over
+                budget and the mean milliseconds per frame of the busiest phases.
+        """
+        work_times = sorted(self.work_times)
+        over = sum(1 for work_time in work_times if work_time > self.budget)
+        frames = max(1, len(work_times))
+        busiest = sorted((index for index in range(len(PHASES)) if index != WAIT),
+                         key=lambda index: self.phase_sums[index], reverse=True)[:3]
+        return (f"frame profile: {len(work_times)} frames, work p50 {percentile(work_times, 0.5) * 1000:.2f} "
+                f"p95 {percentile(work_times, 0.95) * 1000:.2f} p99 {percentile(work_times, 0.99) * 1000:.2f} ms, "
+                f"{over} over budget, mean "
+                + ", ".join(f"{PHASES[index]} {self.phase_sums[index] / frames * 1000:.2f} ms" for index in busiest))
+
+    def close(self):
+        """Close the CSV file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
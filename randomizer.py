@@ -0,0 +1,117 @@
+"""Seeded 7-bag randomizer drawing piece ids without allocating.
+
+Every bag is one of the 5040 orders of the seven piece ids, picked from a
+table of all permutations built once, so refilling the bag is a single
+random number and a draw is a tuple lookup. The random numbers come from
+SplitMix64, whose whole state is one 64-bit integer: sequences are the same
+in every run and process, and saving or restoring the state is a tuple of
+three integers.
+"""
+import random
+from itertools import permutations
+
+MASK_64 = (1 << 64) - 1
+
+# The piece ids a bag holds: I, J, L, O, S, T, Z
+BAG_IDS = (3, 2, 1, 4, 5, 6, 7)
+
+# Every order a bag can be drawn in
+BAG_ORDERS = tuple(permutations(BAG_IDS))
+
+
+def splitmix64(state):
+    """Advance a SplitMix64 generator by one step.
+
+    Args:
+        state (int): The 64-bit generator state.
+
+    Returns:
+        tuple: The new state and the 64-bit random output.
+    """
+    state = (state + 0x9E3779B97F4A7C15) & MASK_64
+    value = state
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return state, value ^ (value >> 31)
+
+
+class BagRandomizer:
+    """A seeded randomizer drawing piece ids from shuffled bags of all seven pieces.
+
+    Attributes:
+        state (int): The 64-bit SplitMix64 state.
+        order (int): The index into BAG_ORDERS of the current bag.
+        position (int): The number of ids already drawn from the current bag.
+
+    Methods:
+        seed(seed): Restart the generator from a seed with a fresh bag.
+        next_id(): Draw the next piece id.
+        remaining(): Get the ids left in the current bag.
+        new_bag(): Drop the ids left in the current bag.
+        getstate(): Get the state for setstate.
+        setstate(state): Return to a state from getstate.
+    """
+
+    __slots__ = ("state", "order", "position")
+
+    def __init__(self, seed=None):
+        """Initialize a BagRandomizer object.
+
+        Args:
+            seed (int, optional): The seed. None seeds from the system.
+        """
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Restart the generator from a seed with a fresh bag.
+
+        Args:
+            seed (int, optional): The seed. None seeds from the system.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.state = seed & MASK_64
+        self.new_bag()
+
+    def next_id(self):
+        """Draw the next piece id, shuffling a new bag when the current one is empty.
+
+        Returns:
+            int: The piece id.
+        """
+        if self.position == len(BAG_IDS):
+            self.state, value = splitmix64(self.state)
+            self.order = (value * len(BAG_ORDERS)) >> 64
+            self.position = 0
+        piece_id = BAG_ORDERS[self.order][self.position]
+        self.position += 1
+        return piece_id
+
+    def remaining(self):
+        """Get the ids left in the current bag.
+
+        Returns:
+            tuple: The ids that will be drawn before the next bag, in draw order.
+        """
+        return BAG_ORDERS[self.order][self.position:]
+
+    def new_bag(self):
+        """Drop the ids left in the current bag, so the next draw starts a new bag."""
+        self.order = 0
+        self.position = len(BAG_IDS)
+
+    def getstate(self):
+        """Get the state for setstate.
+
+        Returns:
+            tuple: The generator state, bag order and position.
+        """
+        return self.state, self.order, self.position
+
+    def setstate(self, state):
+        """Return to a state from getstate.
+
+        Args:
+            state (tuple): The generator state, bag order and position.
+        """
+        self.state, self.order, self.position = state
@@ -0,0 +1,550 @@
+"""Pygame presentation layer for the Tetris simulation core.
+
+The simulation classes (Grid, Block, Game) hold no pygame state of their own.
+Everything that touches a pygame surface lives here, so the rules engine can
+run in a batch worker or on a server without initialising SDL.
+"""
+import numpy as np
+import pygame
+from array_renderer import BoardArrayRenderer, board_array
+from colors import Colors
+from text_cache import text_cache
+
+
+class TileAtlas:
+    """A class holding one pre-rendered cell tile per color index.
+
+    Attributes:
+        cell_size (int): The size of each cell in pixels; tiles leave a 1 pixel gap.
+        colors (tuple): The RGB color of every cell value.
+        tiles (list): The tile surface of every cell value.
+        ghost_tiles (list): The outlined ghost piece tile of every cell value.
+
+    Methods:
+        grid_blits(grid, offset_x, offset_y): Get the blit sequence for all grid cells.
+        block_blits(block, offset_x, offset_y): Get the blit sequence for a block's tiles.
+        ghost_blits(block, row_offset, offset_x, offset_y): Get the blit sequence for a block's ghost piece.
+    """
+
+    def __init__(self, cell_size, colors):
+        """Initialize a TileAtlas object and render its tiles.
+
+        Args:
+            cell_size (int): The size of each cell in pixels.
+            colors (list): The RGB color of every cell value.
+        """
+        self.cell_size = cell_size
+        self.colors = tuple(colors)
+        self.tiles = []
+        self.ghost_tiles = []
+        for color in self.colors:
+            tile = pygame.Surface((cell_size - 1, cell_size - 1))
+            if pygame.display.get_surface() is not None:
+                tile = tile.convert()
+            ghost_tile = tile.copy()
+            tile.fill(color)
+            self.tiles.append(tile)
+            ghost_tile.fill(self.colors[0])
+            pygame.draw.rect(ghost_tile, color, ghost_tile.get_rect(), 2)
+            self.ghost_tiles.append(ghost_tile)
+
+    def grid_blits(self, grid, offset_x, offset_y):
+        """Get the blit sequence for all grid cells.
+
+        Args:
+            grid (Grid): The grid to draw.
+            offset_x (int): The x-coordinate of the grid's top left cell.
+            offset_y (int): The y-coordinate of the grid's top left cell.
+
+        Returns:
+            list: (surface, position) pairs for Surface.blits.
+        """
+        tiles = self.tiles
+        cell_size = self.cell_size
+        return [(tiles[value], (offset_x + column * cell_size, offset_y + row * cell_size))
+                for row, values in enumerate(grid.grid) for column, value in enumerate(values)]
+
+    def block_blits(self, block, offset_x, offset_y):
+        """Get the blit sequence for a block's tiles.
+
+        Args:
+            block (Block): The block to draw.
+            offset_x (int): The x-coordinate offset.
+            offset_y (int): The y-coordinate offset.
+
+        Returns:
+            list: (surface, position) pairs for Surface.blits.
+        """
+        tile = self.tiles[block.id]
+        cell_size = self.cell_size
+        offset_x += block.column_offset * cell_size
+        offset_y += block.row_offset * cell_size
+        return [(tile, (offset_x + column * cell_size, offset_y + row * cell_size))
+                for row, column in block.shape.cells]
+
+    def ghost_blits(self, block, row_offset, offset_x, offset_y):
+        """Get the blit sequence for a block's ghost piece, its outline where it would land.
+
+        Args:
+            block (Block): The block whose ghost piece is drawn.
+            row_offset (int): The row offset the block would land at.
+            offset_x (int): The x-coordinate offset.
+            offset_y (int): The y-coordinate offset.
+
+        Returns:
+            list: (surface, position) pairs for Surface.blits.
+        """
+        tile = self.ghost_tiles[block.id]
+        cell_size = self.cell_size
+        offset_x += block.column_offset * cell_size
+        offset_y += row_offset * cell_size
+        return [(tile, (offset_x + column * cell_size, offset_y + row * cell_size))
+                for row, column in block.shape.cells]
+
+
+# The tile atlases built so far, keyed by cell size and palette
+_atlases = {}
+
+
+def get_tile_atlas(cell_size, colors):
+    """Get the tile atlas for a cell size and palette, building it on first use.
+
+    Args:
+        cell_size (int): The size of each cell in pixels.
+        colors (list): The RGB color of every cell value.
+
+    Returns:
+        TileAtlas: The atlas for that cell size and palette.
+    """
+    key = (cell_size, tuple(colors))
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = TileAtlas(cell_size, colors)
+        _atlases[key] = atlas
+    return atlas
+
+
+def draw_grid(grid, screen):
+    """Draw the grid cells on the provided Pygame screen with one batched blit.
+
+    Args:
+        grid (Grid): The grid to draw.
+        screen (pygame.Surface): The Pygame surface to draw on.
+    """
+    atlas = get_tile_atlas(grid.cell_size, grid.colors)
+    screen.blits(atlas.grid_blits(grid, 11, 11), doreturn=False)
+
+
+def draw_block(block, screen, offset_x, offset_y):
+    """Draw a block on the screen with the specified offset with one batched blit.
+
+    Args:
+        block (Block): The block to draw.
+        screen (pygame.Surface): The Pygame surface to draw on.
+        offset_x (int): The x-coordinate offset.
+        offset_y (int): The y-coordinate offset.
+    """
+    atlas = get_tile_atlas(block.cell_size, block.colors)
+    screen.blits(atlas.block_blits(block, offset_x, offset_y), doreturn=False)
+
+
+def next_block_offset(block):
+    """Get the screen offset used to centre a block in the "Next" preview box.
+
+    Args:
+        block (Block): The block shown in the preview.
+
+    Returns:
+        tuple: The (x, y) offset to draw the block at.
+    """
+    if block.id == 3:
+        return 255, 290
+    elif block.id == 4:
+        return 255, 280
+    return 270, 270
+
+
+def draw_game(game, screen, alpha=0.0):
+    """Draw the grid, the ghost piece, the current block and the next block preview with one batched blit.
+
+    Args:
+        game (Game): The game to draw.
+        screen (pygame.Surface): The Pygame surface to draw on.
+        alpha (float, optional): How far the time to the next gravity tick
+            has passed, from 0 to 1. A block that will fall is drawn that
+            fraction of a cell lower.
+    """
+    atlas = get_tile_atlas(game.grid.cell_size, game.grid.colors)
+    offset_x, offset_y = next_block_offset(game.next_block)
+    ghost_row = game.ghost_row()
+    fall = 0
+    if alpha and ghost_row > game.current_block.row_offset:
+        fall = int(alpha * game.grid.cell_size)
+    sequence = atlas.grid_blits(game.grid, 11, 11)
+    sequence += atlas.ghost_blits(game.current_block, ghost_row, 11, 11)
+    sequence += atlas.block_blits(game.current_block, 11, 11 + fall)
+    sequence += atlas.block_blits(game.next_block, offset_x, offset_y)
+    screen.blits(sequence, doreturn=False)
+
+
+class Hud:
+    """A class that draws the score, next block and game over panels.
+
+    Attributes:
+        text_cache (TextCache): The cache the HUD fonts and text come from.
+        title_font (pygame.font.Font): The font used for all HUD text.
+        score_surface (pygame.Surface): The rendered "Score" title.
+        next_surface (pygame.Surface): The rendered "Next" title.
+        game_over_surface (pygame.Surface): The rendered "GAME OVER" message.
+        score_rect (pygame.Rect): The panel the score value is shown in.
+        next_rect (pygame.Rect): The panel the next block preview is shown in.
+        game_over_rect (pygame.Rect): The area covered by the "GAME OVER" message.
+
+    Methods:
+        draw_titles(screen): Draw the static panel titles.
+        draw_game_over(screen): Draw the "GAME OVER" message.
+        draw_score(screen, score): Draw the score panel and value.
+        draw_next_panel(screen): Draw the empty next block panel.
+        draw(screen, game): Draw the whole HUD for a game.
+    """
+
+    def __init__(self, cache=text_cache):
+        """Initialize a Hud object and render its static text.
+
+        Args:
+            cache (TextCache, optional): The cache the HUD fonts and text come from.
+        """
+        self.text_cache = cache
+        self.title_font = cache.get_font(None, 40)
+        self.score_surface = cache.render(None, 40, "Score", Colors.white)
+        self.next_surface = cache.render(None, 40, "Next", Colors.white)
+        self.game_over_surface = cache.render(None, 40, "GAME OVER", Colors.white)
+        self.score_rect = pygame.Rect(320, 55, 170, 60)
+        self.next_rect = pygame.Rect(320, 215, 170, 180)
+        self.game_over_rect = self.game_over_surface.get_rect(topleft=(320, 450))
+
+    def draw_titles(self, screen):
+        """Draw the static panel titles.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+        """
+        screen.blit(self.score_surface, (365, 20, 50, 50))
+        screen.blit(self.next_surface, (375, 180, 50, 50))
+
+    def draw_game_over(self, screen):
+        """Draw the "GAME OVER" message.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+        """
+        screen.blit(self.game_over_surface, self.game_over_rect)
+
+    def draw_score(self, screen, score):
+        """Draw the score panel and value.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+            score (int): The score to show.
+        """
+        score_value_surface = self.text_cache.render(None, 40, str(score), Colors.white)
+        pygame.draw.rect(screen, Colors.light_blue, self.score_rect, 0, 10)
+        screen.blit(score_value_surface, score_value_surface.get_rect(centerx=self.score_rect.centerx,
+                                                                       centery=self.score_rect.centery))
+
+    def draw_next_panel(self, screen):
+        """Draw the empty next block panel.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+        """
+        pygame.draw.rect(screen, Colors.light_blue, self.next_rect, 0, 10)
+
+    def draw(self, screen, game):
+        """Draw the whole HUD for a game.
+
+        The next block itself is drawn by draw_game on top of the panel.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+            game (Game): The game whose score and state are shown.
+        """
+        self.draw_titles(screen)
+        if game.game_over:
+            self.draw_game_over(screen)
+        self.draw_score(screen, game.score)
+        self.draw_next_panel(screen)
+
+
+class DirtyRectRenderer:
+    """A renderer that only redraws what changed since the previous frame.
+
+    Every frame the grid is combined with the ghost piece and the current
+    block into one cell value per board cell and compared with the previous
+    frame. Only changed
+    cells and HUD panels whose content changed are redrawn, and their
+    rectangles are returned for pygame.display.update(rects).
+
+    Attributes:
+        hud (Hud): The HUD drawn next to the grid.
+        background (tuple): The RGB color behind the grid and the panels.
+        cells (list): The combined cell values drawn in the previous frame, one list per row.
+        score (int): The score drawn in the previous frame.
+        next_block_id (int): The id of the next block drawn in the previous frame.
+        game_over (bool): Whether the "GAME OVER" message is on screen.
+        full_redraw (bool): Whether the next frame must redraw the whole window.
+
+    Methods:
+        invalidate(): Force the next frame to redraw the whole window.
+        visible_cells(game): Combine the grid, the ghost piece and the current block into cell values.
+        draw(screen, game): Draw the changed parts of a frame and return their rectangles.
+    """
+
+    def __init__(self, hud, background=Colors.dark_blue):
+        """Initialize a DirtyRectRenderer object.
+
+        Args:
+            hud (Hud): The HUD drawn next to the grid.
+            background (tuple, optional): The RGB color behind the grid and the panels.
+        """
+        self.hud = hud
+        self.background = background
+        self.cells = None
+        self.score = None
+        self.next_block_id = None
+        self.game_over = False
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Force the next frame to redraw the whole window, e.g. after it was resized or covered."""
+        self.full_redraw = True
+
+    def visible_cells(self, game):
+        """Combine the grid, the ghost piece and the current block into cell values.
+
+        Args:
+            game (Game): The game to look at.
+
+        Returns:
+            list: One list of cell values per row, with the current block's id
+                written over the grid where the block is and its id plus the
+                number of cell colors where its ghost piece is.
+        """
+        cells = [list(row) for row in game.grid.grid]
+        block = game.current_block
+        num_rows = game.grid.num_rows
+        ghost_value = block.id + len(game.grid.colors)
+        ghost_row = game.ghost_row()
+        for row, column in block.shape.cells:
+            row += ghost_row
+            if 0 <= row < num_rows:
+                cells[row][column + block.column_offset] = ghost_value
+        for row, column in block.shape.cells:
+            row += block.row_offset
+            if 0 <= row < num_rows:
+                cells[row][column + block.column_offset] = block.id
+        return cells
+
+    def draw(self, screen, game):
+        """Draw the changed parts of a frame and return their rectangles.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+            game (Game): The game to draw.
+
+        Returns:
+            list: The rectangles that changed, for pygame.display.update(rects).
+        """
+        hud = self.hud
+        cells = self.visible_cells(game)
+        if self.full_redraw:
+            screen.fill(self.background)
+            hud.draw(screen, game)
+            game.draw(screen)
+            self.full_redraw = False
+            self.cells = cells
+            self.score = game.score
+            self.next_block_id = game.next_block.id
+            self.game_over = game.game_over
+            return [screen.get_rect()]
+
+        dirty = []
+        sequence = []
+        atlas = get_tile_atlas(game.grid.cell_size, game.grid.colors)
+        tiles = atlas.tiles + atlas.ghost_tiles
+        cell_size = game.grid.cell_size
+        previous = self.cells
+        for row, values in enumerate(cells):
+            if values == previous[row]:
+                continue
+            old_values = previous[row]
+            for column, value in enumerate(values):
+                if value != old_values[column]:
+                    cell_rect = pygame.Rect(column * cell_size + 11, row * cell_size + 11,
+                                            cell_size - 1, cell_size - 1)
+                    sequence.append((tiles[value], cell_rect))
+                    dirty.append(cell_rect)
+        screen.blits(sequence, doreturn=False)
+        self.cells = cells
+
+        if game.score != self.score:
+            screen.fill(self.background, hud.score_rect)
+            hud.draw_score(screen, game.score)
+            dirty.append(hud.score_rect)
+            self.score = game.score
+
+        if game.next_block.id != self.next_block_id:
+            screen.fill(self.background, hud.next_rect)
+            hud.draw_next_panel(screen)
+            offset_x, offset_y = next_block_offset(game.next_block)
+            draw_block(game.next_block, screen, offset_x, offset_y)
+            dirty.append(hud.next_rect)
+            self.next_block_id = game.next_block.id
+
+        if game.game_over != self.game_over:
+            screen.fill(self.background, hud.game_over_rect)
+            if game.game_over:
+                hud.draw_game_over(screen)
+            dirty.append(hud.game_over_rect)
+            self.game_over = game.game_over
+        return dirty
+
+
+class MatchRenderer:
+    """A class that draws every board of a local match in one batched pass.
+
+    Each board's locked cells are kept on a surface of their own, redrawn
+    only when the game's board_version shows that its locked cells changed,
+    which happens once per locked piece and on every reset. A frame is then one blit per board
+    plus the few tiles of the falling blocks, ghost pieces and next block
+    previews and the cached header text, all sent in a single
+    Surface.blits call, so frame time stays flat as players are added.
+    With array_render, the board surfaces are drawn by the NumPy
+    BoardArrayRenderer instead of the tile atlas, for walls of many boards.
+
+    Attributes:
+        games (list): The Game of every player.
+        labels (list): The name shown above every board.
+        cell_size (int): The size of each cell in pixels.
+        origins (list): The (x, y) position of every board's top left cell.
+        size (tuple): The (width, height) of the window the boards fill.
+        background (tuple): The RGB color behind the boards.
+        boards (list): The 32 bit surface holding every board's locked cells.
+        board_versions (list): The game board_version every board surface was drawn for.
+        array_renderer (BoardArrayRenderer): The renderer drawing the board
+            surfaces, or None to draw them from the tile atlas.
+        board_arrays (list): The uint8 array every board is mirrored into for
+            the array renderer.
+
+    Methods:
+        draw(screen, winner): Draw every board and return the window rectangle.
+    """
+
+    # The most boards side by side, and the largest window the boards are fitted in
+    MAX_COLUMNS = 4
+    MAX_SIZE = (1280, 720)
+    MARGIN = 10
+
+    def __init__(self, games, labels, background=Colors.dark_blue, array_render=False):
+        """Initialize a MatchRenderer object and lay the boards out.
+
+        Args:
+            games (list): The Game of every player.
+            labels (list): The name shown above every board.
+            background (tuple, optional): The RGB color behind the boards.
+            array_render (bool, optional): Whether to draw the boards with the
+                NumPy BoardArrayRenderer instead of the tile atlas.
+        """
+        self.games = games
+        self.labels = labels
+        self.background = background
+        grid = games[0].grid
+        columns = min(len(games), self.MAX_COLUMNS)
+        rows = -(-len(games) // self.MAX_COLUMNS)
+        margin = self.MARGIN
+        # A board is num_cols cells wide plus a 5-cell next block preview, with
+        # a header row of one cell above it
+        cell_size = min(30, (self.MAX_SIZE[0] - margin * (columns + 1)) // (columns * (grid.num_cols + 5)),
+                        (self.MAX_SIZE[1] - margin * (rows + 1)) // (rows * (grid.num_rows + 1)))
+        self.cell_size = cell_size
+        area_width = (grid.num_cols + 5) * cell_size
+        area_height = (grid.num_rows + 1) * cell_size
+        self.origins = [(margin + index % columns * (area_width + margin),
+                         margin + index // columns * (area_height + margin) + cell_size)
+                        for index in range(len(games))]
+        self.size = (margin + columns * (area_width + margin), margin + rows * (area_height + margin))
+        self.boards = [pygame.Surface((grid.num_cols * cell_size, grid.num_rows * cell_size), 0, 32)
+                       for _ in games]
+        self.board_versions = [None] * len(games)
+        self.array_renderer = None
+        self.board_arrays = None
+        if array_render:
+            self.array_renderer = BoardArrayRenderer(grid.num_rows, grid.num_cols, cell_size, grid.colors, background)
+            self.board_arrays = [np.zeros((grid.num_rows, grid.num_cols), dtype=np.uint8) for _ in games]
+        self.font_size = max(16, cell_size + 6)
+
+    def _block_blits(self, tiles, block, row_offset, offset_x, offset_y):
+        """Get the blit sequence for a block's cells at a row offset, leaving out rows above the board.
+
+        Args:
+            tiles (list): The tile surface of every cell value.
+            block (Block): The block to draw.
+            row_offset (int): The row offset to draw the block at.
+            offset_x (int): The x-coordinate of the board's top left cell.
+            offset_y (int): The y-coordinate of the board's top left cell.
+
+        Returns:
+            list: (surface, position) pairs for Surface.blits.
+        """
+        tile = tiles[block.id]
+        cell_size = self.cell_size
+        offset_x += block.column_offset * cell_size
+        return [(tile, (offset_x + column * cell_size, offset_y + (row + row_offset) * cell_size))
+                for row, column in block.shape.cells if row + row_offset >= 0]
+
+    def draw(self, screen, winner=None):
+        """Draw every board, its blocks, next block preview and header in one batched pass.
+
+        Args:
+            screen (pygame.Surface): The Pygame surface to draw on.
+            winner (int, optional): The index of the player who won the match, once it is over.
+
+        Returns:
+            pygame.Rect: The window rectangle, for pygame.display.update.
+        """
+        cell_size = self.cell_size
+        sequence = []
+        screen.fill(self.background)
+        for index, game in enumerate(self.games):
+            grid = game.grid
+            atlas = get_tile_atlas(cell_size, grid.colors)
+            x, y = self.origins[index]
+            board = self.boards[index]
+            if game.board_version != self.board_versions[index]:
+                board.fill(self.background)
+                if self.array_renderer is not None:
+                    self.array_renderer.draw(board_array(grid, self.board_arrays[index]), board, 0, 0)
+                else:
+                    board.blits(atlas.grid_blits(grid, 0, 0), doreturn=False)
+                self.board_versions[index] = game.board_version
+            sequence.append((board, (x, y)))
+            block = game.current_block
+            if not game.game_over:
+                sequence += self._block_blits(atlas.ghost_tiles, block, game.ghost_row(), x, y)
+                sequence += self._block_blits(atlas.tiles, block, block.row_offset, x, y)
+            next_block = game.next_block
+            preview_x = x + (grid.num_cols + 1) * cell_size - next_block.column_offset * cell_size
+            preview_y = y + cell_size - next_block.row_offset * cell_size
+            sequence += atlas.block_blits(next_block, preview_x, preview_y)
+            header = text_cache.render(None, self.font_size, f"{self.labels[index]}: {game.score}", Colors.white)
+            sequence.append((header, (x, y - cell_size)))
+            if index == winner:
+                message = text_cache.render(None, self.font_size, "WINNER", Colors.white)
+            elif game.game_over:
+                message = text_cache.render(None, self.font_size, "GAME OVER", Colors.white)
+            else:
+                continue
+            sequence.append((message, message.get_rect(center=(x + board.get_width() // 2,
+                                                               y + board.get_height() // 2))))
+        screen.blits(sequence, doreturn=False)
+        return screen.get_rect()
@@ -0,0 +1,604 @@
+"""Compact binary replays of games, and a headless player that checks them.
+
+A replay stores the seed of the game and every action applied to it, so
+re-running the actions through a Game with that seed reproduces the game
+exactly. Each action is one byte: the low three bits are the action and the
+high five bits the number of frames since the previous action. Longer gaps
+store 31 there and follow the byte with the gap as a varint. The stream
+ends with a zero byte, followed by the number of frames, the final score and
+the final cell values, which the player compares against its own result.
+
+Every keyframe_interval locked pieces the writer also captures a keyframe,
+the full game state after the action that locked the piece. Keyframes have
+a fixed size and are stored together after the final cells, followed by a
+trailer locating them, so seeking to any action restores the nearest
+keyframe at or before it and re-simulates at most keyframe_interval pieces.
+Only the header, the trailer and the keyframes used are read, so a replay
+opened through ReplayFile is scrubbed through mmap without loading it.
+
+File layout:
+    header: magic, version, seed, number of rows and columns (HEADER)
+    actions: one byte each, plus a varint after long gaps
+    END byte, then varints for the frame count and score, then one byte per cell
+    keyframes: KEYFRAME followed by one byte per cell, in action order
+    trailer: END byte offset, keyframe offset, count and interval, action count (TRAILER)
+
+Version 1 replays, which end after the final cells, are still read; they
+have no keyframes.
+"""
+import mmap
+import random
+import struct
+import sys
+import time
+from collections import namedtuple
+from game import Game, LOCKED, block_from_state, block_state
+
+MAGIC = b"TRPL"
+INDEX_MAGIC = b"TIDX"
+VERSION = 2
+
+# Magic, version, seed, number of rows, number of columns
+HEADER = struct.Struct("<4sBQBB")
+
+# Action index, offset into the action stream, frame, score, current block
+# and next block (id, rotation state, row offset, column offset), randomizer
+# state, bag order and bag position, game over flag
+KEYFRAME = struct.Struct("<IIIQ4b4bQHBB")
+
+# Offset of the END byte, offset, count and interval of the keyframes,
+# number of actions, INDEX_MAGIC
+TRAILER = struct.Struct("<QQIIQ4s")
+
+# Replay actions beyond the Game actions: a soft drop scores a point per row
+# like K_DOWN, a hard drop scores the rows fallen, and a reset starts a new game
+SOFT_DROP = 5
+HARD_DROP = 6
+RESET = 7
+
+# The action code that ends the action stream
+END = 0
+
+ACTION_BITS = 3
+ACTION_MASK = (1 << ACTION_BITS) - 1
+
+# The largest frame gap stored in the action byte; LONG_GAP means a varint follows
+LONG_GAP = (1 << 8 - ACTION_BITS) - 1
+
+
+def soft_drop(game):
+    """Move the current block down one row, scoring a point like K_DOWN."""
+    game.move_down()
+    game.update_score(0, 1)
+
+
+def hard_drop(game):
+    """Drop and lock the current block, scoring a point per row fallen."""
+    game.update_score(0, game.hard_drop())
+
+
+# ACTIONS[action] is the function applying a replay action to a game
+ACTIONS = (None, Game.move_left, Game.move_right, Game.move_down, Game.rotate, soft_drop, hard_drop, Game.reset)
+
+
+def apply_action(game, action):
+    """Apply a replay action to a game.
+
+    Args:
+        game (Game): The game to change.
+        action (int): One of MOVE_LEFT, MOVE_RIGHT, MOVE_DOWN, ROTATE,
+            SOFT_DROP, HARD_DROP or RESET.
+    """
+    ACTIONS[action](game)
+
+
+def write_varint(out, value):
+    """Append an unsigned integer as a little-endian base-128 varint.
+
+    Args:
+        out (bytearray): The buffer to append to.
+        value (int): The non-negative integer.
+    """
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, position):
+    """Read a varint written by write_varint.
+
+    Args:
+        data (bytes): The buffer to read from.
+        position (int): The index of the varint's first byte.
+
+    Returns:
+        tuple: The value and the index just after the varint.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def grid_cells(grid):
+    """Get the cell values of a grid, row by row.
+
+    Args:
+        grid (Grid): The grid of any backend.
+
+    Returns:
+        bytes: One byte per cell, top row first.
+    """
+    return bytes(int(value) for row in range(grid.num_rows) for value in grid.grid[row])
+
+
+class Keyframe(namedtuple("Keyframe", ["action_index", "offset", "frame", "score", "current", "next",
+                                       "randomizer", "game_over", "cells"])):
+    """The full state of a recorded game after one of its actions.
+
+    Attributes:
+        action_index (int): The number of actions applied before the state.
+        offset (int): The offset in the action stream of the next action.
+        frame (int): The frame of the last action applied.
+        score (int): The score.
+        current (tuple): The (id, rotation state, row offset, column offset) of the current block.
+        next (tuple): The (id, rotation state, row offset, column offset) of the next block.
+        randomizer (tuple): The state of the game's BagRandomizer.
+        game_over (bool): The game over flag.
+        cells (bytes): The cell values, top row first.
+    """
+
+    __slots__ = ()
+
+
+def encode_keyframe(game, action_index, offset, frame):
+    """Capture the state of a game as a keyframe record.
+
+    Args:
+        game (Game): The game to capture.
+        action_index (int): The number of actions applied to it.
+        offset (int): The offset in the action stream of the next action.
+        frame (int): The frame of the last action applied.
+
+    Returns:
+        bytes: The KEYFRAME fields followed by the cells.
+    """
+    return KEYFRAME.pack(action_index, offset, frame, game.score, *block_state(game.current_block),
+                         *block_state(game.next_block), *game.randomizer.getstate(),
+                         game.game_over) + grid_cells(game.grid)
+
+
+def restore_keyframe(game, keyframe):
+    """Return a game to the state of a keyframe.
+
+    Args:
+        game (Game): A game of the recorded grid size, of any grid backend.
+        keyframe (Keyframe): The keyframe to restore.
+    """
+    grid = game.grid
+    grid.reset()
+    num_cols = grid.num_cols
+    for index, value in enumerate(keyframe.cells):
+        if value:
+            grid.set_cell(index // num_cols, index % num_cols, value)
+    game.current_block = block_from_state(keyframe.current)
+    game.next_block = block_from_state(keyframe.next)
+    game.randomizer.setstate(keyframe.randomizer)
+    game.score = keyframe.score
+    game.game_over = keyframe.game_over
+
+
+class ReplayWriter:
+    """Records the actions applied to a game into a replay file.
+
+    Attributes:
+        seed (int): The seed the recorded game must be created with.
+        file (file): The binary file being written.
+        keyframe_interval (int): The number of locked pieces between keyframes.
+        frame (int): The number of frames recorded so far.
+        last_frame (int): The frame of the last recorded action.
+        buffer (bytearray): The encoded actions not yet written.
+        written (int): The number of action stream bytes already written.
+        actions (int): The number of actions recorded.
+        game (Game): The game captured in keyframes, set by watch.
+        locks (int): The number of pieces locked since the last keyframe.
+        keyframes (list): The encoded keyframes, written by close.
+
+    Methods:
+        watch(game): Capture keyframes of a game.
+        record(action): Record an action applied during the current frame.
+        next_frame(): Advance to the next frame.
+        close(game): Finish the replay with the final state of the game.
+    """
+
+    def __init__(self, path, seed=None, num_rows=20, num_cols=10, keyframe_interval=50):
+        """Initialize a ReplayWriter object and write the replay header.
+
+        Args:
+            path (str): The path of the replay file.
+            seed (int, optional): The 64-bit seed of the game. None picks one
+                from the system; create the game with writer.seed.
+            num_rows (int, optional): The number of rows of the game grid.
+            num_cols (int, optional): The number of columns of the game grid.
+            keyframe_interval (int, optional): The number of locked pieces
+                between keyframes.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, num_rows, num_cols))
+        self.keyframe_interval = keyframe_interval
+        self.frame = 0
+        self.last_frame = 0
+        self.buffer = bytearray()
+        self.written = 0
+        self.actions = 0
+        self.game = None
+        self.locks = 0
+        self.keyframes = []
+
+    def __enter__(self):
+        """Use the writer as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the file if close was not called with the game."""
+        if not self.file.closed:
+            self.file.close()
+
+    def __call__(self, event, *args):
+        """Count the pieces locked, as a listener of the watched game.
+
+        Args:
+            event (str): The name of the game event.
+            *args: Extra data sent with the event.
+        """
+        if event == LOCKED:
+            self.locks += 1
+
+    def watch(self, game):
+        """Capture keyframes of a game; call it before recording its first action.
+
+        Args:
+            game (Game): The recorded game.
+        """
+        self.game = game
+        game.add_listener(self)
+
+    def record(self, action):
+        """Record an action applied during the current frame.
+
+        Args:
+            action (int): The action, as passed to apply_action.
+        """
+        gap = self.frame - self.last_frame
+        self.last_frame = self.frame
+        if gap < LONG_GAP:
+            self.buffer.append(gap << ACTION_BITS | action)
+        else:
+            self.buffer.append(LONG_GAP << ACTION_BITS | action)
+            write_varint(self.buffer, gap)
+        self.actions += 1
+        # A lock is notified halfway through an action, so the keyframe is
+        # only captured once the whole action has been applied
+        if self.locks >= self.keyframe_interval and self.game is not None:
+            self.locks = 0
+            self.keyframes.append(encode_keyframe(self.game, self.actions, self.written + len(self.buffer),
+                                                  self.frame))
+        if len(self.buffer) >= 4096:
+            self.file.write(self.buffer)
+            self.written += len(self.buffer)
+            self.buffer.clear()
+
+    def next_frame(self):
+        """Advance to the next frame."""
+        self.frame += 1
+
+    def close(self, game):
+        """Finish the replay with the final state and keyframes of the game and close the file.
+
+        Args:
+            game (Game): The recorded game.
+        """
+        end = HEADER.size + self.written + len(self.buffer)
+        self.buffer.append(END)
+        write_varint(self.buffer, self.frame)
+        write_varint(self.buffer, game.score)
+        self.buffer += grid_cells(game.grid)
+        keyframe_offset = HEADER.size + self.written + len(self.buffer)
+        for keyframe in self.keyframes:
+            self.buffer += keyframe
+        self.buffer += TRAILER.pack(end, keyframe_offset, len(self.keyframes), self.keyframe_interval,
+                                    self.actions, INDEX_MAGIC)
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.file.close()
+
+
+class Replay(namedtuple("Replay", ["seed", "num_rows", "num_cols", "actions", "frames", "score", "cells",
+                                   "num_actions", "keyframe_offset", "keyframe_count", "keyframe_interval"])):
+    """A replay read by read_replay.
+
+    Attributes:
+        seed (int): The seed of the game.
+        num_rows (int): The number of rows of the game grid.
+        num_cols (int): The number of columns of the game grid.
+        actions (memoryview): The encoded action stream, END byte included.
+        frames (int): The number of frames recorded.
+        score (int): The final score.
+        cells (bytes): The final cell values, top row first.
+        num_actions (int): The number of actions, or None for version 1 replays.
+        keyframe_offset (int): The offset of the first keyframe in the file.
+        keyframe_count (int): The number of keyframes, 0 for version 1 replays.
+        keyframe_interval (int): The number of locked pieces between keyframes.
+    """
+
+    __slots__ = ()
+
+
+def read_replay(data):
+    """Parse a replay without decoding its actions.
+
+    Args:
+        data (bytes): The contents of a replay file; a memoryview or mmap
+            works too and is not copied.
+
+    Returns:
+        Replay: The parsed replay.
+
+    Raises:
+        ValueError: If the data is not a replay of a known version or is truncated.
+    """
+    magic, version, seed, num_rows, num_cols = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a replay file")
+    if version not in (1, VERSION):
+        raise ValueError(f"unsupported replay version: {version}")
+    start = HEADER.size
+    num_actions = None
+    keyframe_offset = keyframe_count = keyframe_interval = 0
+    try:
+        if version == 1:
+            # Without a trailer the end of the actions is only found by reading them
+            position = start
+            while True:
+                byte = data[position]
+                position += 1
+                if byte == END:
+                    break
+                if byte >> ACTION_BITS == LONG_GAP:
+                    position = read_varint(data, position)[1]
+            end = position - 1
+        else:
+            if len(data) < start + TRAILER.size:
+                raise IndexError
+            end, keyframe_offset, keyframe_count, keyframe_interval, num_actions, index_magic = (
+                TRAILER.unpack_from(data, len(data) - TRAILER.size))
+            if index_magic != INDEX_MAGIC:
+                raise IndexError
+        frames, position = read_varint(data, end + 1)
+        score, position = read_varint(data, position)
+    except IndexError:
+        raise ValueError("truncated replay: the recording was not closed") from None
+    cells = bytes(data[position:position + num_rows * num_cols])
+    if len(cells) != num_rows * num_cols:
+        raise ValueError("truncated replay: the recording was not closed")
+    actions = memoryview(data)[start:end + 1]
+    return Replay(seed, num_rows, num_cols, actions, frames, score, cells,
+                  num_actions, keyframe_offset, keyframe_count, keyframe_interval)
+
+
+def read_keyframe(data, replay, index):
+    """Read one keyframe of a replay.
+
+    Args:
+        data (bytes): The contents of the replay file, or an mmap of it.
+        replay (Replay): The replay returned by read_replay for the data.
+        index (int): The index of the keyframe, from 0 to replay.keyframe_count - 1.
+
+    Returns:
+        Keyframe: The keyframe.
+    """
+    num_cells = replay.num_rows * replay.num_cols
+    position = replay.keyframe_offset + index * (KEYFRAME.size + num_cells)
+    fields = KEYFRAME.unpack_from(data, position)
+    position += KEYFRAME.size
+    return Keyframe(fields[0], fields[1], fields[2], fields[3], fields[4:8], fields[8:12], fields[12:15],
+                    bool(fields[15]), bytes(data[position:position + num_cells]))
+
+
+def find_keyframe(data, replay, action_index):
+    """Find the last keyframe at or before an action.
+
+    Args:
+        data (bytes): The contents of the replay file, or an mmap of it.
+        replay (Replay): The replay returned by read_replay for the data.
+        action_index (int): The number of actions to seek to.
+
+    Returns:
+        Keyframe: The keyframe, or None if the first one comes later.
+    """
+    stride = KEYFRAME.size + replay.num_rows * replay.num_cols
+    low = 0
+    high = replay.keyframe_count
+    # Binary search on the action index, the first field of every keyframe
+    while low < high:
+        middle = (low + high) // 2
+        if KEYFRAME.unpack_from(data, replay.keyframe_offset + middle * stride)[0] <= action_index:
+            low = middle + 1
+        else:
+            high = middle
+    if low == 0:
+        return None
+    return read_keyframe(data, replay, low - 1)
+
+
+def play_actions(game, data, position=0, count=None):
+    """Apply encoded actions to a game as fast as possible.
+
+    Args:
+        game (Game): The game to change.
+        data (memoryview): The encoded action stream.
+        position (int, optional): The offset of the first action to apply.
+        count (int, optional): The number of actions to apply. Defaults to all
+            of them, up to the END byte.
+
+    Returns:
+        int: The offset just after the last action applied.
+    """
+    actions = (None, game.move_left, game.move_right, game.move_down, game.rotate,
+               lambda: soft_drop(game), lambda: hard_drop(game), game.reset)
+    if count is None:
+        count = len(data)
+    while count:
+        byte = data[position]
+        if byte == END:
+            break
+        position += 1
+        if byte >> ACTION_BITS == LONG_GAP:
+            while data[position] & 0x80:
+                position += 1
+            position += 1
+        actions[byte & ACTION_MASK]()
+        count -= 1
+    return position
+
+
+def play_replay(replay, grid=None):
+    """Re-run the actions of a replay through a new game as fast as possible.
+
+    Args:
+        replay (Replay): The replay to play.
+        grid (Grid, optional): The grid of the game, of any backend. Defaults to Grid.
+
+    Returns:
+        Game: The game after the last action.
+    """
+    game = Game(grid, replay.seed)
+    play_actions(game, replay.actions)
+    return game
+
+
+def seek_replay(data, replay, action_index, grid=None):
+    """Get the state of a replayed game after a number of actions.
+
+    The game starts from the nearest keyframe at or before the action, so at
+    most keyframe_interval pieces are re-simulated.
+
+    Args:
+        data (bytes): The contents of the replay file, or an mmap of it.
+        replay (Replay): The replay returned by read_replay for the data.
+        action_index (int): The number of actions to apply.
+        grid (Grid, optional): The grid of the game, of any backend. Defaults to Grid.
+
+    Returns:
+        Game: The game after the actions.
+    """
+    game = Game(grid, replay.seed)
+    keyframe = find_keyframe(data, replay, action_index)
+    position = 0
+    if keyframe is not None:
+        restore_keyframe(game, keyframe)
+        position = keyframe.offset
+        action_index -= keyframe.action_index
+    play_actions(game, replay.actions, position, action_index)
+    return game
+
+
+def verify_replay(replay, grid=None):
+    """Play a replay and check that it ends with the recorded score and cells.
+
+    Args:
+        replay (Replay): The replay to check.
+        grid (Grid, optional): The grid of the game, of any backend. Defaults to Grid.
+
+    Returns:
+        bool: True if the final score and every cell match.
+    """
+    game = play_replay(replay, grid)
+    return game.score == replay.score and grid_cells(game.grid) == replay.cells
+
+
+class ReplayFile:
+    """A replay file mapped into memory, for seeking without reading it whole.
+
+    Attributes:
+        file (file): The open replay file.
+        data (mmap.mmap): The read-only mapping of the file.
+        replay (Replay): The parsed replay; its actions are a view of the mapping.
+
+    Methods:
+        keyframe(index): Read one keyframe.
+        seek(action_index, grid): Get the state of the game after a number of actions.
+        close(): Unmap and close the file.
+    """
+
+    def __init__(self, path):
+        """Initialize a ReplayFile object by mapping a replay file.
+
+        Args:
+            path (str): The path of the replay file.
+        """
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.replay = read_replay(self.data)
+
+    def __enter__(self):
+        """Use the replay file as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Unmap and close the file."""
+        self.close()
+
+    def keyframe(self, index):
+        """Read one keyframe.
+
+        Args:
+            index (int): The index of the keyframe, from 0 to replay.keyframe_count - 1.
+
+        Returns:
+            Keyframe: The keyframe.
+        """
+        return read_keyframe(self.data, self.replay, index)
+
+    def seek(self, action_index, grid=None):
+        """Get the state of the game after a number of actions.
+
+        Args:
+            action_index (int): The number of actions to apply.
+            grid (Grid, optional): The grid of the game, of any backend. Defaults to Grid.
+
+        Returns:
+            Game: The game after the actions.
+        """
+        return seek_replay(self.data, self.replay, action_index, grid)
+
+    def close(self):
+        """Unmap and close the file."""
+        if not self.data.closed:
+            # The mapping cannot be closed while the action view exports it
+            self.replay.actions.release()
+            self.data.close()
+            self.file.close()
+
+
+if __name__ == "__main__":
+    # Check every replay given on the command line: python replay.py FILE...
+    failed = 0
+    start = time.perf_counter()
+    for path in sys.argv[1:]:
+        with ReplayFile(path) as replay_file:
+            if not verify_replay(replay_file.replay):
+                failed += 1
+                print(f"{path}: final score or grid does not match")
+    elapsed = time.perf_counter() - start
+    print(f"{len(sys.argv) - 1} replays checked, {failed} failed, {elapsed:.2f} s")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,70 @@
+from collections import namedtuple
+
+class Shape(namedtuple("Shape", ["cells", "row_masks", "column_spans", "min_row", "max_row", "min_column", "max_column"])):
+    """An immutable, precomputed rotation state of a block.
+
+    Shapes are built once at import time so that collision checks, locking and
+    drawing can read them without allocating Position objects.
+
+    Attributes:
+        cells (tuple): The (row, column) offsets of the occupied cells.
+        row_masks (tuple): One (row, mask) pair per occupied row, where bit c of
+            mask is set when column offset c is occupied.
+        column_spans (tuple): One (column, top row, bottom row, number of cells)
+            tuple per occupied column offset, by column.
+        min_row (int): The smallest row offset of the shape.
+        max_row (int): The largest row offset of the shape.
+        min_column (int): The smallest column offset of the shape.
+        max_column (int): The largest column offset of the shape.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Build a Shape from the (row, column) offsets of its cells.
+
+        Args:
+            cells (iterable): The (row, column) offsets of the occupied cells.
+
+        Returns:
+            Shape: The precomputed shape.
+        """
+        cells = tuple((row, column) for row, column in cells)
+        masks = {}
+        for row, column in cells:
+            masks[row] = masks.get(row, 0) | 1 << column
+        spans = {}
+        for row, column in cells:
+            spans.setdefault(column, []).append(row)
+        column_spans = tuple((column, min(rows), max(rows), len(rows)) for column, rows in sorted(spans.items()))
+        rows = [row for row, _ in cells]
+        columns = [column for _, column in cells]
+        return cls(cells, tuple(sorted(masks.items())), column_spans,
+                   min(rows), max(rows), min(columns), max(columns))
+
+
+def build_shapes(rotations):
+    """Build the shape table of a block, one Shape per rotation state.
+
+    Args:
+        rotations (iterable): For each rotation state, the (row, column) offsets of its cells.
+
+    Returns:
+        tuple: The Shape of every rotation state, indexed by rotation state.
+    """
+    return tuple(Shape.from_cells(cells) for cells in rotations)
+
+
+class PieceType(namedtuple("PieceType", ["id", "name", "shapes", "spawn_row", "spawn_column"])):
+    """An immutable description of one kind of block, shared by every block of that kind.
+
+    Attributes:
+        id (int): The identifier of the block, also its index into the cell colors.
+        name (str): The letter naming the block, e.g. "T".
+        shapes (tuple): The precomputed Shape of every rotation state.
+        spawn_row (int): The row offset a new block of this kind starts at.
+        spawn_column (int): The column offset a new block of this kind starts at.
+    """
+
+    __slots__ = ()
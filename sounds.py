@@ -0,0 +1,39 @@
+import pygame
+from game import ROTATED, LINES_CLEARED
+
+class GameSounds:
+    """A class that plays the game's sound effects and background music.
+
+    An instance is registered as a listener on a Game and reacts to the events
+    the simulation emits, so the Game itself never touches the audio device.
+
+    Attributes:
+        rotate_sound (pygame.mixer.Sound): The sound effect for block rotation.
+        clear_sound (pygame.mixer.Sound): The sound effect for clearing lines.
+
+    Methods:
+        play_music(): Start the looping background music.
+        __call__(event, *args): Play the sound effect that belongs to a game event.
+    """
+
+    def __init__(self):
+        """Initialize a GameSounds object and load the sound files."""
+        self.rotate_sound = pygame.mixer.Sound("Sounds/rotate.ogg")
+        self.clear_sound = pygame.mixer.Sound("Sounds/clear.ogg")
+
+    def play_music(self):
+        """Start the looping background music."""
+        pygame.mixer.music.load("Sounds/music.ogg")
+        pygame.mixer.music.play(-1)
+
+    def __call__(self, event, *args):
+        """Play the sound effect that belongs to a game event.
+
+        Args:
+            event (str): The name of the event emitted by the Game.
+            *args: Extra event data, unused here.
+        """
+        if event == ROTATED:
+            self.rotate_sound.play()
+        elif event == LINES_CLEARED:
+            self.clear_sound.play()
@@ -0,0 +1,23 @@
+"""Summary statistics shared by the latency, profiling and autoplayer reports.
+
+Nothing here imports pygame, so headless code such as the autoplayer can use
+it without a display.
+"""
+import math
+
+
+def percentile(values, fraction):
+    """Get a percentile of sorted values by the nearest-rank method.
+
+    Args:
+        values (list): The values, sorted in ascending order.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The smallest value with at least that fraction of the values
+            at or below it, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[min(rank, len(values)) - 1]
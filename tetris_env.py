@@ -0,0 +1,115 @@
+from game import Game, ACTION_METHODS, LINES_CLEARED, NOOP
+from array_grid import ArrayGrid
+from placements import find_placements
+
+class TetrisEnv:
+    """A reset/step environment around the Game rules, in the style of Gym.
+
+    Observations are dictionaries. Their "board" entry is a read-only NumPy
+    view of the game's own ArrayGrid storage: it is created once and always
+    shows the current board, so no array is built or copied per step.
+
+    In the default mode an action is one of the player actions NOOP,
+    MOVE_LEFT, MOVE_RIGHT, MOVE_DOWN or ROTATE from the game module. With
+    placements=True the observation lists the legal final placements of the
+    current block and an action is an index into that list; the block is
+    moved there and locked.
+
+    Attributes:
+        game (Game): The game the environment plays.
+        use_placements (bool): Whether actions are placement indices.
+        board (numpy.ndarray): The read-only (rows, columns) view of the board.
+        placements (list): The legal Placement objects of the current block,
+            in placement mode.
+        lines_cleared (int): The number of rows cleared by the last step.
+
+    Methods:
+        reset(seed): Start a new game and return the first observation.
+        step(action): Apply an action and return the observation, reward and flags.
+    """
+
+    def __init__(self, seed=None, placements=False):
+        """Initialize a TetrisEnv object.
+
+        Args:
+            seed (int, optional): The seed of the block sequence.
+            placements (bool, optional): Whether actions are placement indices
+                instead of player actions.
+        """
+        self.game = Game(ArrayGrid(), seed)
+        self.use_placements = placements
+        self.board = self.game.grid.grid.view()
+        self.board.flags.writeable = False
+        self.placements = []
+        self.lines_cleared = 0
+        self.game.add_listener(self._on_event)
+
+    def _on_event(self, event, *args):
+        """Count the rows cleared during a step.
+
+        Args:
+            event (str): The name of the event emitted by the Game.
+            *args: Extra event data; the number of rows for LINES_CLEARED.
+        """
+        if event == LINES_CLEARED:
+            self.lines_cleared += args[0]
+
+    def _observation(self):
+        """Build the observation of the current state.
+
+        Returns:
+            dict: The board view, the ids of the current and next blocks, the
+                current block's rotation state and offsets and, in placement
+                mode, the legal placements.
+        """
+        block = self.game.current_block
+        observation = {
+            "board": self.board,
+            "current": block.id,
+            "next": self.game.next_block.id,
+            "rotation": block.rotation_state,
+            "row": block.row_offset,
+            "column": block.column_offset,
+        }
+        if self.use_placements:
+            self.placements = [] if self.game.game_over else find_placements(self.game)
+            observation["placements"] = self.placements
+        return observation
+
+    def reset(self, seed=None):
+        """Start a new game and return the first observation.
+
+        Args:
+            seed (int, optional): Reseed the block sequence before starting.
+
+        Returns:
+            tuple: The observation and an empty info dictionary.
+        """
+        if seed is not None:
+            self.game.randomizer.seed(seed)
+        self.game.reset()
+        return self._observation(), {}
+
+    def step(self, action):
+        """Apply an action and return the observation, reward and flags.
+
+        Args:
+            action (int): A player action, or an index into the observed
+                placements in placement mode.
+
+        Returns:
+            tuple: The observation, the score gained (reward), whether the game
+                is over (terminated), False (truncated) and an info dictionary
+                with the number of rows cleared.
+        """
+        game = self.game
+        score = game.score
+        self.lines_cleared = 0
+        if not game.game_over:
+            if self.use_placements:
+                for name in self.placements[action].actions:
+                    getattr(game, name)()
+            elif action != NOOP:
+                getattr(game, ACTION_METHODS[action])()
+        info = {"lines_cleared": self.lines_cleared}
+        return self._observation(), game.score - score, game.game_over, False, info
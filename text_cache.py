@@ -0,0 +1,119 @@
+import pygame
+from collections import OrderedDict
+
+class TextCache:
+    """A cache of fonts and rendered text surfaces.
+
+    Fonts are created once per (name, size). Rendered surfaces are keyed by
+    font, text, color and antialiasing, and the least recently used surface is
+    evicted once the cache holds max_entries surfaces.
+
+    Attributes:
+        max_entries (int): The maximum number of rendered surfaces kept.
+        fonts (dict): The loaded fonts, keyed by (name, size).
+        surfaces (OrderedDict): The rendered surfaces, least recently used first.
+        hits (int): The number of render calls answered from the cache.
+        misses (int): The number of render calls that had to rasterise text.
+        evictions (int): The number of surfaces dropped to stay within max_entries.
+
+    Methods:
+        get_font(name, size): Get a cached font, loading it on first use.
+        render(name, size, text, color, antialias): Get a rendered text surface.
+        hit_rate(): Get the fraction of render calls answered from the cache.
+        report(): Get a one-line summary of the cache counters.
+        clear(): Drop all cached surfaces and reset the counters.
+    """
+
+    def __init__(self, max_entries=256):
+        """Initialize a TextCache object.
+
+        Args:
+            max_entries (int, optional): The maximum number of rendered surfaces kept.
+        """
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_font(self, name, size):
+        """Get a cached font, loading it on first use.
+
+        Args:
+            name (str): The font file name, or None for the default pygame font.
+            size (int): The font size in pixels.
+
+        Returns:
+            pygame.font.Font: The font.
+        """
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(name, size)
+            self.fonts[key] = font
+        return font
+
+    def render(self, name, size, text, color, antialias=True):
+        """Get a rendered text surface, rasterising it only on a cache miss.
+
+        The returned surface is shared, so callers must not draw onto it.
+
+        Args:
+            name (str): The font file name, or None for the default pygame font.
+            size (int): The font size in pixels.
+            text (str): The text to render.
+            color (tuple): The RGB color of the text.
+            antialias (bool, optional): Whether to antialias the text.
+
+        Returns:
+            pygame.Surface: The rendered text.
+        """
+        key = (name, size, text, color, antialias)
+        surfaces = self.surfaces
+        surface = surfaces.get(key)
+        if surface is not None:
+            surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.get_font(name, size).render(text, antialias, color)
+        surfaces[key] = surface
+        if len(surfaces) > self.max_entries:
+            surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def hit_rate(self):
+        """Get the fraction of render calls answered from the cache.
+
+        Returns:
+            float: The hit rate between 0 and 1, or 0 before the first call.
+        """
+        calls = self.hits + self.misses
+        if calls == 0:
+            return 0.0
+        return self.hits / calls
+
+    def report(self):
+        """Get a one-line summary of the cache counters.
+
+        Returns:
+            str: The hits, misses, hit and miss rates, evictions and sizes.
+        """
+        hit_rate = self.hit_rate()
+        miss_rate = 1.0 - hit_rate if self.hits + self.misses else 0.0
+        return (f"text cache: {self.hits} hits, {self.misses} misses "
+                f"({hit_rate:.1%} hit rate, {miss_rate:.1%} miss rate), {self.evictions} evictions, "
+                f"{len(self.surfaces)} surfaces, {len(self.fonts)} fonts")
+
+    def clear(self):
+        """Drop all cached surfaces and reset the counters; loaded fonts are kept."""
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+# The cache shared by the HUD and the game modes
+text_cache = TextCache()
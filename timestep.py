@@ -0,0 +1,71 @@
+"""Fixed-timestep scheduling of simulation ticks, decoupled from the frame rate.
+
+Every frame adds the real time elapsed since the previous frame to an
+accumulator and runs one simulation tick per whole step it holds. Ticks
+therefore happen at the same rate however fast frames are drawn, and a
+slow frame is followed by the ticks it missed rather than by a burst of
+queued timer events. The fraction of a step left in the accumulator can be
+used to draw moving things between two ticks.
+"""
+import time
+
+
+class FixedTimestep:
+    """An accumulator turning elapsed real time into a whole number of fixed ticks.
+
+    Attributes:
+        step (float): The seconds of real time per simulation tick.
+        max_steps (int): The most ticks run in one frame; time beyond that is
+            dropped so a long stall does not turn into a burst of catch-up ticks.
+        clock (callable): The function returning the current time in seconds.
+        accumulator (float): The real time not yet turned into ticks.
+        last_time (float): The time of the previous advance call.
+        ticks (int): The number of ticks run so far.
+        dropped (int): The number of ticks dropped by the catch-up cap.
+
+    Methods:
+        advance(): Get the number of ticks to run this frame.
+        reset(): Start accumulating from now with nothing pending.
+    """
+
+    def __init__(self, step, max_steps=5, clock=time.perf_counter):
+        """Initialize a FixedTimestep object.
+
+        Args:
+            step (float): The seconds of real time per simulation tick.
+            max_steps (int, optional): The most ticks run in one frame.
+            clock (callable, optional): The function returning the current time in seconds.
+        """
+        self.step = step
+        self.max_steps = max_steps
+        self.clock = clock
+        self.ticks = 0
+        self.dropped = 0
+        self.reset()
+
+    @property
+    def alpha(self):
+        """float: How far the time between the last tick and the next one has passed, from 0 to 1."""
+        return self.accumulator / self.step
+
+    def reset(self):
+        """Start accumulating from now with nothing pending, e.g. after a pause."""
+        self.accumulator = 0.0
+        self.last_time = self.clock()
+
+    def advance(self):
+        """Add the time elapsed since the last call and take the whole steps out of it.
+
+        Returns:
+            int: The number of simulation ticks to run this frame.
+        """
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        steps = int(self.accumulator // self.step)
+        self.accumulator -= steps * self.step
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+        self.ticks += steps
+        return steps
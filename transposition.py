@@ -0,0 +1,146 @@
+from collections import OrderedDict
+
+# Approximate bytes held per entry, measured with tracemalloc for a 64-bit
+# key and a (depth, value) pair: an OrderedDict entry for the "lru" policy
+# and one tuple in a preallocated slot list for the "depth" policy
+LRU_ENTRY_BYTES = 224
+SLOT_ENTRY_BYTES = 136
+
+class TranspositionTable:
+    """A bounded cache of search results keyed by 64-bit Zobrist hashes.
+
+    Entries store the search depth a value was computed for, and a lookup
+    only answers for the same depth. Two replacement policies are available:
+
+    "lru": entries live in an OrderedDict and the least recently used entry
+        is evicted once the table is full.
+    "depth": entries live in a fixed list of slots indexed by key; a new
+        entry replaces the one in its slot only if it was searched at least
+        as deep, so expensive results survive cheap ones.
+
+    Attributes:
+        policy (str): The replacement policy, "lru" or "depth".
+        max_entries (int): The maximum number of entries kept.
+        entries (OrderedDict): The key -> (depth, value) entries, least
+            recently used first, for the "lru" policy.
+        slots (list): The (key, depth, value) entry or None of every slot,
+            for the "depth" policy.
+        hits (int): The number of lookups answered from the table.
+        misses (int): The number of lookups that found nothing.
+        evictions (int): The number of entries dropped to make room.
+
+    Methods:
+        get(key, depth): Look up the value stored for a key and depth.
+        put(key, depth, value): Store the value of a key and depth.
+        hit_rate(): Get the fraction of lookups answered from the table.
+        report(): Get a one-line summary of the table counters.
+        clear(): Drop all entries and reset the counters.
+    """
+
+    def __init__(self, max_entries=1 << 16, max_bytes=None, policy="lru"):
+        """Initialize a TranspositionTable object.
+
+        Args:
+            max_entries (int, optional): The maximum number of entries kept.
+            max_bytes (int, optional): An approximate memory cap; the table
+                keeps no more entries than fit in it.
+            policy (str, optional): The replacement policy, "lru" or "depth".
+        """
+        if policy not in ("lru", "depth"):
+            raise ValueError(f"unknown replacement policy: {policy!r}")
+        if max_bytes is not None:
+            entry_bytes = LRU_ENTRY_BYTES if policy == "lru" else SLOT_ENTRY_BYTES
+            max_entries = min(max_entries, max_bytes // entry_bytes)
+        if max_entries < 1:
+            raise ValueError("a transposition table needs room for at least one entry")
+        self.policy = policy
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.slots = [None] * max_entries if policy == "depth" else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Get the number of entries stored."""
+        if self.slots is not None:
+            return sum(1 for entry in self.slots if entry is not None)
+        return len(self.entries)
+
+    def get(self, key, depth):
+        """Look up the value stored for a key and depth.
+
+        Args:
+            key (int): The 64-bit hash of the position.
+            depth (int): The search depth the value must have been computed for.
+
+        Returns:
+            The stored value, or None on a miss.
+        """
+        if self.slots is not None:
+            entry = self.slots[key % self.max_entries]
+            if entry is not None and entry[0] == key and entry[1] == depth:
+                self.hits += 1
+                return entry[2]
+        else:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == depth:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, depth, value):
+        """Store the value of a key and depth, evicting an entry if needed.
+
+        Args:
+            key (int): The 64-bit hash of the position.
+            depth (int): The search depth the value was computed for.
+            value: The value to store.
+        """
+        if self.slots is not None:
+            index = key % self.max_entries
+            entry = self.slots[index]
+            if entry is not None and entry[0] != key:
+                if depth < entry[1]:
+                    return
+                self.evictions += 1
+            self.slots[index] = (key, depth, value)
+            return
+        entries = self.entries
+        entries[key] = (depth, value)
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def hit_rate(self):
+        """Get the fraction of lookups answered from the table.
+
+        Returns:
+            float: The hit rate between 0 and 1, or 0 before the first lookup.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+    def report(self):
+        """Get a one-line summary of the table counters.
+
+        Returns:
+            str: The hits, misses, hit rate, evictions and size.
+        """
+        return (f"transposition table ({self.policy}): {self.hits} hits, {self.misses} misses "
+                f"({self.hit_rate():.1%} hit rate), {self.evictions} evictions, "
+                f"{len(self)}/{self.max_entries} entries")
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        self.entries.clear()
+        if self.slots is not None:
+            self.slots = [None] * self.max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -0,0 +1,92 @@
+"""64-bit Zobrist keys for boards and blocks.
+
+The key of the cell at row r, column c is COLUMN_KEYS[c] rotated left by r
+bits. Rotation distributes over XOR, so the keys of a whole row are its
+column keys XORed together and rotated by the row index: a row moving down
+k rows only has its combined key rotated by k more bits, which lets a grid
+keep its hash up to date through row clears without visiting any cell.
+"""
+import random
+
+# The seed of every key table, fixed so hashes are the same in every process
+ZOBRIST_SEED = 0x7E7215
+
+MASK_64 = (1 << 64) - 1
+
+# The offset added to block row and column offsets before looking up their
+# keys, so spawn rows above the grid and negative columns have keys too
+BLOCK_OFFSET = 4
+
+_random = random.Random(ZOBRIST_SEED)
+
+# One key per column, for grids up to 64 columns wide
+COLUMN_KEYS = tuple(_random.getrandbits(64) for _ in range(64))
+
+# BLOCK_KEYS[id][rotation state] is the key of a block's kind and rotation
+BLOCK_KEYS = tuple(tuple(_random.getrandbits(64) for _ in range(4)) for _ in range(8))
+
+# The keys of a block's row and column offsets, indexed by offset + BLOCK_OFFSET
+BLOCK_ROW_KEYS = tuple(_random.getrandbits(64) for _ in range(64))
+BLOCK_COLUMN_KEYS = tuple(_random.getrandbits(64) for _ in range(64))
+
+# NEXT_KEYS[id] is the key of the next block's kind
+NEXT_KEYS = tuple(_random.getrandbits(64) for _ in range(8))
+
+del _random
+
+
+def rotate_left(value, bits):
+    """Rotate a 64-bit value left.
+
+    Args:
+        value (int): The value to rotate.
+        bits (int): The number of bits to rotate by.
+
+    Returns:
+        int: The rotated 64-bit value.
+    """
+    bits %= 64
+    return (value << bits | value >> 64 - bits) & MASK_64
+
+
+def board_hash(rows):
+    """Hash a board given as row occupancy bitmasks, as Grid.zobrist_hash does.
+
+    Args:
+        rows (list): The occupancy bitmask of every row, top row first.
+
+    Returns:
+        int: The 64-bit Zobrist hash of the occupied cells.
+    """
+    zobrist_hash = 0
+    for row, mask in enumerate(rows):
+        if mask:
+            row_key = 0
+            while mask:
+                lowest = mask & -mask
+                row_key ^= COLUMN_KEYS[lowest.bit_length() - 1]
+                mask ^= lowest
+            zobrist_hash ^= rotate_left(row_key, row)
+    return zobrist_hash
+
+
+def cell_keys(num_rows, num_cols):
+    """Get the key of every cell of a grid size.
+
+    Args:
+        num_rows (int): The number of rows.
+        num_cols (int): The number of columns.
+
+    Returns:
+        tuple: One tuple of cell keys per row.
+    """
+    keys = _cell_keys.get((num_rows, num_cols))
+    if keys is None:
+        keys = tuple(tuple(rotate_left(COLUMN_KEYS[column], row) for column in range(num_cols))
+                     for row in range(num_rows))
+        _cell_keys[num_rows, num_cols] = keys
+    return keys
+
+
+# The cell key tables built so far, keyed by grid size
+_cell_keys = {}